@@ -12,8 +12,11 @@ agent_descriptions = """
    - **Capabilities:** 
      - **execute_command:** Executes shell commands and returns the output.
      - **read_file:** Reads files from a given path, including PDFs.
+     - **read_file_lines / head_file / tail_file / read_file_bytes:** Reads parts of very large files without loading them.
+     - **search_file:** Searches a file with a regular expression and shows matches with context.
+     - **search_workspace / find_symbol:** Searches the whole workspace through an index and finds where code symbols are defined.
      - **install_package:** Installs Python packages into the user's virtual environment.
-     - **run_python_script:** Runs Python scripts and provides the output.
+     - **run_python_script:** Runs Python scripts on a warm interpreter and provides the output, optionally keeping variables between runs.
    - **Use Cases:** Data analysis, algorithm development, debugging, and more.
 
 3. **web_agent:**
@@ -43,12 +46,14 @@ agent_descriptions = """
    - **Expertise:** Weather information retrieval using weatherapi.com API.
    - **Capabilities:**
      - **get_current_weather:** Retrieves the current weather data for a specified location.
+     - **get_weather_for_locations:** Retrieves the current weather for several locations at once.
    - **Use Cases:** Providing up-to-date weather information for any location.
 
 7. **make_agent:**
    - **Expertise:** Make.com automation using webhooks.
    - **Capabilities:**
-     - **send_to_make:** Sends data to a Make.com webhook and returns the response.
+     - **send_to_make:** Sends data to a Make.com webhook and returns the response; long-running scenarios return a job id and deliver the result later.
+     - **get_make_result:** Fetches the result of a Make.com request that was still running.
    - **Use Cases:** Automating tasks on Make.com.
 
 8. **research_agent:**
@@ -62,8 +67,9 @@ agent_descriptions = """
 9. **notion_agent:**
    - **Expertise:** Notion workspace management and interaction.
    - **Capabilities:**
-     - **search_notion:** Search for pages in Notion.
-     - **create_notion_page:** Create new pages.
+     - **search_notion:** Search pages by title, properties and text (served from a local mirror; `fresh=True` queries Notion directly).
+     - **create_notion_page:** Create new pages from markdown content (headings, lists, code blocks, tables).
+     - **create_notion_pages:** Create several pages in one call.
      - **get_notion_page_content:** Retrieve page content.
      - **update_notion_page:** Update page properties.
    - **Use Cases:** Managing Notion workspace, creating and updating pages, searching content.
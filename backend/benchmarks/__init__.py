@@ -0,0 +1,6 @@
+# Load-testing tools for the backend: a mock of the OpenAI chat-completions API
+# (mock_openai), the real app with stubbed tools (app), a load generator (load)
+# and result summaries/comparisons (report). Run from the backend directory:
+#
+#   python -m benchmarks.load --sessions 20 --turns 3 --scenario weather
+#   python -m benchmarks.report before.json after.json
@@ -0,0 +1,75 @@
+# backend/benchmarks/app.py
+"""
+Serve the real FastAPI app with every tool except handoffs replaced by a stub.
+
+Agents, handoffs, the runner, websocket handling and metrics are the production
+code; only the tools' external work (web requests, Notion, subprocesses) is
+replaced by a fixed delay and a canned result, so runs are repeatable and
+measure the backend itself. Point OPENAI_BASE_URL at benchmarks.mock_openai.
+
+Usage:
+    OPENAI_BASE_URL=http://127.0.0.1:8199/v1 OPENAI_API_KEY=bench \\
+        python -m benchmarks.app --port 8100 --tool-latency 0.05
+"""
+
+import argparse
+import functools
+import time
+from typing import Callable
+
+from swarm import Agent
+
+# Results shaped like the real tools', so the model sees realistic sizes
+STUB_RESULTS = {
+    "get_current_weather": '{"location":"Paris","region":"Ile-de-France","country":"France","temperature_c":18.0,'
+                           '"condition":"Partly cloudy","humidity":62,"wind_kph":11.2,"last_updated":"2024-10-20 12:00"}',
+    "search_notion": "\n".join(f"- Roadmap item {i} (id: bench-page-{i})\n  ...**roadmap** milestone {i}..." for i in range(10)),
+    "get_notion_page_content": "# Roadmap\n" + "\n".join(f"- Milestone {i}: shipped" for i in range(40)),
+    "run_python_script": "45\n",
+}
+
+def stub_tool(func: Callable, latency: float) -> Callable:
+    """Replace a tool by one with the same name and signature that sleeps and returns a canned result."""
+    result = STUB_RESULTS.get(func.__name__, f"Result of {func.__name__}: " + "lorem ipsum " * 40)
+
+    @functools.wraps(func)
+    def stub(*args, **kwargs):
+        time.sleep(latency)
+        return result
+    return stub
+
+def stub_agents(module, latency: float) -> int:
+    """Swap the tools of every agent defined in module for stubs; returns the number replaced."""
+    from runner import instrument_tool
+
+    replaced = 0
+    for agent in vars(module).values():
+        if not isinstance(agent, Agent):
+            continue
+        functions = []
+        for function in agent.functions:
+            if function.__name__.startswith("transfer_"):
+                functions.append(function)
+                continue
+            tool = getattr(function, "__wrapped__", function)
+            functions.append(instrument_tool(stub_tool(tool, latency), agent.name))
+            replaced += 1
+        agent.functions = functions
+    return replaced
+
+def main() -> None:
+    import uvicorn
+
+    parser = argparse.ArgumentParser(description="Run the backend with stubbed tools for benchmarks.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8100)
+    parser.add_argument("--tool-latency", type=float, default=0.05, help="Seconds each stubbed tool call takes")
+    args = parser.parse_args()
+
+    import main as backend
+    replaced = stub_agents(backend, args.tool_latency)
+    print(f"Stubbed {replaced} agent tools ({args.tool_latency * 1000:.0f}ms each)")
+    uvicorn.run(backend.app, host=args.host, port=args.port, log_level="warning")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,382 @@
+# backend/benchmarks/load.py
+"""
+Load generator for the backend.
+
+Starts the mock OpenAI server and the real app with stubbed tools (or targets a
+running server with --url), opens N concurrent websocket or HTTP sessions that
+each run a number of turns, and reports TTFT, tokens/s, turn latency percentiles
+and the app process' CPU and RSS. Results are saved as JSON; compare two runs
+with `python -m benchmarks.report before.json after.json`.
+
+The app's model routing is visible in the results: calls and errors per model
+and fallbacks taken, read from its /metrics. Degrade a model on the mock with
+--faults to check that traffic moves to its fallbacks.
+
+Usage:
+    python -m benchmarks.load --sessions 20 --turns 3 --scenario weather
+    python -m benchmarks.load --transport http --sessions 50 --token-rate 0
+    python -m benchmarks.load --faults '{"gpt-4o-mini": {"error_rate": 0.5}}'
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import re
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+from dataclasses import asdict, dataclass
+from typing import Any, Dict, List, Optional, Tuple
+from urllib.parse import urlencode
+
+import httpx
+import websockets
+
+from benchmarks.report import format_summary, summarize
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+RESULTS_DIR = "benchmark-results"
+# Prometheus text format: name{labels} value
+METRIC_LINE = re.compile(r'^(\w+)\{(.*)\} (\S+)$')
+LABEL = re.compile(r'(\w+)="((?:[^"\\]|\\.)*)"')
+
+@dataclass
+class TurnResult:
+    """
+    Outcome of one turn as seen by the client.
+
+    Attributes:
+        session (int): Session index
+        turn (int): Turn index within the session
+        ok (bool): Whether the turn completed
+        latency (float): Seconds from sending the message to the end frame (or HTTP response)
+        ttft (Optional[float]): Seconds to the first content frame (websocket only)
+        tokens (int): Content frames received, one per streamed token
+        stream_seconds (Optional[float]): Seconds from the first to the last content frame
+        agent (str): Agent at the end of the turn
+        error (str): Error message if the turn failed
+    """
+    session: int
+    turn: int
+    ok: bool
+    latency: float
+    ttft: Optional[float] = None
+    tokens: int = 0
+    stream_seconds: Optional[float] = None
+    agent: str = ""
+    error: str = ""
+
+class ProcessMonitor:
+    """Samples CPU time and resident memory of a process from /proc (Linux only)."""
+
+    def __init__(self, pid: Optional[int], interval: float = 0.25) -> None:
+        self.pid = pid
+        self.interval = interval
+        self.rss_samples: List[float] = []
+        self._cpu_start: Optional[float] = None
+        self._cpu_end: Optional[float] = None
+        self._started = 0.0
+        self._elapsed = 0.0
+        self._task: Optional[asyncio.Task] = None
+        self._ticks = os.sysconf("SC_CLK_TCK") if hasattr(os, "sysconf") else 100
+
+    def _cpu_seconds(self) -> Optional[float]:
+        try:
+            with open(f"/proc/{self.pid}/stat") as f:
+                # Fields after the command name; utime and stime are fields 14 and 15
+                fields = f.read().rsplit(")", 1)[1].split()
+            return (int(fields[11]) + int(fields[12])) / self._ticks
+        except (OSError, IndexError, ValueError):
+            return None
+
+    def _rss_mb(self) -> Optional[float]:
+        try:
+            with open(f"/proc/{self.pid}/status") as f:
+                for line in f:
+                    if line.startswith("VmRSS:"):
+                        return int(line.split()[1]) / 1024
+        except OSError:
+            pass
+        return None
+
+    async def _sample(self) -> None:
+        while True:
+            rss = self._rss_mb()
+            if rss is not None:
+                self.rss_samples.append(rss)
+            await asyncio.sleep(self.interval)
+
+    def start(self) -> None:
+        if self.pid is None:
+            return
+        self._cpu_start = self._cpu_seconds()
+        self._started = time.perf_counter()
+        self._task = asyncio.create_task(self._sample())
+
+    async def stop(self) -> None:
+        if self._task is None:
+            return
+        self._task.cancel()
+        self._cpu_end = self._cpu_seconds()
+        self._elapsed = time.perf_counter() - self._started
+
+    def summary(self) -> Dict[str, Optional[float]]:
+        cpu_seconds = None
+        if self._cpu_start is not None and self._cpu_end is not None:
+            cpu_seconds = self._cpu_end - self._cpu_start
+        return {
+            "pid": self.pid,
+            "cpu_seconds": cpu_seconds,
+            "cpu_percent": cpu_seconds / self._elapsed * 100 if cpu_seconds is not None and self._elapsed else None,
+            "rss_max_mb": max(self.rss_samples) if self.rss_samples else None,
+            "rss_mean_mb": sum(self.rss_samples) / len(self.rss_samples) if self.rss_samples else None,
+        }
+
+def _message(scenario: str, session: int, turn: int) -> str:
+    return f"[bench:{scenario}] Session {session}, turn {turn}: what can you tell me?"
+
+async def websocket_turn(ws, session: int, turn: int, message: str, history: List[Dict[str, str]],
+                         timeout: float) -> Tuple[TurnResult, str]:
+    """Send one message on an open websocket and time the reply; returns the result and reply text."""
+    start = time.perf_counter()
+    first = last = None
+    content: List[str] = []
+    try:
+        await ws.send(json.dumps({"message": message, "history": history}))
+        while True:
+            frame = json.loads(await asyncio.wait_for(ws.recv(), timeout))
+            if frame["type"] == "content":
+                last = time.perf_counter()
+                if first is None:
+                    first = last
+                content.append(frame["content"])
+            elif frame["type"] == "end":
+                break
+    except Exception as e:
+        return TurnResult(session, turn, False, time.perf_counter() - start, error=f"{type(e).__name__}: {e}"), ""
+    return TurnResult(
+        session, turn, True, time.perf_counter() - start,
+        ttft=first - start if first is not None else None,
+        tokens=len(content),
+        stream_seconds=last - first if first is not None else None,
+        agent=frame.get("agent", ""),
+    ), "".join(content)
+
+def with_api_key(url: str, api_key: Optional[str]) -> str:
+    """Add the API key to a websocket URL as ?api_key=, which the server accepts like X-API-Key."""
+    if not api_key:
+        return url
+    return url + ("&" if "?" in url else "?") + urlencode({"api_key": api_key})
+
+async def websocket_session(url: str, session: int, turns: int, scenario: str, timeout: float,
+                            api_key: Optional[str] = None) -> List[TurnResult]:
+    results = []
+    history: List[Dict[str, str]] = []
+    async with websockets.connect(with_api_key(url, api_key), max_size=None) as ws:
+        for turn in range(turns):
+            message = _message(scenario, session, turn)
+            result, reply = await websocket_turn(ws, session, turn, message, history, timeout)
+            results.append(result)
+            if not result.ok:
+                break
+            history += [{"role": "user", "content": message}, {"role": "assistant", "content": reply}]
+    return results
+
+async def http_session(client: httpx.AsyncClient, url: str, session: int, turns: int, scenario: str,
+                       timeout: float, api_key: Optional[str] = None) -> List[TurnResult]:
+    # /chat does not stream, so there is no TTFT or token count
+    headers = {"X-API-Key": api_key} if api_key else None
+    results = []
+    messages: List[Dict[str, str]] = []
+    for turn in range(turns):
+        messages.append({"role": "user", "content": _message(scenario, session, turn)})
+        start = time.perf_counter()
+        try:
+            response = await client.post(url, json={"messages": messages}, headers=headers, timeout=timeout)
+            response.raise_for_status()
+            data = response.json()
+        except Exception as e:
+            results.append(TurnResult(session, turn, False, time.perf_counter() - start,
+                                      error=f"{type(e).__name__}: {e}"))
+            break
+        results.append(TurnResult(session, turn, True, time.perf_counter() - start, agent=data.get("agent", "")))
+        messages.append({"role": "assistant", "content": data["response"]})
+    return results
+
+async def _guarded(session: int, coroutine) -> List[TurnResult]:
+    # Connection failures end a session without aborting the whole run
+    try:
+        return await coroutine
+    except Exception as e:
+        return [TurnResult(session, 0, False, 0.0, error=f"{type(e).__name__}: {e}")]
+
+async def run_load(base_url: str, args: argparse.Namespace, pid: Optional[int]) -> Dict[str, Any]:
+    ws_url = base_url.replace("http", "ws", 1) + "/ws"
+    limits = httpx.Limits(max_connections=args.sessions, max_keepalive_connections=args.sessions)
+
+    async with httpx.AsyncClient(limits=limits) as client:
+        def session(index: int, turns: int):
+            if args.transport == "websocket":
+                return _guarded(index, websocket_session(ws_url, index, turns, args.scenario, args.timeout,
+                                                         args.api_key))
+            return _guarded(index, http_session(client, base_url + "/chat", index, turns, args.scenario, args.timeout,
+                                                args.api_key))
+
+        if args.warmup:
+            await session(-1, args.warmup)
+
+        monitor = ProcessMonitor(pid)
+        monitor.start()
+        started = time.perf_counter()
+
+        async def delayed(index: int):
+            await asyncio.sleep(args.ramp * index / args.sessions)
+            return await session(index, args.turns)
+
+        per_session = await asyncio.gather(*(delayed(index) for index in range(args.sessions)))
+        elapsed = time.perf_counter() - started
+        await monitor.stop()
+
+    turns = [asdict(turn) for results in per_session for turn in results]
+    try:
+        models = await model_usage(base_url)
+    except httpx.HTTPError:
+        models = None
+    return {
+        "summary": summarize(turns, elapsed),
+        "resources": monitor.summary(),
+        "models": models,
+        "turns": turns,
+    }
+
+async def model_usage(base_url: str) -> Dict[str, Any]:
+    """Calls and errors per model and fallbacks taken, from the app's /metrics (warm-up included)."""
+    models: Dict[str, Dict[str, float]] = {}
+    fallbacks = []
+    async with httpx.AsyncClient() as client:
+        response = await client.get(base_url + "/metrics", timeout=10)
+    for line in response.text.splitlines():
+        match = METRIC_LINE.match(line)
+        if not match:
+            continue
+        name, labels, value = match.group(1), dict(LABEL.findall(match.group(2))), float(match.group(3))
+        if name == "swarm_llm_request_duration_seconds_count":
+            models.setdefault(labels["model"], {"calls": 0, "errors": 0})["calls"] += value
+        elif name == "swarm_llm_errors_total":
+            models.setdefault(labels["model"], {"calls": 0, "errors": 0})["errors"] += value
+        elif name == "swarm_model_fallbacks_total":
+            fallbacks.append(dict(labels, count=value))
+    return {"by_model": models, "fallbacks": fallbacks}
+
+def free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+def git_revision() -> Optional[str]:
+    try:
+        revision = subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=BACKEND_DIR,
+                                  capture_output=True, text=True, timeout=10).stdout.strip()
+        dirty = subprocess.run(["git", "status", "--porcelain", "--untracked-files=no"], cwd=BACKEND_DIR,
+                               capture_output=True, text=True, timeout=10).stdout.strip()
+        return revision + ("-dirty" if dirty else "") if revision else None
+    except (OSError, subprocess.SubprocessError):
+        return None
+
+async def wait_ready(url: str, process: subprocess.Popen, timeout: float) -> None:
+    deadline = time.monotonic() + timeout
+    async with httpx.AsyncClient() as client:
+        while time.monotonic() < deadline:
+            if process.poll() is not None:
+                raise RuntimeError(f"Process exited with code {process.returncode}")
+            try:
+                if (await client.get(url, timeout=1)).status_code == 200:
+                    return
+            except httpx.HTTPError:
+                pass
+            await asyncio.sleep(0.2)
+    raise RuntimeError(f"{url} was not ready after {timeout:.0f}s")
+
+def spawn(module: str, options: List[str], env: Dict[str, str], log_path: str) -> subprocess.Popen:
+    log = open(log_path, "w")
+    return subprocess.Popen([sys.executable, "-m", module] + options, cwd=BACKEND_DIR, env=env,
+                            stdout=log, stderr=subprocess.STDOUT)
+
+def terminate(*processes: subprocess.Popen) -> None:
+    for process in processes:
+        process.terminate()
+        try:
+            process.wait(timeout=10)
+        except subprocess.TimeoutExpired:
+            process.kill()
+
+def save_result(result: Dict[str, Any], output: str) -> None:
+    """Write a results file and print its summary and any failures."""
+    os.makedirs(os.path.dirname(output) or ".", exist_ok=True)
+    with open(output, "w") as f:
+        json.dump(result, f, indent=2)
+    print(format_summary(result))
+    errors = [turn["error"] for turn in result["turns"] if not turn["ok"]]
+    if errors:
+        print(f"{len(errors)} failed turns, first: {errors[0]}")
+    print(f"Results saved to {output}")
+
+async def benchmark(args: argparse.Namespace) -> Dict[str, Any]:
+    if args.url:
+        return await run_load(args.url.rstrip("/"), args, args.pid)
+
+    log_dir = tempfile.mkdtemp(prefix="swarm-bench-")
+    mock_port, app_port = free_port(), free_port()
+    mock = spawn("benchmarks.mock_openai", [
+        "--port", str(mock_port), "--token-rate", str(args.token_rate), "--latency", str(args.latency),
+        "--scenario", args.scenario] + (["--scenarios", args.scenarios] if args.scenarios else [])
+        + (["--faults", args.faults] if args.faults else []),
+        dict(os.environ), os.path.join(log_dir, "mock.log"))
+    env = dict(os.environ, OPENAI_BASE_URL=f"http://127.0.0.1:{mock_port}/v1", OPENAI_API_KEY="bench")
+    app = spawn("benchmarks.app", ["--port", str(app_port), "--tool-latency", str(args.tool_latency)],
+                env, os.path.join(log_dir, "app.log"))
+    try:
+        try:
+            await wait_ready(f"http://127.0.0.1:{mock_port}/health", mock, args.startup_timeout)
+            await wait_ready(f"http://127.0.0.1:{app_port}/metrics", app, args.startup_timeout)
+        except RuntimeError as e:
+            raise RuntimeError(f"{e}; server logs are in {log_dir}") from e
+        return await run_load(f"http://127.0.0.1:{app_port}", args, app.pid)
+    finally:
+        terminate(app, mock)
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Load-test the backend against a mock OpenAI server.")
+    parser.add_argument("--sessions", type=int, default=10, help="Concurrent sessions")
+    parser.add_argument("--turns", type=int, default=3, help="Turns per session")
+    parser.add_argument("--transport", choices=["websocket", "http"], default="websocket")
+    parser.add_argument("--scenario", default="chat", help="Mock scenario: chat, weather, code, notion or one from --scenarios")
+    parser.add_argument("--scenarios", help="JSON file of additional mock scenarios")
+    parser.add_argument("--token-rate", type=float, default=50.0, help="Mock tokens per second per stream (0 = unthrottled)")
+    parser.add_argument("--latency", type=float, default=0.3, help="Mock seconds to first token")
+    parser.add_argument("--faults", help='Mock per-model faults, e.g. \'{"gpt-4o-mini": {"error_rate": 0.5}}\'')
+    parser.add_argument("--tool-latency", type=float, default=0.05, help="Seconds per stubbed tool call")
+    parser.add_argument("--ramp", type=float, default=0.0, help="Seconds over which sessions are started")
+    parser.add_argument("--warmup", type=int, default=1, help="Turns run before measuring")
+    parser.add_argument("--timeout", type=float, default=120.0, help="Seconds before a turn counts as failed")
+    parser.add_argument("--startup-timeout", type=float, default=60.0)
+    parser.add_argument("--api-key", default=os.environ.get("API_KEY"),
+                        help="Key sent with every session, needed when the server sets TENANT_KEYS (default $API_KEY)")
+    parser.add_argument("--url", help="Benchmark a running server instead of starting one (e.g. http://localhost:8000)")
+    parser.add_argument("--pid", type=int, help="Process to sample CPU/RSS from when using --url")
+    parser.add_argument("--output", help=f"Results file (default {RESULTS_DIR}/<time>-<scenario>-<transport>.json)")
+    args = parser.parse_args()
+
+    result = asyncio.run(benchmark(args))
+    result = dict({"config": vars(args), "revision": git_revision(),
+                   "created": time.strftime("%Y-%m-%dT%H:%M:%S%z")}, **result)
+
+    output = args.output or os.path.join(
+        RESULTS_DIR, f"{time.strftime('%Y%m%d-%H%M%S')}-{args.scenario}-{args.transport}.json")
+    save_result(result, output)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,201 @@
+# backend/benchmarks/mock_openai.py
+"""
+Local stand-in for the OpenAI chat-completions API.
+
+Responses follow a scripted scenario: a list of steps, one per model call within
+a turn. The step is picked by counting the assistant messages after the last
+user message, so the server is stateless and any number of sessions can share
+it. A step is either a tool call ({"tool": name, "arguments": {...}}) or an
+answer ({"tokens": n}), streamed at a fixed token rate after a first-token delay.
+
+A user message starting with "[bench:<scenario>]" selects that scenario;
+otherwise the server's default scenario is used.
+
+Individual models can be made slow or unreliable to exercise model fallback:
+--faults '{"gpt-4o-mini": {"latency": 6, "error_rate": 0.5}}' gives that
+model a 6s first-token delay and fails half its requests with a 500.
+
+Usage:
+    python -m benchmarks.mock_openai --port 8199 --token-rate 50 --latency 0.3
+"""
+
+import argparse
+import asyncio
+import json
+import random
+import re
+import time
+import uuid
+from typing import Any, Dict, List
+
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse, StreamingResponse
+
+SCENARIOS: Dict[str, List[Dict[str, Any]]] = {
+    "chat": [{"tokens": 120}],
+    "weather": [
+        {"tool": "transfer_to_weather_agent", "arguments": {}},
+        {"tool": "get_current_weather", "arguments": {"location": "Paris"}},
+        {"tokens": 80},
+    ],
+    "code": [
+        {"tool": "transfer_to_code_agent", "arguments": {}},
+        {"tool": "run_python_script", "arguments": {"filename": "bench.py"}},
+        {"tokens": 150},
+    ],
+    "notion": [
+        {"tool": "transfer_to_notion_agent", "arguments": {}},
+        {"tool": "search_notion", "arguments": {"query": "roadmap"}},
+        {"tool": "get_notion_page_content", "arguments": {"page_id": "bench-page"}},
+        {"tokens": 200},
+    ],
+}
+
+WORDS = ["the", " quick", " brown", " fox", " jumps", " over", " a", " lazy", " dog", "."]
+SCENARIO_MARKER = re.compile(r"^\[bench:([\w-]+)\]")
+
+class MockSettings:
+    """Server-wide behaviour, set from the command line."""
+
+    def __init__(self, token_rate: float = 50.0, latency: float = 0.3, scenario: str = "chat",
+                 scenarios: Dict[str, List[Dict[str, Any]]] = None,
+                 faults: Dict[str, Dict[str, float]] = None) -> None:
+        self.token_rate = token_rate
+        self.latency = latency
+        self.scenario = scenario
+        self.scenarios = dict(SCENARIOS, **(scenarios or {}))
+        self.faults = faults or {}
+
+    def latency_for(self, model: str) -> float:
+        return self.faults.get(model, {}).get("latency", self.latency)
+
+    def fails(self, model: str) -> bool:
+        return random.random() < self.faults.get(model, {}).get("error_rate", 0.0)
+
+def _next_step(settings: MockSettings, messages: List[Dict[str, Any]]) -> Dict[str, Any]:
+    last_user = max((i for i, m in enumerate(messages) if m.get("role") == "user"), default=-1)
+    scenario = settings.scenario
+    if last_user >= 0:
+        match = SCENARIO_MARKER.match(str(messages[last_user].get("content") or ""))
+        if match and match.group(1) in settings.scenarios:
+            scenario = match.group(1)
+    script = settings.scenarios[scenario]
+    calls = sum(1 for m in messages[last_user + 1:] if m.get("role") == "assistant")
+    return script[min(calls, len(script) - 1)]
+
+def _prompt_tokens(messages: List[Dict[str, Any]]) -> int:
+    # Rough estimate (4 characters per token) so usage accounting has something to count
+    return sum(len(str(m.get("content") or "")) for m in messages) // 4
+
+def _chunk(completion_id: str, model: str, delta: Dict[str, Any], finish_reason: str = None) -> str:
+    body = {
+        "id": completion_id,
+        "object": "chat.completion.chunk",
+        "created": int(time.time()),
+        "model": model,
+        "choices": [{"index": 0, "delta": delta, "finish_reason": finish_reason}],
+    }
+    return f"data: {json.dumps(body)}\n\n"
+
+def _tool_call(step: Dict[str, Any]) -> Dict[str, Any]:
+    return {
+        "id": f"call_{uuid.uuid4().hex[:12]}",
+        "type": "function",
+        "function": {"name": step["tool"], "arguments": json.dumps(step.get("arguments", {}))},
+    }
+
+def create_app(settings: MockSettings) -> FastAPI:
+    app = FastAPI()
+
+    @app.get("/health")
+    async def health():
+        return {"ok": True}
+
+    @app.post("/v1/chat/completions")
+    async def chat_completions(request: Request):
+        body = await request.json()
+        messages = body.get("messages", [])
+        model = body.get("model", "mock")
+        step = _next_step(settings, messages)
+        completion_id = f"chatcmpl-{uuid.uuid4().hex[:12]}"
+        prompt_tokens = _prompt_tokens(messages)
+        completion_tokens = step.get("tokens", 10)
+        usage = {"prompt_tokens": prompt_tokens, "completion_tokens": completion_tokens,
+                 "total_tokens": prompt_tokens + completion_tokens}
+        latency = settings.latency_for(model)
+
+        if settings.fails(model):
+            await asyncio.sleep(latency)
+            return JSONResponse({"error": {"message": f"Injected failure for {model}", "type": "server_error"}},
+                                status_code=500)
+
+        if not body.get("stream"):
+            await asyncio.sleep(latency + (completion_tokens / settings.token_rate if settings.token_rate else 0))
+            if "tool" in step:
+                message = {"role": "assistant", "content": None, "tool_calls": [_tool_call(step)]}
+                finish_reason = "tool_calls"
+            else:
+                message = {"role": "assistant", "content": "".join(WORDS[i % len(WORDS)] for i in range(completion_tokens))}
+                finish_reason = "stop"
+            return JSONResponse({
+                "id": completion_id, "object": "chat.completion", "created": int(time.time()), "model": model,
+                "choices": [{"index": 0, "message": message, "finish_reason": finish_reason}], "usage": usage,
+            })
+
+        include_usage = (body.get("stream_options") or {}).get("include_usage", False)
+
+        async def stream():
+            await asyncio.sleep(latency)
+            if "tool" in step:
+                call = _tool_call(step)
+                yield _chunk(completion_id, model, {"role": "assistant", "tool_calls": [dict(call, index=0)]})
+                yield _chunk(completion_id, model, {}, "tool_calls")
+            else:
+                interval = 1 / settings.token_rate if settings.token_rate else 0
+                started = time.perf_counter()
+                for i in range(completion_tokens):
+                    delta = {"content": WORDS[i % len(WORDS)]}
+                    if i == 0:
+                        delta["role"] = "assistant"
+                    yield _chunk(completion_id, model, delta)
+                    # Pace against the start time so sleep overshoot does not accumulate
+                    delay = started + (i + 1) * interval - time.perf_counter()
+                    if delay > 0:
+                        await asyncio.sleep(delay)
+                yield _chunk(completion_id, model, {}, "stop")
+            if include_usage:
+                yield "data: " + json.dumps({
+                    "id": completion_id, "object": "chat.completion.chunk", "created": int(time.time()),
+                    "model": model, "choices": [], "usage": usage,
+                }) + "\n\n"
+            yield "data: [DONE]\n\n"
+
+        return StreamingResponse(stream(), media_type="text/event-stream")
+
+    return app
+
+def main() -> None:
+    import uvicorn
+
+    parser = argparse.ArgumentParser(description="Mock OpenAI chat-completions server for benchmarks.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8199)
+    parser.add_argument("--token-rate", type=float, default=50.0, help="Streamed tokens per second (0 = no delay)")
+    parser.add_argument("--latency", type=float, default=0.3, help="Seconds before the first chunk")
+    parser.add_argument("--scenario", default="chat", help="Scenario for messages without a [bench:...] marker")
+    parser.add_argument("--scenarios", help="JSON file of additional scenarios: {name: [step, ...]}")
+    parser.add_argument("--faults", help='JSON per-model overrides: {model: {"latency": s, "error_rate": p}}')
+    args = parser.parse_args()
+
+    scenarios = None
+    if args.scenarios:
+        with open(args.scenarios) as f:
+            scenarios = json.load(f)
+    settings = MockSettings(args.token_rate, args.latency, args.scenario, scenarios,
+                            json.loads(args.faults) if args.faults else None)
+    if settings.scenario not in settings.scenarios:
+        parser.error(f"Unknown scenario {settings.scenario}; available: {', '.join(settings.scenarios)}")
+    uvicorn.run(create_app(settings), host=args.host, port=args.port, log_level="warning")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,377 @@
+# backend/benchmarks/replay.py
+"""
+Replay recorded sessions against the backend.
+
+Sessions recorded with RECORD_DIR (see recording.py) are sent again over
+websockets to the real app, whose model and tools are answered from the
+recordings. Agents, handoffs, the runner and the websocket layer run as in
+production, so changes to them can be measured on real traffic shapes offline.
+
+Modes:
+    realtime  sessions start, think, stream and run tools with their recorded timing
+    fast      every session starts at once and nothing waits
+
+Usage:
+    python -m benchmarks.replay run recordings/ --mode fast
+    python -m benchmarks.replay run recordings/*.jsonl.gz --mode realtime --max-idle 10
+    python -m benchmarks.replay serve recordings/ --port 8100 --mode fast   # server only
+"""
+
+import argparse
+import asyncio
+import functools
+import glob
+import json
+import os
+import tempfile
+import threading
+import time
+from collections import defaultdict, deque
+from typing import Any, Callable, Deque, Dict, List, Optional, Tuple
+
+import httpx
+import websockets
+
+from benchmarks.load import (RESULTS_DIR, ProcessMonitor, free_port, git_revision, save_result, spawn, terminate,
+                             wait_ready, websocket_turn, with_api_key)
+from benchmarks.report import distribution, summarize
+from recording import load_recording
+from tools.runtime import get_current_session
+
+MISSING_RESPONSE = "[replay: no recorded response]"
+
+def load_recordings(paths: List[str]) -> List[Dict[str, Any]]:
+    """Load recordings from files and directories of *.jsonl.gz files, oldest session first."""
+    files = []
+    for path in paths:
+        files.extend(sorted(glob.glob(os.path.join(path, "*.jsonl.gz"))) if os.path.isdir(path) else [path])
+    sessions = [load_recording(path) for path in files]
+    return sorted((session for session in sessions if session["turns"]), key=lambda session: session["started"])
+
+def _llm_key(message: str, history_len: int, step: int) -> Tuple[str, int, int]:
+    return message, history_len, step
+
+def _tool_key(name: str, arguments: Dict[str, Any]) -> Tuple[str, str]:
+    return name, json.dumps(arguments, sort_keys=True, default=str)
+
+class ReplayIndex:
+    """
+    Recorded completions and tool results, looked up by what the backend asks for.
+
+    A completion is found by the turn's user message, the length of the history
+    the client sent with it and how many completions the session already asked
+    for in the turn. The server reports each turn with start_turn() and counts
+    the completions itself, so the key does not depend on how the messages sent
+    to the model are laid out (handoff scoping and budget trimming change that).
+    Completions are counted in request order, so replay with SPECULATE off. A
+    tool result is found by tool name and arguments, falling back to any
+    recorded result of that tool. Identical keys from different sessions are
+    served in recorded order.
+    """
+
+    def __init__(self, sessions: List[Dict[str, Any]]) -> None:
+        self.completions: Dict[Tuple, Deque[Dict[str, Any]]] = defaultdict(deque)
+        self.tools: Dict[Tuple, Deque[Dict[str, Any]]] = defaultdict(deque)
+        self.tools_by_name: Dict[str, Deque[Dict[str, Any]]] = defaultdict(deque)
+        self.misses: Dict[str, int] = defaultdict(int)
+        # Session id -> [user message, history length, completions made] of its current turn
+        self._turns: Dict[str, List[Any]] = {}
+        self._lock = threading.Lock()
+        for session in sessions:
+            for turn in session["turns"]:
+                step = 0
+                for event in turn["events"]:
+                    if event["type"] == "llm":
+                        self.completions[_llm_key(turn["message"], turn["history_len"], step)].append(event)
+                        step += 1
+                    elif event["type"] == "tool" and "handoff" not in event:
+                        self.tools[_tool_key(event["name"], event["args"])].append(event)
+                        self.tools_by_name[event["name"]].append(event)
+
+    @staticmethod
+    def _take(entries: Deque[Dict[str, Any]]) -> Optional[Dict[str, Any]]:
+        # Keep the last entry so repeated requests beyond the recording still get an answer
+        if not entries:
+            return None
+        return entries.popleft() if len(entries) > 1 else entries[0]
+
+    def start_turn(self, session_id: str, message: str, history_len: int) -> None:
+        with self._lock:
+            self._turns[session_id] = [message, history_len, 0]
+
+    def end_session(self, session_id: str) -> None:
+        with self._lock:
+            self._turns.pop(session_id, None)
+
+    def completion(self, session_id: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            turn = self._turns.get(session_id)
+            event = None
+            if turn is not None:
+                message, history_len, step = turn
+                turn[2] += 1
+                event = self._take(self.completions.get(_llm_key(message, history_len, step), deque()))
+            if event is None:
+                self.misses["llm"] += 1
+            return event
+
+    def tool_result(self, name: str, arguments: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            event = self._take(self.tools.get(_tool_key(name, arguments), deque()))
+            if event is None:
+                event = self._take(self.tools_by_name.get(name, deque()))
+            if event is None:
+                self.misses["tool"] += 1
+            return event
+
+class _ReplayCompletions:
+    def __init__(self, index: ReplayIndex, realtime: bool) -> None:
+        self.index = index
+        self.realtime = realtime
+
+    def create(self, **params):
+        from openai.types.chat import ChatCompletion, ChatCompletionChunk
+
+        event = self.index.completion(get_current_session())
+        model = params.get("model", "")
+        if event is None:
+            event = {"chunks": [[0, MISSING_RESPONSE], [0, {"f": "stop"}]], "message": {
+                "role": "assistant", "content": MISSING_RESPONSE}}
+        usage = event.get("usage")
+
+        if not params.get("stream"):
+            if self.realtime:
+                time.sleep(event.get("duration", 0))
+            message = event.get("message") or _message_from_chunks(event.get("chunks", []))
+            return ChatCompletion.model_validate({
+                "id": "replay", "object": "chat.completion", "created": int(time.time()), "model": model,
+                "choices": [{"index": 0, "message": message, "finish_reason": "tool_calls" if message.get("tool_calls") else "stop"}],
+                "usage": usage,
+            })
+
+        def chunk(delta: Dict[str, Any], finish_reason: Optional[str] = None):
+            return ChatCompletionChunk.model_validate({
+                "id": "replay", "object": "chat.completion.chunk", "created": int(time.time()), "model": model,
+                "choices": [{"index": 0, "delta": delta, "finish_reason": finish_reason}],
+            })
+
+        def stream():
+            start = time.perf_counter()
+            for offset_ms, payload in event.get("chunks", []):
+                if self.realtime:
+                    delay = start + offset_ms / 1000 - time.perf_counter()
+                    if delay > 0:
+                        time.sleep(delay)
+                if isinstance(payload, str):
+                    yield chunk({"content": payload})
+                else:
+                    delta = {"content": payload.get("c"), "tool_calls": payload.get("tc")}
+                    yield chunk({key: value for key, value in delta.items() if value is not None}, payload.get("f"))
+            if usage and (params.get("stream_options") or {}).get("include_usage"):
+                yield ChatCompletionChunk.model_validate({
+                    "id": "replay", "object": "chat.completion.chunk", "created": int(time.time()), "model": model,
+                    "choices": [], "usage": usage,
+                })
+        return stream()
+
+def _message_from_chunks(chunks: List[List[Any]]) -> Dict[str, Any]:
+    # A streamed recording answering a non-streaming request: join content and tool call deltas
+    content, calls = [], {}
+    for _, payload in chunks:
+        if isinstance(payload, str):
+            content.append(payload)
+            continue
+        content.append(payload.get("c") or "")
+        for delta in payload.get("tc") or []:
+            call = calls.setdefault(delta.get("index", 0), {"id": "", "type": "function",
+                                                            "function": {"name": "", "arguments": ""}})
+            call["id"] += delta.get("id") or ""
+            call["function"]["name"] += (delta.get("function") or {}).get("name") or ""
+            call["function"]["arguments"] += (delta.get("function") or {}).get("arguments") or ""
+    message = {"role": "assistant", "content": "".join(content) or None}
+    if calls:
+        message["tool_calls"] = [calls[index] for index in sorted(calls)]
+    return message
+
+class ReplayTurns:
+    """Stand-in for the session recorder that reports the server's turns to the index."""
+
+    def __init__(self, index: ReplayIndex) -> None:
+        self.index = index
+
+    def start_turn(self, session_id: str, message: str, history: List[Dict[str, str]], agent: str) -> None:
+        self.index.start_turn(session_id, message, len(history))
+
+    def end_turn(self, session_id: str, agent: str, duration: float) -> None:
+        pass
+
+    def end_session(self, session_id: str) -> None:
+        self.index.end_session(session_id)
+
+class ReplayClient:
+    """Stand-in for the OpenAI client whose chat completions come from recordings."""
+
+    def __init__(self, index: ReplayIndex, realtime: bool) -> None:
+        self.chat = type("Chat", (), {})()
+        self.chat.completions = _ReplayCompletions(index, realtime)
+
+def replay_tool(func: Callable, index: ReplayIndex, realtime: bool) -> Callable:
+    """Replace a tool by one with the same name and signature that returns the recorded result."""
+    name = func.__name__
+
+    @functools.wraps(func)
+    def replayed(*args, **kwargs):
+        kwargs.pop("context_variables", None)
+        event = index.tool_result(name, kwargs)
+        if event is None:
+            return f"Error: no recorded result for {name}"
+        if realtime:
+            time.sleep(event.get("duration", 0))
+        return event["result"]
+    return replayed
+
+def replay_agents(module, index: ReplayIndex, realtime: bool) -> None:
+    """Answer the model and every non-handoff tool of the agents in module from the index; report turns to it too."""
+    from swarm import Agent
+    from runner import instrument_tool
+
+    module.client.client = ReplayClient(index, realtime)
+    turns = ReplayTurns(index)
+    module.get_recorder = lambda: turns
+    for agent in vars(module).values():
+        if not isinstance(agent, Agent):
+            continue
+        agent.functions = [
+            function if function.__name__.startswith("transfer_")
+            else instrument_tool(replay_tool(getattr(function, "__wrapped__", function), index, realtime), agent.name)
+            for function in agent.functions
+        ]
+
+def serve(args: argparse.Namespace) -> None:
+    import uvicorn
+
+    import main as backend
+
+    index = ReplayIndex(load_recordings(args.recordings))
+    replay_agents(backend, index, args.mode == "realtime")
+
+    @backend.app.get("/replay/misses")
+    async def misses():
+        return dict(index.misses)
+
+    print(f"Replaying {sum(len(entries) for entries in index.completions.values())} completions "
+          f"and {sum(len(entries) for entries in index.tools.values())} tool results ({args.mode})")
+    uvicorn.run(backend.app, host=args.host, port=args.port, log_level="warning")
+
+async def replay_session(url: str, number: int, session: Dict[str, Any], args: argparse.Namespace,
+                         delay: float) -> List[Dict[str, Any]]:
+    await asyncio.sleep(delay)
+    results = []
+    turns = session["turns"]
+    history: List[Dict[str, str]] = list(turns[0].get("history", []))
+    previous_end = None
+    try:
+        async with websockets.connect(with_api_key(url, args.api_key), max_size=None) as ws:
+            for turn in turns:
+                if args.mode == "realtime" and previous_end is not None:
+                    # Keep the user's think time between the previous reply and this message
+                    await asyncio.sleep(min(max(turn["t"] - previous_end["t"], 0), args.max_idle) / args.speed)
+                result, reply = await websocket_turn(ws, number, turn["turn"], turn["message"], history, args.timeout)
+                recorded = turn.get("end", {}).get("duration")
+                results.append(dict(vars(result), recorded_latency=recorded))
+                if not result.ok:
+                    break
+                history += [{"role": "user", "content": turn["message"]}, {"role": "assistant", "content": reply}]
+                previous_end = turn.get("end") or {"t": turn["t"]}
+    except Exception as e:
+        results.append({"session": number, "turn": len(results), "ok": False, "latency": 0.0,
+                        "tokens": 0, "error": f"{type(e).__name__}: {e}"})
+    return results
+
+async def run(args: argparse.Namespace) -> Dict[str, Any]:
+    sessions = load_recordings(args.recordings)
+    if not sessions:
+        raise SystemExit(f"No recorded sessions in {', '.join(args.recordings)}")
+
+    log_dir = tempfile.mkdtemp(prefix="swarm-replay-")
+    port = free_port()
+    server = spawn("benchmarks.replay", ["serve", "--port", str(port), "--mode", args.mode] + args.recordings,
+                   dict(os.environ, OPENAI_API_KEY=os.environ.get("OPENAI_API_KEY", "replay")),
+                   os.path.join(log_dir, "app.log"))
+    base_url = f"http://127.0.0.1:{port}"
+    try:
+        try:
+            await wait_ready(f"{base_url}/metrics", server, args.startup_timeout)
+        except RuntimeError as e:
+            raise RuntimeError(f"{e}; server log is in {log_dir}") from e
+
+        first_start = sessions[0]["started"]
+        delays = [
+            min(session["started"] - first_start, args.max_idle * number) / args.speed
+            if args.mode == "realtime" else 0.0
+            for number, session in enumerate(sessions)
+        ]
+        monitor = ProcessMonitor(server.pid)
+        monitor.start()
+        started = time.perf_counter()
+        per_session = await asyncio.gather(*(
+            replay_session(base_url.replace("http", "ws", 1) + "/ws", number, session, args, delay)
+            for number, (session, delay) in enumerate(zip(sessions, delays))
+        ))
+        elapsed = time.perf_counter() - started
+        await monitor.stop()
+        async with httpx.AsyncClient() as client:
+            misses = (await client.get(f"{base_url}/replay/misses")).json()
+    finally:
+        terminate(server)
+
+    turns = [turn for results in per_session for turn in results]
+    recorded = [turn["end"]["duration"] for session in sessions for turn in session["turns"] if "end" in turn]
+    return {
+        "summary": summarize(turns, elapsed),
+        "recorded_turn_latency": distribution(recorded),
+        "replay_misses": misses,
+        "resources": monitor.summary(),
+        "turns": turns,
+    }
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Replay recorded sessions against the backend.")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    run_parser = commands.add_parser("run", help="Start a replay server and replay the sessions against it")
+    run_parser.add_argument("recordings", nargs="+", help="Recording files or directories")
+    run_parser.add_argument("--mode", choices=["realtime", "fast"], default="fast")
+    run_parser.add_argument("--speed", type=float, default=1.0, help="Realtime mode: divide client-side waits by this")
+    run_parser.add_argument("--max-idle", type=float, default=30.0,
+                            help="Realtime mode: cap on think time and on gaps between session starts (seconds)")
+    run_parser.add_argument("--timeout", type=float, default=300.0, help="Seconds before a turn counts as failed")
+    run_parser.add_argument("--startup-timeout", type=float, default=60.0)
+    run_parser.add_argument("--api-key", default=os.environ.get("API_KEY"),
+                            help="Key sent with every session, needed when TENANT_KEYS is set (default $API_KEY)")
+    run_parser.add_argument("--output", help=f"Results file (default {RESULTS_DIR}/<time>-replay-<mode>.json)")
+
+    serve_parser = commands.add_parser("serve", help="Run the backend answering from recordings")
+    serve_parser.add_argument("recordings", nargs="+", help="Recording files or directories")
+    serve_parser.add_argument("--mode", choices=["realtime", "fast"], default="fast")
+    serve_parser.add_argument("--host", default="127.0.0.1")
+    serve_parser.add_argument("--port", type=int, default=8100)
+    args = parser.parse_args()
+
+    if args.command == "serve":
+        serve(args)
+        return
+
+    result = asyncio.run(run(args))
+    sessions = {turn["session"] for turn in result["turns"]}
+    config = dict(vars(args), sessions=len(sessions), scenario="replay", transport="websocket")
+    result = dict({"config": config, "revision": git_revision(),
+                   "created": time.strftime("%Y-%m-%dT%H:%M:%S%z")}, **result)
+    output = args.output or os.path.join(RESULTS_DIR, f"{time.strftime('%Y%m%d-%H%M%S')}-replay-{args.mode}.json")
+    save_result(result, output)
+    if any(result["replay_misses"].values()):
+        print(f"Warning: requests not found in the recordings: {result['replay_misses']}. "
+              "The backend no longer asks what it asked when recording, so timings are not comparable.")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,135 @@
+# backend/benchmarks/report.py
+"""
+Summaries of load-test results and before/after comparisons.
+
+Usage:
+    python -m benchmarks.report results.json              # print a summary
+    python -m benchmarks.report before.json after.json    # compare two runs
+"""
+
+import json
+import math
+import sys
+from typing import Any, Dict, List, Optional, Sequence
+
+# Metrics shown in comparisons: (key path, label, lower is better)
+COMPARED = [
+    (("turn_latency", "p50"), "turn latency p50 (s)", True),
+    (("turn_latency", "p95"), "turn latency p95 (s)", True),
+    (("turn_latency", "p99"), "turn latency p99 (s)", True),
+    (("ttft", "p50"), "TTFT p50 (s)", True),
+    (("ttft", "p95"), "TTFT p95 (s)", True),
+    (("tokens_per_second", "p50"), "tokens/s per stream p50", False),
+    (("throughput", "tokens_per_second"), "tokens/s total", False),
+    (("throughput", "turns_per_second"), "turns/s", False),
+    (("errors",), "errors", True),
+    (("resources", "cpu_percent"), "app CPU %", True),
+    (("resources", "rss_max_mb"), "app RSS max (MB)", True),
+]
+
+def percentile(values: Sequence[float], p: float) -> Optional[float]:
+    """Percentile with linear interpolation between closest ranks; None for no values."""
+    if not values:
+        return None
+    ordered = sorted(values)
+    rank = (len(ordered) - 1) * p / 100
+    low, high = math.floor(rank), math.ceil(rank)
+    return ordered[low] + (ordered[high] - ordered[low]) * (rank - low)
+
+def distribution(values: Sequence[float]) -> Dict[str, Optional[float]]:
+    return {
+        "count": len(values),
+        "mean": sum(values) / len(values) if values else None,
+        "p50": percentile(values, 50),
+        "p95": percentile(values, 95),
+        "p99": percentile(values, 99),
+        "max": max(values) if values else None,
+    }
+
+def summarize(turns: List[Dict[str, Any]], elapsed: float) -> Dict[str, Any]:
+    """
+    Aggregate per-turn results.
+
+    Args:
+        turns (List[Dict[str, Any]]): Turn results with ok, latency, ttft and tokens
+        elapsed (float): Wall-clock duration of the whole run
+
+    Returns:
+        Dict[str, Any]: Latency, TTFT and token-rate distributions plus throughput
+    """
+    ok = [turn for turn in turns if turn["ok"]]
+    rates = [
+        turn["tokens"] / turn["stream_seconds"] for turn in ok
+        if turn.get("stream_seconds") and turn["tokens"] > 1
+    ]
+    tokens = sum(turn["tokens"] for turn in ok)
+    return {
+        "turns": len(turns),
+        "errors": len(turns) - len(ok),
+        "turn_latency": distribution([turn["latency"] for turn in ok]),
+        "ttft": distribution([turn["ttft"] for turn in ok if turn.get("ttft") is not None]),
+        "tokens_per_second": distribution(rates),
+        "throughput": {
+            "elapsed_seconds": elapsed,
+            "tokens": tokens,
+            "tokens_per_second": tokens / elapsed if elapsed else None,
+            "turns_per_second": len(ok) / elapsed if elapsed else None,
+        },
+    }
+
+def _lookup(result: Dict[str, Any], path: Sequence[str]) -> Optional[float]:
+    value: Any = result
+    for key in path:
+        if not isinstance(value, dict):
+            return None
+        value = value.get(key)
+    return value
+
+def _format(value: Optional[float]) -> str:
+    if value is None:
+        return "-"
+    return f"{value:.3f}" if isinstance(value, float) else str(value)
+
+def format_summary(result: Dict[str, Any]) -> str:
+    summary = dict(result["summary"], resources=result.get("resources", {}))
+    config = result.get("config", {})
+    lines = [f"{config.get('sessions')} sessions, {summary['turns']} turns, scenario {config.get('scenario')}, "
+             f"transport {config.get('transport')}"]
+    for path, label, _ in COMPARED:
+        lines.append(f"  {label:<26} {_format(_lookup(summary, path)):>12}")
+    models = result.get("models") or {}
+    for model, counts in sorted(models.get("by_model", {}).items()):
+        lines.append(f"  model {model:<20} {counts['calls']:>6.0f} calls {counts['errors']:>5.0f} errors")
+    for fallback in models.get("fallbacks", []):
+        lines.append(f"  fallback {fallback['from_model']} -> {fallback['to_model']} "
+                     f"({fallback['cause']}): {fallback['count']:.0f}")
+    return "\n".join(lines)
+
+def compare(before: Dict[str, Any], after: Dict[str, Any]) -> str:
+    """Table of key metrics of two runs with the relative change, marking regressions."""
+    lines = [f"  {'metric':<26} {'before':>12} {'after':>12} {'change':>9}"]
+    for path, label, lower_is_better in COMPARED:
+        old = _lookup(dict(before["summary"], resources=before.get("resources", {})), path)
+        new = _lookup(dict(after["summary"], resources=after.get("resources", {})), path)
+        change = ""
+        if old and new is not None:
+            delta = (new - old) / old * 100
+            worse = delta > 0 if lower_is_better else delta < 0
+            change = f"{delta:+.1f}%{' !' if worse and abs(delta) >= 5 else ''}"
+        lines.append(f"  {label:<26} {_format(old):>12} {_format(new):>12} {change:>9}")
+    return "\n".join(lines)
+
+def main(argv: List[str] = None) -> int:
+    paths = sys.argv[1:] if argv is None else argv
+    if len(paths) not in (1, 2):
+        print(__doc__.strip(), file=sys.stderr)
+        return 2
+    results = []
+    for path in paths:
+        with open(path) as f:
+            results.append(json.load(f))
+    print(format_summary(results[0]) if len(results) == 1 else compare(*results))
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,121 @@
+# backend/handoff.py
+
+import json
+import os
+from typing import Any, Dict, List, Optional, Set
+
+DEFAULT_RECENT_TURNS = 3
+PREVIEW_CHARS = 160
+ARGUMENT_CHARS = 120
+
+# Results of other agents' tools that an agent still gets in full, on top of its own tools' results.
+# Extend or override with HANDOFF_SHARED_RESULTS='{"Agent Name": ["tool", ...]}'.
+DEFAULT_SHARED_RESULTS: Dict[str, List[str]] = {
+    "Research Agent": ["tavily_search", "get_website_text_content", "get_video_transcript"],
+    "Web Agent": ["generate_research_report", "fetch_report"],
+    "Code Agent": ["get_website_text_content", "read_file"],
+    "Notion Agent": ["tavily_search", "get_website_text_content", "generate_research_report", "fetch_report",
+                     "analyze_image", "reason_with_o1"],
+    "Make Agent": ["tavily_search", "generate_research_report", "fetch_report"],
+}
+
+def enabled() -> bool:
+    return os.environ.get("HANDOFF_SCOPING", "1").lower() not in ("0", "false", "no")
+
+def _shared_results() -> Dict[str, Set[str]]:
+    overrides = json.loads(os.environ.get("HANDOFF_SHARED_RESULTS", "{}"))
+    return {agent: set(tools) for agent, tools in dict(DEFAULT_SHARED_RESULTS, **overrides).items()}
+
+_shared = _shared_results()
+
+def _preview(text: Any, limit: int) -> str:
+    text = " ".join(str(text if text is not None else "").split())
+    return text if len(text) <= limit else text[:limit] + "…"
+
+def _summarize_call(sender: str, call: Dict[str, Any], result: Optional[Dict[str, Any]]) -> str:
+    function = call.get("function") or {}
+    name = function.get("name", "")
+    if name.startswith("transfer_"):
+        target = None
+        try:
+            target = json.loads(result["content"]).get("assistant") if result else None
+        except (TypeError, ValueError, AttributeError):
+            pass
+        return f"{sender} handed the conversation to {target or name[len('transfer_'):]}."
+    output = str(result.get("content") or "") if result else ""
+    return (f"{sender} called {name}({_preview(function.get('arguments'), ARGUMENT_CHARS)}) -> "
+            f"{len(output):,} chars: {_preview(output, PREVIEW_CHARS)}")
+
+def scope_history(agent_name: str, tool_names: Set[str], history: List[Dict[str, Any]],
+                  recent_turns: Optional[int] = None) -> List[Dict[str, Any]]:
+    """
+    The part of a conversation an agent needs to see.
+
+    User messages and agents' text replies are kept. A tool call and its
+    results are kept only if the call is in the last `recent_turns` user turns
+    and every tool in it is relevant to the agent: one of its own tools, or one
+    listed for it in the shared results. All other calls, handoffs included,
+    are replaced by a one-line summary each, grouped into a system message at
+    the point where they happened. The history passed in is not modified; Swarm
+    keeps the full conversation and only the request sent to the model shrinks.
+
+    Args:
+        agent_name (str): Agent the request is for
+        tool_names (Set[str]): Names of the agent's own tools
+        history (List[Dict[str, Any]]): Conversation so far, without the system prompt
+        recent_turns (Optional[int]): Turns whose relevant tool results are kept
+            (default HANDOFF_RECENT_TURNS, 3)
+
+    Returns:
+        List[Dict[str, Any]]: The scoped conversation
+    """
+    if recent_turns is None:
+        recent_turns = int(os.environ.get("HANDOFF_RECENT_TURNS", DEFAULT_RECENT_TURNS))
+    relevant = tool_names | _shared.get(agent_name, set())
+    user_positions = [i for i, message in enumerate(history) if message.get("role") == "user"]
+    if recent_turns <= 0:
+        recent_from = len(history)
+    elif len(user_positions) >= recent_turns:
+        recent_from = user_positions[-recent_turns]
+    else:
+        recent_from = 0
+    results = {message.get("tool_call_id"): message for message in history if message.get("role") == "tool"}
+
+    scoped: List[Dict[str, Any]] = []
+    summary: List[str] = []
+
+    def flush():
+        if summary:
+            scoped.append({"role": "system", "content": "Earlier work in this conversation (details omitted):\n"
+                                                        + "\n".join(f"- {line}" for line in summary)})
+            summary.clear()
+
+    kept_results: Set[str] = set()
+    for position, message in enumerate(history):
+        role = message.get("role")
+        if role == "tool":
+            if message.get("tool_call_id") in kept_results:
+                scoped.append(message)
+            continue
+        calls = (message.get("tool_calls") or []) if role == "assistant" else []
+        if not calls:
+            flush()
+            scoped.append(message)
+            continue
+        names = {(call.get("function") or {}).get("name") for call in calls}
+        if position >= recent_from and names <= relevant:
+            flush()
+            scoped.append(message)
+            kept_results.update(call.get("id") for call in calls)
+            continue
+        if message.get("content"):
+            flush()
+            scoped.append({key: value for key, value in message.items() if key not in ("tool_calls", "function_call")})
+        sender = message.get("sender") or "An agent"
+        summary.extend(_summarize_call(sender, call, results.get(call.get("id"))) for call in calls)
+    flush()
+    return scoped
+
+def history_chars(history: List[Dict[str, Any]]) -> int:
+    return sum(len(str(message.get("content") or "")) + len(str(message.get("tool_calls") or ""))
+               for message in history)
@@ -0,0 +1,93 @@
+# backend/import_timer.py
+
+import importlib.abc
+import sys
+import time
+from typing import Dict, List, Optional, Tuple
+
+class ImportTimer(importlib.abc.MetaPathFinder):
+    """
+    Measures module imports while active, like `python -X importtime`.
+
+    The finder sits first on sys.meta_path, lets the regular finders locate each
+    module and wraps the loader's exec_module to time it. Nested imports are
+    tracked on a stack, so every module gets both its self time and its
+    cumulative time (including the modules it imported).
+
+    Usage:
+        timer = ImportTimer().start()
+        import heavy_module
+        timer.stop()
+        print(timer.report())
+    """
+
+    def __init__(self) -> None:
+        self.timings: Dict[str, Tuple[float, float]] = {}
+        self.started: Optional[float] = None
+        self.elapsed = 0.0
+        self._stack: List[float] = []
+        self._active = False
+
+    def start(self) -> "ImportTimer":
+        self._active = True
+        self.started = time.perf_counter()
+        sys.meta_path.insert(0, self)
+        return self
+
+    def stop(self) -> "ImportTimer":
+        self._active = False
+        self.elapsed = time.perf_counter() - self.started
+        if self in sys.meta_path:
+            sys.meta_path.remove(self)
+        return self
+
+    def find_spec(self, fullname, path, target=None):
+        if not self._active:
+            return None
+        for finder in sys.meta_path:
+            if finder is self or not hasattr(finder, "find_spec"):
+                continue
+            spec = finder.find_spec(fullname, path, target)
+            if spec is not None:
+                # Built-in and frozen importers are classes shared by every module they load
+                loader = spec.loader
+                if loader is not None and not isinstance(loader, type) and hasattr(loader, "exec_module"):
+                    loader.exec_module = self._timed(fullname, loader.exec_module)
+                return spec
+        return None
+
+    def _timed(self, fullname: str, exec_module):
+        def exec_and_time(module):
+            if not self._active:
+                return exec_module(module)
+            self._stack.append(0.0)
+            start = time.perf_counter()
+            try:
+                return exec_module(module)
+            finally:
+                cumulative = time.perf_counter() - start
+                children = self._stack.pop()
+                self.timings[fullname] = (cumulative - children, cumulative)
+                if self._stack:
+                    self._stack[-1] += cumulative
+        return exec_and_time
+
+    def by_package(self) -> List[Tuple[str, float]]:
+        """Cumulative import time per top-level package, slowest first."""
+        totals: Dict[str, float] = {}
+        for name, (self_time, _) in self.timings.items():
+            package = name.split(".")[0]
+            totals[package] = totals.get(package, 0.0) + self_time
+        return sorted(totals.items(), key=lambda item: item[1], reverse=True)
+
+    def report(self, limit: int = 15) -> str:
+        """Format the slowest top-level packages and modules, in microseconds."""
+        lines = [f"Imports took {self.elapsed:.3f}s ({len(self.timings)} modules)",
+                 "import time:       total [us] | package"]
+        for package, seconds in self.by_package()[:limit]:
+            lines.append(f"import time: {seconds * 1e6:16.0f} | {package}")
+        lines.append("import time: self [us] | cumulative | module")
+        slowest = sorted(self.timings.items(), key=lambda item: item[1][1], reverse=True)[:limit]
+        for name, (self_time, cumulative) in slowest:
+            lines.append(f"import time: {self_time * 1e6:9.0f} | {cumulative * 1e6:10.0f} | {name}")
+        return "\n".join(lines)
@@ -1,26 +1,46 @@
 # backend/main.py
 
+from import_timer import ImportTimer
+
+_import_timer = ImportTimer().start()
+
 import os
-from fastapi import FastAPI, WebSocket, WebSocketDisconnect
+from fastapi import FastAPI, WebSocket, WebSocketDisconnect, HTTPException, Header, status
+from fastapi.responses import FileResponse, Response
 from pydantic import BaseModel
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Callable, Optional
+import contextlib
 import json
 import asyncio
-from swarm import Swarm, Agent
+import time
+import uuid
+from swarm import Agent
+from swarm.types import Response as RunResponse
 import nest_asyncio
 
 # Apply nest_asyncio
 nest_asyncio.apply()
 
-from tools import *
+from tools.runtime import register_session, unregister_session, set_current_session
+from tools.asset_store import get_asset_store
+from tools.model_router import get_router
+from tools.usage import BudgetExceeded, get_usage_tracker
+from tools.make_tools import get_make_handler
 from instructions import *
 from agent_descriptions import agent_descriptions  # Import shared agent descriptions
+from tools.registry import LazyTool, is_loaded, load_tool, loaded_modules
+from runner import InstrumentedSwarm, instrument_tool
+import metrics
+import tracing
+from recording import get_recorder
+import profiling
+import speculation
 
-app = FastAPI()
+_import_timer.stop()
 
-client = Swarm()
+app = FastAPI()
 
-MODEL = "gpt-4o-mini"
+client = InstrumentedSwarm()
 
 # Define transfer functions
 def transfer_back_to_triage():
@@ -72,100 +92,117 @@ transfer_functions = [
     transfer_back_to_triage
 ]
 
-# Function to create agents
-def create_agent(name, instructions, specific_functions):
+# Function to create agents; models come from models.json (MODEL_CONFIG). Tools are
+# given by name and their modules are imported when the agent first uses them.
+def create_agent(name, instructions, tool_names):
+    tools = [LazyTool(tool, wrap=lambda function: instrument_tool(function, name)) for tool in tool_names]
     return Agent(
         name=name,
         instructions=instructions + agent_descriptions,
-        functions=specific_functions + transfer_functions,
-        model=MODEL,
+        functions=tools + [instrument_tool(function, name) for function in transfer_functions],
+        model=get_router().agent_model(name),
     )
 
 # Create agents
 triage_agent = create_agent(
     name="Triage Agent",
     instructions=triage_instructions,
-    specific_functions=[]
+    tool_names=[]
 )
 
 web_agent = create_agent(
     name="Web Agent",
     instructions=web_instructions,
-    specific_functions=[
-        tavily_search,
-        get_video_transcript,
-        get_website_text_content,
-        save_to_md,
-        get_all_urls,
-        generate_research_report
+    tool_names=[
+        "tavily_search",
+        "get_video_transcript",
+        "get_website_text_content",
+        "save_to_md",
+        "get_all_urls",
+        "generate_research_report"
     ]
 )
 
 code_agent = create_agent(
     name="Code Agent",
     instructions=code_instructions,
-    specific_functions=[
-        execute_command,
-        read_file,
-        install_package,
-        run_python_script
+    tool_names=[
+        "execute_command",
+        "read_file",
+        "read_file_lines",
+        "head_file",
+        "tail_file",
+        "read_file_bytes",
+        "search_file",
+        "search_workspace",
+        "find_symbol",
+        "install_package",
+        "run_python_script"
     ]
 )
 
 reasoning_agent = create_agent(
     name="Reasoning Agent",
     instructions=reasoning_instructions,
-    specific_functions=[
-        reason_with_o1
+    tool_names=[
+        "reason_with_o1"
     ]
 )
 
 image_agent = create_agent(
     name="Image Agent",
     instructions=image_instructions,
-    specific_functions=[
-        analyze_image,
-        generate_image
+    tool_names=[
+        "analyze_image",
+        "generate_image"
     ]
 )
 
 weather_agent = create_agent(
     name="Weather Agent",
     instructions=weather_instructions,
-    specific_functions=[
-        get_current_weather
+    tool_names=[
+        "get_current_weather",
+        "get_weather_for_locations"
     ]
 )
 
 make_agent = create_agent(
     name="Make Agent",
     instructions=make_instructions,
-    specific_functions=[
-        send_to_make
+    tool_names=[
+        "send_to_make",
+        "get_make_result"
     ]
 )
 
 research_agent = create_agent(
     name="Research Agent",
     instructions=research_instructions,
-    specific_functions=[
-        fetch_report,
-        run_async,
-        generate_research_report
+    tool_names=[
+        "fetch_report",
+        "run_async",
+        "generate_research_report"
     ]
 )
 
 notion_agent = create_agent(
     name="Notion Agent",
     instructions=notion_instructions,
-    specific_functions=[
-        search_notion,
-        create_notion_page,
-        get_notion_page_content,
-        update_notion_page
+    tool_names=[
+        "search_notion",
+        "create_notion_page",
+        "create_notion_pages",
+        "get_notion_page_content",
+        "update_notion_page"
     ]
 )
 
+specialist_agents = {
+    agent.name: agent for agent in [web_agent, code_agent, reasoning_agent, image_agent, weather_agent, make_agent,
+                                    research_agent, notion_agent]
+}
+
 class Message(BaseModel):
     role: str
     content: str
@@ -173,17 +210,231 @@ class Message(BaseModel):
 class ConversationRequest(BaseModel):
     messages: List[Message]
 
+def require_admin(authorization: Optional[str]):
+    # Admin endpoints do not exist unless ADMIN_TOKEN is set
+    allowed = profiling.is_admin(authorization)
+    if allowed is None:
+        raise HTTPException(status_code=404, detail="Not Found")
+    if not allowed:
+        raise HTTPException(status_code=401, detail="Invalid admin token")
+
+def request_profile(requested: bool):
+    """cProfile context for a turn when an admin asked for one with the X-Profile header."""
+    return profiling.RequestProfile() if requested else contextlib.nullcontext()
+
+def relay(stream, send: Callable[[Dict[str, Any]], None]) -> Optional[RunResponse]:
+    """Forward a streamed Swarm run to the client as websocket frames and return its final response."""
+    current_agent_name = None
+    response = None
+    for chunk in stream:
+        if isinstance(chunk, dict):
+            if 'response' in chunk:
+                response = chunk['response']
+                continue
+            if 'sender' in chunk and chunk['sender'] != current_agent_name:
+                current_agent_name = chunk['sender']
+                send({"type": "agent_change", "agent": current_agent_name})
+            if 'content' in chunk and chunk['content'] is not None:
+                send({"type": "content", "content": chunk['content']})
+    return response
+
+def run_speculative(messages: List[Dict[str, Any]], send: Callable[[Dict[str, Any]], None],
+                    previous: Optional[str], span: tracing.Span) -> Optional[RunResponse]:
+    """
+    Run a turn that starts at triage with the likely specialist started alongside it.
+
+    Triage runs a single step, which ends in its answer or a handoff. If it hands
+    off to the predicted specialist, the speculative run is committed and its
+    output, held back so far, is sent; otherwise it is cancelled and the turn
+    continues with whichever agent triage chose, as it would without speculation.
+    """
+    predicted = speculation.predict(messages[-1]["content"], previous, specialist_agents)
+    if predicted is None:
+        metrics.SPECULATIONS.inc(agent="", outcome="skipped")
+        return relay(client.run(agent=triage_agent, messages=messages, stream=True, debug=True), send)
+
+    spec = speculation.Speculation(predicted, send)
+    spec.start(lambda s: relay(client.run(agent=specialist_agents[predicted], messages=messages, stream=True,
+                                          debug=True), s.emit))
+    try:
+        triage_response = relay(client.run(agent=triage_agent, messages=messages, stream=True, debug=True,
+                                           max_turns=1), send)
+    except BaseException:
+        spec.cancel()
+        raise
+    chosen = triage_response.agent if triage_response is not None else None
+    span.set(speculation=predicted)
+
+    if chosen is not None and chosen.name == predicted:
+        saved = spec.commit()
+        metrics.SPECULATIONS.inc(agent=predicted, outcome="hit")
+        metrics.SPECULATION_SAVED.observe(saved, agent=predicted)
+        span.set(speculation_outcome="hit", speculation_saved_ms=round(saved * 1000, 3))
+        response = spec.join()
+    else:
+        spec.cancel()
+        metrics.SPECULATIONS.inc(agent=predicted, outcome="miss")
+        span.set(speculation_outcome="miss")
+        if chosen is None or chosen is triage_agent:
+            return triage_response
+        response = relay(client.run(agent=chosen, messages=messages + triage_response.messages, stream=True,
+                                    debug=True), send)
+    if response is None:
+        return None
+    return RunResponse(messages=triage_response.messages + response.messages, agent=response.agent,
+                       context_variables=response.context_variables)
+
 @app.post("/chat")
-async def chat(request: ConversationRequest):
+async def chat(request: ConversationRequest, x_profile: Optional[str] = Header(None),
+               authorization: Optional[str] = Header(None), x_api_key: Optional[str] = Header(None)):
+    if x_profile:
+        require_admin(authorization)
+    usage = get_usage_tracker()
+    tenant = usage.tenant_for(x_api_key)
+    if tenant is None:
+        raise HTTPException(status_code=401, detail="Invalid API key")
     messages = [{"role": msg.role, "content": msg.content} for msg in request.messages]
     agent = triage_agent
-    response = client.run(agent=agent, messages=messages)
-    return {"response": response.messages[-1]["content"], "agent": response.agent.name}
+    start = time.perf_counter()
+    # Each request is its own usage session; only the tenant's daily budget carries over
+    session_id = uuid.uuid4().hex
+    usage.start_session(session_id, tenant)
+
+    def run_turn():
+        set_current_session(session_id)
+        with request_profile(bool(x_profile)) as profile, \
+                tracing.span(agent.name, "turn", transport="http") as span:
+            response = client.run(agent=agent, messages=messages)
+            span.set(final_agent=response.agent.name)
+        return response, span.trace_id, profile
+
+    try:
+        response, trace_id, profile = await asyncio.to_thread(run_turn)
+        summary = usage.summary(session_id)
+    except BudgetExceeded as e:
+        raise HTTPException(status_code=402, detail=str(e))
+    finally:
+        usage.end_session(session_id)
+        get_make_handler().forget_session(session_id)
+    metrics.TURN_DURATION.observe(time.perf_counter() - start, transport="http")
+    result = {"response": response.messages[-1]["content"], "agent": response.agent.name, "trace_id": trace_id,
+              "usage": summary}
+    if profile is not None and profile.active:
+        result["profile_id"] = profile.profile_id
+    return result
+
+@app.on_event("startup")
+async def report_startup():
+    # Slow imports show up here. Agents load their tools on first use, so the only tool modules
+    # imported at startup are those main.py imports directly (e.g. make_tools for its handler).
+    print(_import_timer.report())
+    print("Tool modules imported at startup: " + (", ".join(loaded_modules()) or "none"))
+
+def export_image_cache_stats() -> None:
+    """Copy the image analysis cache's counters and size into their metrics before a scrape."""
+    if not is_loaded("get_image_cache_stats"):
+        return
+    stats = load_tool("get_image_cache_stats")()
+    if not stats:
+        return
+    for result, key in (("hit", "hits"), ("disk_hit", "disk_hits"), ("miss", "misses")):
+        metrics.IMAGE_CACHE_LOOKUPS.set_total(stats[key], result=result)
+    metrics.IMAGE_CACHE_EVICTIONS.set_total(stats["evictions"])
+    metrics.IMAGE_CACHE_ENTRIES.set(stats["entries"])
+    metrics.IMAGE_CACHE_BYTES.set(stats["memory_bytes"])
+
+metrics.REGISTRY.add_collector(export_image_cache_stats)
+
+@app.get("/metrics")
+async def get_metrics():
+    return Response(metrics.REGISTRY.render(), media_type=metrics.CONTENT_TYPE)
+
+@app.post("/admin/profile")
+async def sample_profile(seconds: float = 10, hz: float = 100, idle: bool = False,
+                         authorization: Optional[str] = Header(None)):
+    """Sample all threads for a while and return the stacks in collapsed (flamegraph) format."""
+    require_admin(authorization)
+    try:
+        future = profiling.sample_stacks(seconds, hz, idle)
+    except profiling.ProfilerBusy as e:
+        raise HTTPException(status_code=409, detail=str(e))
+    sampler = await asyncio.wrap_future(future)
+    filename = f"profile-{time.strftime('%Y%m%d-%H%M%S')}.collapsed"
+    return Response(sampler.collapsed(), media_type="text/plain", headers={
+        "Content-Disposition": f'attachment; filename="{filename}"',
+        "X-Profile-Samples": str(sampler.samples),
+    })
+
+@app.get("/admin/profiles/{profile_id}")
+async def get_request_profile(profile_id: str, authorization: Optional[str] = Header(None)):
+    """Download a per-request cProfile (.prof, readable with pstats or snakeviz)."""
+    require_admin(authorization)
+    path = profiling.profile_path(profile_id)
+    if path is None:
+        raise HTTPException(status_code=404, detail="Profile not found")
+    return FileResponse(path, media_type="application/octet-stream", filename=f"{profile_id}.prof")
+
+@app.get("/admin/models")
+async def get_model_health(authorization: Optional[str] = Header(None)):
+    """Configured models and the observed health of every model called so far."""
+    require_admin(authorization)
+    router = get_router()
+    return {
+        "agents": {agent.name: agent.model for agent in [triage_agent, *specialist_agents.values()]},
+        "tools": router.tools,
+        "fallbacks": router.fallbacks,
+        "health": router.status(),
+    }
+
+@app.get("/assets/{name}")
+async def get_asset(name: str):
+    # Assets are content-addressed, so they never change and can be cached forever.
+    # FileResponse handles ETag/Last-Modified and Range requests.
+    path = get_asset_store().path_for(name)
+    if path is None or not os.path.exists(path):
+        raise HTTPException(status_code=404, detail="Asset not found")
+    return FileResponse(path, headers={"Cache-Control": "public, max-age=31536000, immutable"})
 
 @app.websocket("/ws")
 async def websocket_endpoint(websocket: WebSocket):
+    # Every turn of a session opened with X-Profile is profiled (admins only)
+    profile_turns = bool(websocket.headers.get("x-profile"))
+    if profile_turns and not profiling.is_admin(websocket.headers.get("authorization")):
+        await websocket.close(code=status.WS_1008_POLICY_VIOLATION)
+        return
+    # Browsers cannot set headers on websockets, so the API key may also come as ?api_key=
+    usage = get_usage_tracker()
+    tenant = usage.tenant_for(websocket.headers.get("x-api-key") or websocket.query_params.get("api_key"))
+    if tenant is None:
+        await websocket.close(code=status.WS_1008_POLICY_VIOLATION)
+        return
     await websocket.accept()
     agent = triage_agent
+    session_id = uuid.uuid4().hex
+    loop = asyncio.get_running_loop()
+    outbox: asyncio.Queue = asyncio.Queue()
+
+    # All frames go through one queue so tool output sent from worker threads
+    # stays ordered with the model's content frames.
+    def send_frame(frame: Dict[str, Any]):
+        loop.call_soon_threadsafe(outbox.put_nowait, frame)
+
+    async def sender():
+        while True:
+            frame = await outbox.get()
+            text = json.dumps(frame, separators=(",", ":"))
+            await websocket.send_text(text)
+            metrics.WEBSOCKET_FRAMES.inc(type=frame.get("type", ""))
+            metrics.WEBSOCKET_BYTES.inc(len(text.encode("utf-8")))
+
+    recorder = get_recorder()
+    # Turns starting at triage also start the likely specialist (SPECULATE=1)
+    speculate = speculation.enabled()
+    last_specialist = None
+    usage.start_session(session_id, tenant)
+    register_session(session_id, send_frame)
+    sender_task = asyncio.create_task(sender())
+    metrics.ACTIVE_SESSIONS.inc()
 
     try:
         while True:
@@ -195,28 +446,62 @@ async def websocket_endpoint(websocket: WebSocket):
             messages = [{"role": msg["role"], "content": msg["content"]} for msg in history]
             messages.append({"role": "user", "content": message})
 
-            async def process_stream():
-                stream = client.run(agent=agent, messages=messages, stream=True, debug=True)
-                current_agent_name = None
-                for chunk in stream:
-                    if isinstance(chunk, dict):
-                        if 'sender' in chunk and chunk['sender'] != current_agent_name:
-                            current_agent_name = chunk['sender']
-                            await websocket.send_json({"type": "agent_change", "agent": current_agent_name})
-                        if 'content' in chunk and chunk['content'] is not None:
-                            await websocket.send_json({"type": "content", "content": chunk['content']})
-                    await asyncio.sleep(0)
-
-            # Create a new task for processing the stream
-            await asyncio.create_task(process_stream())
-
-            response = client.run(agent=agent, messages=messages)
-            agent = response.agent
-
-            await websocket.send_json({"type": "end", "agent": agent.name})
+            received = time.perf_counter()
+
+            def run_turn(active_agent):
+                # Runs in a worker thread so blocking tools never stall the event loop
+                metrics.TURN_QUEUE_WAIT.observe(time.perf_counter() - received)
+                set_current_session(session_id)
+                usage.begin_turn(session_id)
+                recorder.start_turn(session_id, message, history, active_agent.name)
+                final_agent = active_agent
+                try:
+                    with request_profile(profile_turns) as profile, \
+                            tracing.span(active_agent.name, "turn", transport="websocket", session_id=session_id,
+                                         history=len(messages) - 1) as span:
+                        response = None
+                        try:
+                            if speculate and active_agent is triage_agent:
+                                response = run_speculative(messages, send_frame, last_specialist, span)
+                            else:
+                                response = relay(client.run(agent=active_agent, messages=messages, stream=True,
+                                                            debug=True), send_frame)
+                        except BudgetExceeded as e:
+                            # Refused before or part-way through the turn; the session stays open
+                            span.set(budget_exceeded=True)
+                            send_frame({"type": "content", "content": f"{e}."})
+                        if response is not None:
+                            final_agent = response.agent
+                            span.set(final_agent=final_agent.name)
+                    return response, span.trace_id, profile
+                finally:
+                    recorder.end_turn(session_id, final_agent.name, time.perf_counter() - received)
+
+            response, trace_id, profile = await asyncio.to_thread(run_turn, agent)
+            metrics.TURN_DURATION.observe(time.perf_counter() - received, transport="websocket")
+            if response is not None:
+                agent = response.agent
+                senders = [m.get("sender") for m in response.messages if m.get("sender") in specialist_agents]
+                last_specialist = senders[-1] if senders else last_specialist
+
+            end_frame = {"type": "end", "agent": agent.name, "trace_id": trace_id, "usage": usage.summary(session_id)}
+            if profile is not None and profile.active:
+                end_frame["profile_id"] = profile.profile_id
+            send_frame(end_frame)
 
     except WebSocketDisconnect:
         print("WebSocket disconnected")
+    finally:
+        metrics.ACTIVE_SESSIONS.dec()
+        unregister_session(session_id)
+        if is_loaded("run_python_script"):
+            # The Python pool only exists once code tools have been used
+            from tools.code_tools import release_python_session
+            release_python_session(session_id)
+        recorder.end_session(session_id)
+        usage.end_session(session_id)
+        get_make_handler().forget_session(session_id)
+        sender_task.cancel()
 
 if __name__ == "__main__":
     import uvicorn
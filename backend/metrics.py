@@ -0,0 +1,195 @@
+# backend/metrics.py
+
+import bisect
+import math
+import threading
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+
+# Latency buckets in seconds, from fast tool calls up to long research/Make.com runs
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0, 300.0)
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+def _format_labels(names: Sequence[str], values: Sequence[str], extra: Optional[Tuple[str, str]] = None) -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(f'{extra[0]}="{extra[1]}"')
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+def _format_value(value: float) -> str:
+    if math.isinf(value):
+        return "+Inf"
+    return repr(float(value)) if not float(value).is_integer() else str(int(value))
+
+class _Metric:
+    kind = ""
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> None:
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+
+    def _key(self, labels: Dict[str, str]) -> Tuple[str, ...]:
+        return tuple(str(labels.get(name, "")) for name in self.labelnames)
+
+    def render(self) -> List[str]:
+        return [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"] + self._samples()
+
+    def _samples(self) -> List[str]:
+        raise NotImplementedError
+
+class Counter(_Metric):
+    """Monotonically increasing value per label set."""
+    kind = "counter"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> None:
+        super().__init__(name, documentation, labelnames)
+        self._values: Dict[Tuple[str, ...], float] = {}
+
+    def inc(self, amount: float = 1.0, **labels: str) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def set_total(self, value: float, **labels: str) -> None:
+        """Take the count from a total kept elsewhere, e.g. by a cache; used from collectors."""
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = value
+
+    def _samples(self) -> List[str]:
+        with self._lock:
+            items = list(self._values.items())
+        return [f"{self.name}{_format_labels(self.labelnames, key)} {_format_value(value)}" for key, value in items]
+
+class Gauge(Counter):
+    """Value per label set that can go up and down."""
+    kind = "gauge"
+
+    def dec(self, amount: float = 1.0, **labels: str) -> None:
+        self.inc(-amount, **labels)
+
+    def set(self, value: float, **labels: str) -> None:
+        self.set_total(value, **labels)
+
+class Histogram(_Metric):
+    """Cumulative bucket counts, sum and count of observations per label set."""
+    kind = "histogram"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                 buckets: Sequence[float] = DEFAULT_BUCKETS) -> None:
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+        # Per label set: [count per bucket (last is +Inf)], sum
+        self._values: Dict[Tuple[str, ...], Tuple[List[int], List[float]]] = {}
+
+    def observe(self, value: float, **labels: str) -> None:
+        key = self._key(labels)
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            entry = self._values.get(key)
+            if entry is None:
+                entry = ([0] * (len(self.buckets) + 1), [0.0])
+                self._values[key] = entry
+            entry[0][index] += 1
+            entry[1][0] += value
+
+    def _samples(self) -> List[str]:
+        with self._lock:
+            items = [(key, list(counts), total[0]) for key, (counts, total) in self._values.items()]
+        lines = []
+        for key, counts, total in items:
+            cumulative = 0
+            for bound, count in zip(self.buckets + (math.inf,), counts):
+                cumulative += count
+                lines.append(f"{self.name}_bucket{_format_labels(self.labelnames, key, ('le', _format_value(bound)))} {cumulative}")
+            lines.append(f"{self.name}_sum{_format_labels(self.labelnames, key)} {_format_value(total)}")
+            lines.append(f"{self.name}_count{_format_labels(self.labelnames, key)} {cumulative}")
+        return lines
+
+class Registry:
+    """Collection of metrics rendered together in the Prometheus text format."""
+
+    def __init__(self) -> None:
+        self._metrics: List[_Metric] = []
+        self._collectors: List[Callable[[], None]] = []
+        self._lock = threading.Lock()
+
+    def register(self, metric: _Metric) -> _Metric:
+        with self._lock:
+            self._metrics.append(metric)
+        return metric
+
+    def add_collector(self, collector: Callable[[], None]) -> None:
+        """Run collector before each render, to copy values kept elsewhere into metrics."""
+        with self._lock:
+            self._collectors.append(collector)
+
+    def counter(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> Counter:
+        return self.register(Counter(name, documentation, labelnames))
+
+    def gauge(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> Gauge:
+        return self.register(Gauge(name, documentation, labelnames))
+
+    def histogram(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                  buckets: Sequence[float] = DEFAULT_BUCKETS) -> Histogram:
+        return self.register(Histogram(name, documentation, labelnames, buckets))
+
+    def render(self) -> str:
+        with self._lock:
+            metrics = list(self._metrics)
+            collectors = list(self._collectors)
+        for collector in collectors:
+            collector()
+        lines = []
+        for metric in metrics:
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+REGISTRY = Registry()
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+TURN_QUEUE_WAIT = REGISTRY.histogram(
+    "swarm_turn_queue_wait_seconds", "Time between receiving a message and its turn starting on a worker thread")
+TURN_DURATION = REGISTRY.histogram(
+    "swarm_turn_duration_seconds", "Wall-clock duration of a conversation turn", ["transport"])
+LLM_TIME_TO_FIRST_TOKEN = REGISTRY.histogram(
+    "swarm_llm_time_to_first_token_seconds", "Time from sending a streaming completion request to its first chunk",
+    ["agent", "model"])
+LLM_DURATION = REGISTRY.histogram(
+    "swarm_llm_request_duration_seconds", "Duration of a chat completion request, including streaming", ["agent", "model"])
+LLM_ERRORS = REGISTRY.counter(
+    "swarm_llm_errors_total", "Chat completion requests that raised", ["agent", "model"])
+LLM_TOKENS = REGISTRY.counter(
+    "swarm_llm_tokens_total", "Tokens reported by the API", ["agent", "model", "direction"])
+TOOL_DURATION = REGISTRY.histogram(
+    "swarm_tool_duration_seconds", "Duration of tool calls", ["tool"])
+TOOL_CALLS = REGISTRY.counter(
+    "swarm_tool_calls_total", "Tool calls by outcome", ["tool", "status"])
+MODEL_FALLBACKS = REGISTRY.counter(
+    "swarm_model_fallbacks_total", "Calls sent to a fallback model, because the configured one was degraded or failed",
+    ["from_model", "to_model", "cause"])
+SPECULATIONS = REGISTRY.counter(
+    "swarm_speculations_total", "Speculative specialist runs by outcome (hit, miss, skipped)", ["agent", "outcome"])
+SPECULATION_SAVED = REGISTRY.histogram(
+    "swarm_speculation_saved_seconds", "Specialist work already done when triage chose it", ["agent"])
+HISTORY_PRUNED_CHARS = REGISTRY.counter(
+    "swarm_history_pruned_chars_total", "Characters of other agents' tool traffic left out of requests", ["agent"])
+HANDOFFS = REGISTRY.counter(
+    "swarm_handoffs_total", "Transfers between agents", ["from_agent", "to_agent"])
+WEBSOCKET_FRAMES = REGISTRY.counter(
+    "swarm_websocket_frames_total", "Websocket frames sent to clients", ["type"])
+WEBSOCKET_BYTES = REGISTRY.counter(
+    "swarm_websocket_bytes_total", "Bytes of websocket frames sent to clients")
+ACTIVE_SESSIONS = REGISTRY.gauge(
+    "swarm_active_sessions", "Open websocket sessions")
+IMAGE_CACHE_LOOKUPS = REGISTRY.counter(
+    "swarm_image_cache_lookups_total", "Image analysis cache lookups by result (hit, disk_hit, miss)", ["result"])
+IMAGE_CACHE_EVICTIONS = REGISTRY.counter(
+    "swarm_image_cache_evictions_total", "Entries evicted from the image analysis cache's memory tier")
+IMAGE_CACHE_ENTRIES = REGISTRY.gauge(
+    "swarm_image_cache_entries", "Entries in the image analysis cache's memory tier")
+IMAGE_CACHE_BYTES = REGISTRY.gauge(
+    "swarm_image_cache_memory_bytes", "Serialized size of the image analysis cache's memory tier")
@@ -0,0 +1,203 @@
+# backend/profiling.py
+
+import collections
+import concurrent.futures
+import cProfile
+import hmac
+import os
+import re
+import sys
+import threading
+import time
+import uuid
+from typing import Dict, Optional, Tuple
+
+MAX_SECONDS = float(os.environ.get("PROFILE_MAX_SECONDS", "60"))
+MAX_HZ = 250
+DEFAULT_PROFILE_DIR = "profiles"
+MAX_PROFILE_FILES = int(os.environ.get("PROFILE_MAX_FILES", "50"))
+
+# Leaf frames of threads that are blocked waiting rather than working
+IDLE_FRAMES = {
+    ("threading.py", "wait"),
+    ("threading.py", "_wait_for_tstate_lock"),
+    ("selectors.py", "select"),
+    ("thread.py", "_worker"),
+    ("queue.py", "get"),
+    ("socket.py", "accept"),
+}
+
+class ProfilerBusy(Exception):
+    """Raised when a profile of the same kind is already running."""
+    pass
+
+def is_admin(authorization: Optional[str]) -> Optional[bool]:
+    """
+    Check an Authorization header against ADMIN_TOKEN.
+
+    Returns:
+        Optional[bool]: None if no ADMIN_TOKEN is configured (admin endpoints are
+            disabled), otherwise whether the header carries the token as a bearer token
+    """
+    token = os.environ.get("ADMIN_TOKEN")
+    if not token:
+        return None
+    scheme, _, value = (authorization or "").partition(" ")
+    return scheme.lower() == "bearer" and hmac.compare_digest(value.strip().encode(), token.encode())
+
+def _thread_label(name: str) -> str:
+    # Pool threads differ only by a numeric suffix; merging them keeps one tree per pool
+    return re.sub(r"[_-]\d+$", "", name).replace(";", ":").replace(" ", "_")
+
+def _frame_label(code) -> str:
+    path = code.co_filename.replace("\\", "/").split("/")
+    return f"{code.co_name} ({'/'.join(path[-2:])}:{code.co_firstlineno})".replace(";", ":")
+
+class StackSampler:
+    """
+    Samples the Python stacks of all threads at a fixed rate.
+
+    Each sample reads sys._current_frames() from a dedicated thread. No
+    tracing hooks are installed, so profiled threads (the event loop and
+    the Swarm worker threads) run at full speed. Stacks are counted per
+    function, not per line, so the output stays compact.
+
+    Attributes:
+        hz (float): Samples per second
+        include_idle (bool): Keep stacks of threads blocked in a wait
+        samples (int): Number of sampling rounds taken
+    """
+
+    def __init__(self, hz: float = 100, include_idle: bool = False) -> None:
+        self.hz = min(max(hz, 1), MAX_HZ)
+        self.include_idle = include_idle
+        self.samples = 0
+        self.counts: Dict[Tuple[str, ...], int] = collections.Counter()
+        self._labels: Dict[object, str] = {}
+
+    def _label(self, code) -> str:
+        label = self._labels.get(code)
+        if label is None:
+            label = self._labels[code] = _frame_label(code)
+        return label
+
+    def sample_once(self) -> None:
+        me = threading.get_ident()
+        names = {thread.ident: thread.name for thread in threading.enumerate()}
+        for ident, frame in sys._current_frames().items():
+            if ident == me:
+                continue
+            code = frame.f_code
+            if not self.include_idle and (os.path.basename(code.co_filename), code.co_name) in IDLE_FRAMES:
+                continue
+            stack = []
+            while frame is not None:
+                stack.append(self._label(frame.f_code))
+                frame = frame.f_back
+            stack.append(_thread_label(names.get(ident, str(ident))))
+            self.counts[tuple(reversed(stack))] += 1
+        self.samples += 1
+
+    def run(self, seconds: float) -> None:
+        interval = 1 / self.hz
+        deadline = time.perf_counter() + min(seconds, MAX_SECONDS)
+        next_sample = time.perf_counter()
+        while next_sample < deadline:
+            self.sample_once()
+            next_sample += interval
+            delay = next_sample - time.perf_counter()
+            if delay > 0:
+                time.sleep(delay)
+            else:
+                # Fell behind (e.g. a very busy process): skip missed samples rather than burst
+                next_sample = time.perf_counter()
+
+    def collapsed(self) -> str:
+        """Stacks in the collapsed format read by flamegraph.pl, speedscope and inferno."""
+        lines = [f"{';'.join(stack)} {count}" for stack, count in sorted(self.counts.items())]
+        return "\n".join(lines) + "\n"
+
+_sampler_lock = threading.Lock()
+
+def sample_stacks(seconds: float, hz: float = 100, include_idle: bool = False) -> concurrent.futures.Future:
+    """
+    Sample all threads for a number of seconds on a background thread.
+
+    Only one sampling run is allowed at a time.
+
+    Args:
+        seconds (float): Duration, capped at PROFILE_MAX_SECONDS
+        hz (float): Samples per second, capped at 250
+        include_idle (bool): Keep stacks of threads blocked in a wait
+
+    Returns:
+        Future: Resolves to the StackSampler once sampling is done
+
+    Raises:
+        ProfilerBusy: If another sampling run is in progress
+    """
+    if not _sampler_lock.acquire(blocking=False):
+        raise ProfilerBusy("A sampling profile is already running")
+    future: concurrent.futures.Future = concurrent.futures.Future()
+    sampler = StackSampler(hz, include_idle)
+
+    def run():
+        try:
+            sampler.run(seconds)
+            future.set_result(sampler)
+        except Exception as e:
+            future.set_exception(e)
+        finally:
+            _sampler_lock.release()
+
+    threading.Thread(target=run, name="stack-sampler", daemon=True).start()
+    return future
+
+_cprofile_lock = threading.Lock()
+
+class RequestProfile:
+    """
+    Deterministic profile (cProfile) of one request, on the thread that handles it.
+
+    cProfile allows one active profiler per process, so a request that asks for
+    a profile while another is being profiled runs unprofiled (`active` is False).
+    Profiles are saved to PROFILE_DIR as .prof files (pstats/snakeviz format),
+    keeping the newest PROFILE_MAX_FILES.
+    """
+
+    def __init__(self) -> None:
+        self.profile_id = uuid.uuid4().hex[:16]
+        self.active = False
+        self._profile: Optional[cProfile.Profile] = None
+
+    def __enter__(self) -> "RequestProfile":
+        if _cprofile_lock.acquire(blocking=False):
+            self.active = True
+            self._profile = cProfile.Profile()
+            self._profile.enable()
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        if not self.active:
+            return
+        try:
+            self._profile.disable()
+        finally:
+            _cprofile_lock.release()
+        directory = profile_dir()
+        os.makedirs(directory, exist_ok=True)
+        self._profile.dump_stats(os.path.join(directory, f"{self.profile_id}.prof"))
+        saved = sorted((entry for entry in os.scandir(directory) if entry.name.endswith(".prof")),
+                       key=lambda entry: entry.stat().st_mtime)
+        for entry in saved[:max(0, len(saved) - MAX_PROFILE_FILES)]:
+            os.remove(entry.path)
+
+def profile_dir() -> str:
+    return os.path.abspath(os.environ.get("PROFILE_DIR", DEFAULT_PROFILE_DIR))
+
+def profile_path(profile_id: str) -> Optional[str]:
+    """Path of a saved request profile, or None for unknown or malformed ids."""
+    if not re.fullmatch(r"[0-9a-f]{16}", profile_id):
+        return None
+    path = os.path.join(profile_dir(), f"{profile_id}.prof")
+    return path if os.path.exists(path) else None
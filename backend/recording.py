@@ -0,0 +1,186 @@
+# backend/recording.py
+
+import gzip
+import json
+import logging
+import os
+import threading
+import time
+from typing import Any, Dict, List, Optional
+
+FORMAT_VERSION = 1
+
+logger = logging.getLogger(__name__)
+
+def compact_chunk(chunk) -> Any:
+    """
+    Reduce a streamed completion chunk to what Swarm reads from it.
+
+    Content-only chunks become the bare string; others a dict with the keys
+    "c" (content), "tc" (tool call deltas) and "f" (finish reason) when set.
+    """
+    choice = chunk.choices[0]
+    delta = choice.delta
+    tool_calls = [call.model_dump(exclude_none=True) for call in delta.tool_calls] if delta.tool_calls else None
+    if delta.content is not None and not tool_calls and not choice.finish_reason:
+        return delta.content
+    payload = {}
+    if delta.content is not None:
+        payload["c"] = delta.content
+    if tool_calls:
+        payload["tc"] = tool_calls
+    if choice.finish_reason:
+        payload["f"] = choice.finish_reason
+    return payload
+
+class SessionRecorder:
+    """
+    Records websocket sessions for offline replay (see benchmarks/replay.py).
+
+    Each session is written to RECORD_DIR as gzip-compressed JSON lines: a
+    "session" header, then per turn a "turn" event with the user message,
+    the "llm" completions (streamed chunks with their arrival times), the
+    "tool" calls with arguments and results, and an "end" event. Times
+    ("t") are seconds since the session started. Events are buffered per
+    turn and appended as one gzip member when the turn ends, so a crash
+    loses at most the turn in progress.
+
+    Recording is off unless RECORD_DIR is set. Recordings contain the full
+    conversation, so treat them like chat logs.
+    """
+
+    def __init__(self, directory: Optional[str]) -> None:
+        self.directory = os.path.abspath(directory) if directory else None
+        self._sessions: Dict[str, Dict[str, Any]] = {}
+        self._lock = threading.Lock()
+
+    @property
+    def enabled(self) -> bool:
+        return self.directory is not None
+
+    def start_turn(self, session_id: str, message: str, history: List[Dict[str, str]], agent: str) -> None:
+        if not self.enabled:
+            return
+        with self._lock:
+            session = self._sessions.get(session_id)
+            if session is None:
+                started = time.time()
+                name = f"{time.strftime('%Y%m%d-%H%M%S', time.localtime(started))}-{session_id}.jsonl.gz"
+                session = {
+                    "path": os.path.join(self.directory, name),
+                    "started": started,
+                    "turns": 0,
+                    "events": [{"type": "session", "version": FORMAT_VERSION, "session_id": session_id,
+                                "started": started}],
+                }
+                self._sessions[session_id] = session
+            event = {"type": "turn", "t": self._offset(session), "turn": session["turns"], "agent": agent,
+                     "message": message, "history_len": len(history)}
+            # Later turns' history is what the client accumulated from earlier turns, which a
+            # replay rebuilds the same way; only a session that starts mid-conversation needs it
+            if session["turns"] == 0 and history:
+                event["history"] = history
+            session["events"].append(event)
+            session["turns"] += 1
+
+    @staticmethod
+    def _offset(session: Dict[str, Any], at: Optional[float] = None) -> float:
+        return round((at or time.time()) - session["started"], 3)
+
+    def _append(self, session_id: str, event: Dict[str, Any], at: Optional[float] = None) -> None:
+        with self._lock:
+            session = self._sessions.get(session_id)
+            if session is not None:
+                event["t"] = self._offset(session, at)
+                session["events"].append(event)
+
+    def record_llm(self, session_id: str, agent: str, model: str, started: float, duration: float,
+                   chunks: Optional[List[List[Any]]] = None, message: Optional[Dict[str, Any]] = None,
+                   usage: Optional[Dict[str, int]] = None) -> None:
+        """
+        Record one chat completion.
+
+        Args:
+            session_id (str): Session the completion belongs to
+            agent (str): Agent name
+            model (str): Model requested
+            started (float): time.time() when the request was sent
+            duration (float): Seconds until the completion finished
+            chunks (Optional[List]): [milliseconds since the request, compact_chunk(chunk)] per streamed chunk
+            message (Optional[Dict]): Assistant message of a non-streaming completion
+            usage (Optional[Dict]): Token usage reported by the API
+        """
+        if not self.enabled:
+            return
+        event = {"type": "llm", "agent": agent, "model": model, "duration": round(duration, 3)}
+        if chunks is not None:
+            event["chunks"] = chunks
+        if message is not None:
+            event["message"] = message
+        if usage:
+            event["usage"] = usage
+        self._append(session_id, event, started)
+
+    def record_tool(self, session_id: str, name: str, agent: str, arguments: Dict[str, Any], result: Any,
+                    started: float, duration: float, handoff: Optional[str] = None) -> None:
+        if not self.enabled:
+            return
+        event = {"type": "tool", "name": name, "agent": agent, "args": arguments, "duration": round(duration, 3)}
+        if handoff is not None:
+            event["handoff"] = handoff
+        else:
+            # Swarm passes str() of non-Agent results to the model, so that is all a replay needs
+            event["result"] = result if isinstance(result, str) else str(result)
+        self._append(session_id, event, started)
+
+    def end_turn(self, session_id: str, agent: str, duration: float) -> None:
+        if not self.enabled:
+            return
+        with self._lock:
+            session = self._sessions.get(session_id)
+            if session is None:
+                return
+            session["events"].append({"type": "end", "t": self._offset(session), "agent": agent,
+                                      "duration": round(duration, 3)})
+            events, session["events"] = session["events"], []
+            path = session["path"]
+        try:
+            os.makedirs(self.directory, exist_ok=True)
+            with gzip.open(path, "at", encoding="utf-8") as f:
+                f.write("".join(json.dumps(event, separators=(",", ":"), default=str) + "\n" for event in events))
+        except OSError as e:
+            logger.warning(f"Could not write recording {path}: {str(e)}")
+
+    def end_session(self, session_id: str) -> None:
+        with self._lock:
+            self._sessions.pop(session_id, None)
+
+def load_recording(path: str) -> Dict[str, Any]:
+    """
+    Read a recorded session.
+
+    Returns:
+        Dict[str, Any]: The "session" header with a "turns" list; each turn is its
+            "turn" event with an "events" list (llm and tool events) and, if the
+            turn finished, its "end" event
+    """
+    session: Dict[str, Any] = {"turns": []}
+    with gzip.open(path, "rt", encoding="utf-8") as f:
+        for line in f:
+            event = json.loads(line)
+            kind = event["type"]
+            if kind == "session":
+                session.update(event, turns=session["turns"], path=path)
+            elif kind == "turn":
+                session["turns"].append(dict(event, events=[]))
+            elif kind == "end":
+                if session["turns"]:
+                    session["turns"][-1]["end"] = event
+            elif session["turns"]:
+                session["turns"][-1]["events"].append(event)
+    return session
+
+_recorder = SessionRecorder(os.environ.get("RECORD_DIR"))
+
+def get_recorder() -> SessionRecorder:
+    return _recorder
@@ -0,0 +1,301 @@
+# backend/runner.py
+
+import functools
+import json
+import time
+from collections import defaultdict
+from typing import Any, Callable, Dict, Iterator, List
+
+from swarm import Agent, Swarm
+from swarm.util import debug_print, function_to_json
+
+import handoff
+import metrics
+import recording
+import speculation
+import tracing
+from tools.model_router import get_router, is_failover_error
+from tools.runtime import get_current_session
+from tools.usage import get_usage_tracker, reset_current_tool, set_current_tool
+
+CTX_VARS_NAME = "context_variables"
+
+class InstrumentedSwarm(Swarm):
+    """
+    Swarm client that measures and traces every chat completion.
+
+    Overrides get_chat_completion, the single place Swarm calls the API, to record
+    request duration, time to first token and token usage per agent, an "llm"
+    span in the current trace and, when recording is on, the completion itself.
+    Each agent sees a scoped history (see handoff.scope_history) in which other
+    agents' tool traffic is summarized; Swarm itself keeps the full conversation.
+    Usage is charged to the session's budget, which may swap the model for a
+    cheaper one, shorten the history, or refuse the call with BudgetExceeded.
+    The model router sees every call's TTFT and the failures that are the
+    model's fault (is_failover_error): calls skip models it considers degraded,
+    and a request that fails with a connection error, rate limit or 5xx is
+    retried once per fallback model. Bad requests are raised at once. Streaming
+    requests ask the API to append a usage chunk (stream_options.include_usage);
+    that chunk has no choices and is consumed here, since Swarm's stream loop
+    expects every chunk to carry one.
+    """
+
+    def __init__(self, client=None):
+        super().__init__(client)
+        self._tool_schemas: Dict[Callable, Dict[str, Any]] = {}
+
+    def _tool_schema(self, function: Callable) -> Dict[str, Any]:
+        # Function schemas never change, so build each one once instead of on every request
+        schema = self._tool_schemas.get(function)
+        if schema is None:
+            schema = function_to_json(function)
+            # hide context_variables from model
+            params = schema["function"]["parameters"]
+            params["properties"].pop(CTX_VARS_NAME, None)
+            if CTX_VARS_NAME in params["required"]:
+                params["required"].remove(CTX_VARS_NAME)
+            self._tool_schemas[function] = schema
+        return schema
+
+    def build_request(self, agent: Agent, history: List, context_variables: dict, model_override: str,
+                      stream: bool) -> Dict[str, Any]:
+        """Build the chat.completions.create parameters for an agent, as Swarm does, within the session's budget."""
+        speculation.check_cancelled()
+        tracker = get_usage_tracker()
+        tracker.check()
+        context_variables = defaultdict(str, context_variables)
+        instructions = (
+            agent.instructions(context_variables)
+            if callable(agent.instructions)
+            else agent.instructions
+        )
+        if handoff.enabled():
+            scoped = handoff.scope_history(agent.name, {f.__name__ for f in agent.functions}, history)
+            pruned = handoff.history_chars(history) - handoff.history_chars(scoped)
+            if pruned > 0:
+                metrics.HISTORY_PRUNED_CHARS.inc(pruned, agent=agent.name)
+            history = scoped
+        messages = [{"role": "system", "content": instructions}] + _trim_history(history, tracker.context_limit())
+        tools = [self._tool_schema(f) for f in agent.functions]
+
+        configured = model_override or agent.model
+        model = get_router().route(configured)
+        if model != configured:
+            metrics.MODEL_FALLBACKS.inc(from_model=configured, to_model=model, cause="degraded")
+
+        create_params = {
+            "model": tracker.model_for(model),
+            "messages": messages,
+            "tools": tools or None,
+            "tool_choice": agent.tool_choice,
+            "stream": stream,
+        }
+        if tools:
+            create_params["parallel_tool_calls"] = agent.parallel_tool_calls
+        if stream:
+            create_params["stream_options"] = {"include_usage": True}
+        return create_params
+
+    def get_chat_completion(self, agent: Agent, history: List, context_variables: dict, model_override: str,
+                            stream: bool, debug: bool):
+        create_params = self.build_request(agent, history, context_variables, model_override, stream)
+        debug_print(debug, "Getting chat completion for...:", create_params["messages"])
+
+        router = get_router()
+        tracker = get_usage_tracker()
+        # Later entries are only tried if the ones before them fail
+        models = list(dict.fromkeys([create_params["model"]] + [
+            tracker.model_for(model) for model in router.chain(create_params["model"])]))
+        recorder = recording.get_recorder()
+        session_id = get_current_session() if recorder.enabled else None
+        for attempt, model in enumerate(models):
+            create_params["model"] = model
+            labels = {"agent": agent.name, "model": model}
+            # Not made current: tool calls run after the stream is consumed and belong to the turn
+            span = tracing.start_span(agent.name, "llm", activate=False, model=model,
+                                      messages=len(create_params["messages"]), stream=stream)
+            started = time.time()
+            start = time.perf_counter()
+            try:
+                completion = self.client.chat.completions.create(**create_params)
+                break
+            except Exception as e:
+                metrics.LLM_ERRORS.inc(**labels)
+                span.finish(e)
+                if not is_failover_error(e):
+                    raise
+                router.observe(model, error=True)
+                if attempt == len(models) - 1:
+                    raise
+                metrics.MODEL_FALLBACKS.inc(from_model=model, to_model=models[attempt + 1], cause="error")
+        if stream:
+            return self._measure_stream(completion, labels, start, span, session_id, started)
+
+        duration = time.perf_counter() - start
+        metrics.LLM_DURATION.observe(duration, **labels)
+        router.observe(labels["model"])
+        usage = getattr(completion, "usage", None)
+        self._record_usage(usage, labels, span)
+        span.finish()
+        if session_id is not None:
+            message = completion.choices[0].message.model_dump(exclude_none=True)
+            speculation.run_or_defer(lambda: recorder.record_llm(
+                session_id, labels["agent"], labels["model"], started, duration, message=message,
+                usage=usage.model_dump(exclude_none=True) if usage else None))
+        return completion
+
+    def _measure_stream(self, completion, labels: Dict[str, str], start: float, span: tracing.Span,
+                        session_id: str = None, started: float = 0.0) -> Iterator[Any]:
+        first_chunk = True
+        error = None
+        chunks = [] if session_id is not None else None
+        usage = None
+        try:
+            for chunk in completion:
+                # A speculative run stops streaming (and paying for) tokens once it is cancelled
+                speculation.check_cancelled()
+                if chunk.usage is not None:
+                    usage = chunk.usage
+                    self._record_usage(chunk.usage, labels, span)
+                if not chunk.choices:
+                    continue
+                if first_chunk:
+                    ttft = time.perf_counter() - start
+                    metrics.LLM_TIME_TO_FIRST_TOKEN.observe(ttft, **labels)
+                    get_router().observe(labels["model"], ttft=ttft)
+                    span.set(ttft_ms=round(ttft * 1000, 3))
+                    first_chunk = False
+                if chunks is not None:
+                    chunks.append([round((time.perf_counter() - start) * 1000), recording.compact_chunk(chunk)])
+                yield chunk
+        except speculation.SpeculationCancelled as e:
+            getattr(completion, "close", lambda: None)()
+            error = e
+            raise
+        except Exception as e:
+            metrics.LLM_ERRORS.inc(**labels)
+            if is_failover_error(e):
+                get_router().observe(labels["model"], error=True)
+            error = e
+            raise
+        finally:
+            duration = time.perf_counter() - start
+            metrics.LLM_DURATION.observe(duration, **labels)
+            span.finish(error)
+            if chunks is not None and error is None:
+                speculation.run_or_defer(lambda: recording.get_recorder().record_llm(
+                    session_id, labels["agent"], labels["model"], started, duration, chunks=chunks,
+                    usage=usage.model_dump(exclude_none=True) if usage else None))
+
+    @staticmethod
+    def _record_usage(usage, labels: Dict[str, str], span: tracing.Span) -> None:
+        if usage is None:
+            return
+        metrics.LLM_TOKENS.inc(usage.prompt_tokens or 0, direction="prompt", **labels)
+        metrics.LLM_TOKENS.inc(usage.completion_tokens or 0, direction="completion", **labels)
+        span.set(prompt_tokens=usage.prompt_tokens or 0, completion_tokens=usage.completion_tokens or 0)
+        cost = get_usage_tracker().record(labels["model"], usage.prompt_tokens or 0, usage.completion_tokens or 0,
+                                          agent=labels["agent"])
+        span.set(cost_usd=round(cost, 6))
+
+def _trim_history(history: List, limit: int = None) -> List:
+    """
+    Keep roughly the last `limit` messages of a history.
+
+    The cut is moved back to the nearest user message so an assistant's
+    tool calls are never separated from their results, which the API rejects.
+    """
+    if limit is None or len(history) <= limit:
+        return history
+    start = len(history) - limit
+    while start > 0 and history[start].get("role") != "user":
+        start -= 1
+    return history[start:]
+
+def _tool_failed(result: Any) -> bool:
+    # Tools report most failures in their result rather than by raising
+    if isinstance(result, str):
+        return result.startswith("Error")
+    if isinstance(result, dict):
+        return "error" in result
+    return False
+
+def _size(value: Any) -> int:
+    if isinstance(value, str):
+        return len(value)
+    try:
+        return len(json.dumps(value, default=str))
+    except (TypeError, ValueError):
+        return len(str(value))
+
+def instrument_tool(func: Callable, agent_name: str) -> Callable:
+    """
+    Wrap a tool to record its latency and outcome, and handoffs it triggers.
+
+    Each call is traced as a "tool" span with the size of its arguments and
+    result; a call that returns an Agent is recorded as a "handoff" span instead.
+    When session recording is on, arguments and result are recorded too. Model
+    calls the tool makes itself are charged to it in the session's usage. In a
+    speculative run, tools with side effects wait until the run is committed.
+
+    The wrapper keeps the tool's name, docstring and signature (Swarm builds the
+    function schema from them), and accepts context_variables only if the tool does.
+
+    Args:
+        func (Callable): Tool function
+        agent_name (str): Agent the tool is attached to, used as the handoff source
+
+    Returns:
+        Callable: The instrumented tool
+    """
+    name = func.__name__
+
+    def call(*args, **kwargs):
+        speculation.guard_tool(name)
+        arguments = {key: value for key, value in kwargs.items() if key != CTX_VARS_NAME}
+        span = tracing.start_span(name, "tool", agent=agent_name, args_bytes=_size(arguments))
+        started = time.time()
+        start = time.perf_counter()
+        status = "error"
+        error = None
+        result = None
+        token = set_current_tool(name)
+        try:
+            result = func(*args, **kwargs)
+            status = "error" if _tool_failed(result) else "ok"
+            if isinstance(result, Agent):
+                metrics.HANDOFFS.inc(from_agent=agent_name, to_agent=result.name)
+                span.kind = "handoff"
+                span.set(to_agent=result.name)
+            else:
+                span.set(result_bytes=_size(result))
+            return result
+        except Exception as e:
+            error = e
+            raise
+        finally:
+            reset_current_tool(token)
+            duration = time.perf_counter() - start
+            metrics.TOOL_DURATION.observe(duration, tool=name)
+            metrics.TOOL_CALLS.inc(tool=name, status=status)
+            span.status = status
+            tracing.end_span(span, error)
+            recorder = recording.get_recorder()
+            if recorder.enabled:
+                if error is not None:
+                    result = f"Error: {type(error).__name__}: {error}"
+                session_id = get_current_session()
+                handoff = result.name if isinstance(result, Agent) else None
+                speculation.run_or_defer(lambda: recorder.record_tool(
+                    session_id, name, agent_name, arguments, result, started, duration, handoff=handoff))
+
+    # Swarm passes context_variables only to functions whose code declares it
+    if CTX_VARS_NAME in func.__code__.co_varnames:
+        @functools.wraps(func)
+        def wrapper(*args, context_variables=None, **kwargs):
+            return call(*args, context_variables=context_variables, **kwargs)
+    else:
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            return call(*args, **kwargs)
+    return wrapper
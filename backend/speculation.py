@@ -0,0 +1,207 @@
+# backend/speculation.py
+
+import contextvars
+import logging
+import os
+import re
+import threading
+import time
+from typing import Any, Callable, Dict, Iterable, List, Optional
+
+from tools.runtime import redirect_frames, watch_cancellation
+
+PENDING, COMMITTED, CANCELLED = "pending", "committed", "cancelled"
+
+# Tools a speculative run may not call before it is committed: their effects
+# cannot be taken back, or they cost too much to throw away on a miss
+DEFERRED_TOOLS = {
+    "execute_command",
+    "install_package",
+    "run_python_script",
+    "save_to_md",
+    "send_to_make",
+    "create_notion_page",
+    "create_notion_pages",
+    "update_notion_page",
+    "generate_image",
+    "analyze_image",
+    "reason_with_o1",
+    "generate_research_report",
+    "fetch_report",
+    "run_async",
+}
+
+# Words in a user message that point at a specialist; the agent with the most matches is predicted
+KEYWORDS: Dict[str, List[str]] = {
+    "Weather Agent": ["weather", "forecast", "temperature", "rain", "snow", "wind", "humidity", "sunny"],
+    "Code Agent": ["code", "python", "script", "bash", "shell", "command", "file", "function", "bug", "install",
+                   "package", "error", "debug"],
+    "Web Agent": ["search", "news", "website", "web", "url", "link", "youtube", "transcript", "latest"],
+    "Image Agent": ["image", "picture", "photo", "draw", "illustration", "logo", "png", "jpg"],
+    "Notion Agent": ["notion"],
+    "Make Agent": ["make.com", "webhook", "automation"],
+    "Research Agent": ["research", "report", "in-depth", "comprehensive"],
+    "Reasoning Agent": ["reason", "prove", "proof", "puzzle", "math", "logic", "riddle"],
+}
+
+logger = logging.getLogger(__name__)
+
+_current: contextvars.ContextVar[Optional["Speculation"]] = contextvars.ContextVar("speculation", default=None)
+
+class SpeculationCancelled(Exception):
+    """Raised inside a speculative run once triage has chosen another agent."""
+    pass
+
+def enabled() -> bool:
+    return os.environ.get("SPECULATE", "").lower() in ("1", "true", "yes")
+
+def predict(message: str, previous: Optional[str], agents: Iterable[str]) -> Optional[str]:
+    """
+    Guess the specialist triage will hand a message to.
+
+    Args:
+        message (str): The user's message
+        previous (Optional[str]): Specialist that handled the session's last turn
+        agents (Iterable[str]): Names of the agents that can be predicted
+
+    Returns:
+        Optional[str]: The agent with the most keyword matches, else the previous
+            specialist, else None (do not speculate)
+    """
+    agents = list(agents)
+    words = re.findall(r"[\w.-]+", message.lower())
+    scores = {name: sum(1 for word in words if word in KEYWORDS.get(name, ())) for name in agents}
+    best = max(agents, key=lambda name: scores[name], default=None)
+    if best is not None and scores[best] > 0:
+        return best
+    return previous if previous in agents else None
+
+def current() -> Optional["Speculation"]:
+    """The speculation the calling code runs in, if any."""
+    return _current.get()
+
+def check_cancelled() -> None:
+    spec = _current.get()
+    if spec is not None and spec.cancelled:
+        raise SpeculationCancelled()
+
+def guard_tool(name: str) -> None:
+    """Block a deferred tool in a speculative run until it is committed, or end the run if it is cancelled."""
+    spec = _current.get()
+    if spec is None:
+        return
+    if name in DEFERRED_TOOLS:
+        spec.wait_for_commit()
+    check_cancelled()
+
+def run_or_defer(action: Callable[[], None]) -> None:
+    """Run an action now, or hold it back until the current speculation is committed."""
+    spec = _current.get()
+    if spec is None:
+        action()
+    else:
+        spec.defer(action)
+
+class Speculation:
+    """
+    A specialist run started on a worker thread while triage is still deciding.
+
+    Everything the run would send to the client (content frames, tool output)
+    is held back, along with other actions passed to defer(), until triage has
+    chosen. If triage picks the same agent, commit() releases the held-back
+    actions in order and lets the run continue live; otherwise cancel() drops
+    them and the run stops at its next model chunk, tool call or piece of
+    streamed tool output. Tools in DEFERRED_TOOLS wait for the decision
+    before they run.
+
+    Attributes:
+        agent_name (str): Predicted specialist
+        response (Any): The run's result once it finishes
+        error (Optional[BaseException]): What the run raised, other than a cancellation
+    """
+
+    def __init__(self, agent_name: str, send: Callable[[Dict[str, Any]], None]) -> None:
+        self.agent_name = agent_name
+        self.response: Any = None
+        self.error: Optional[BaseException] = None
+        self._send = send
+        self._state = PENDING
+        self._pending: List[Callable[[], None]] = []
+        self._decided = threading.Condition()
+        self._started = 0.0
+        self._stalled: Optional[float] = None
+        self._finished: Optional[float] = None
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def cancelled(self) -> bool:
+        return self._state == CANCELLED
+
+    def start(self, run: Callable[["Speculation"], Any]) -> None:
+        """Call run(self) on a new thread, in a copy of the caller's context (session, trace)."""
+        def target():
+            _current.set(self)
+            redirect_frames(self.emit)
+            watch_cancellation(check_cancelled)
+            try:
+                self.response = run(self)
+            except SpeculationCancelled:
+                pass
+            except BaseException as e:
+                self.error = e
+            finally:
+                self._finished = time.perf_counter()
+
+        self._started = time.perf_counter()
+        context = contextvars.copy_context()
+        self._thread = threading.Thread(target=context.run, args=(target,), name="speculation", daemon=True)
+        self._thread.start()
+
+    def emit(self, frame: Dict[str, Any]) -> None:
+        self.defer(lambda: self._send(frame))
+
+    def defer(self, action: Callable[[], None]) -> None:
+        with self._decided:
+            if self._state == COMMITTED:
+                action()
+            elif self._state == PENDING:
+                self._pending.append(action)
+
+    def wait_for_commit(self) -> None:
+        with self._decided:
+            if self._state == PENDING and self._stalled is None:
+                self._stalled = time.perf_counter()
+            while self._state == PENDING:
+                self._decided.wait()
+            if self._state == CANCELLED:
+                raise SpeculationCancelled()
+
+    def commit(self) -> float:
+        """
+        Release held-back actions and let the run continue live.
+
+        Returns:
+            float: Seconds of specialist work done before the decision, i.e. latency saved
+        """
+        now = time.perf_counter()
+        with self._decided:
+            for action in self._pending:
+                action()
+            self._pending.clear()
+            self._state = COMMITTED
+            self._decided.notify_all()
+        done = min(t for t in (self._stalled, self._finished, now) if t is not None)
+        return max(done - self._started, 0.0)
+
+    def cancel(self) -> None:
+        with self._decided:
+            self._pending.clear()
+            self._state = CANCELLED
+            self._decided.notify_all()
+
+    def join(self) -> Any:
+        """Wait for the run to finish and return its result, re-raising what it raised."""
+        self._thread.join()
+        if self.error is not None:
+            raise self.error
+        return self.response
@@ -1,18 +1,27 @@
+import argparse
 import asyncio
+import os
 import websockets # type: ignore
 import json
+from urllib.parse import urlencode
 
-async def test_websocket():
+async def test_websocket(api_key=None):
     uri = "ws://localhost:8000/ws"
+    if api_key:
+        # Needed when the server sets TENANT_KEYS; websockets take the key as ?api_key=
+        uri += "?" + urlencode({"api_key": api_key})
+    history = []
     async with websockets.connect(uri) as websocket:
         while True:
             message = input("Enter your message (or 'quit' to exit): ")
             if message.lower() == 'quit':
                 break
             
-            await websocket.send(message)
+            # The server expects a JSON object with the message and the prior conversation
+            await websocket.send(json.dumps({"message": message, "history": history}))
             print("Message sent. Waiting for response...")
 
+            reply = []
             while True:
                 response = await websocket.recv()
                 data = json.loads(response)
@@ -20,8 +29,16 @@ async def test_websocket():
                     print(f"Agent changed to: {data['agent']}")
                 elif data['type'] == 'content':
                     print(data['content'], end='', flush=True)
+                    reply.append(data['content'])
                 elif data['type'] == 'end':
                     print(f"\nResponse ended. Final agent: {data['agent']}")
                     break
 
-asyncio.get_event_loop().run_until_complete(test_websocket())
\ No newline at end of file
+            history.append({"role": "user", "content": message})
+            history.append({"role": "assistant", "content": "".join(reply)})
+
+parser = argparse.ArgumentParser(description="Chat with the backend over its websocket.")
+parser.add_argument("--api-key", default=os.environ.get("API_KEY"), help="Key to connect with (default $API_KEY)")
+args = parser.parse_args()
+
+asyncio.get_event_loop().run_until_complete(test_websocket(args.api_key))
\ No newline at end of file
@@ -0,0 +1,105 @@
+# backend/tests/test_failover.py
+
+from types import SimpleNamespace
+
+import pytest
+
+openai = pytest.importorskip("openai")
+httpx = pytest.importorskip("httpx")
+pytest.importorskip("swarm")
+
+from swarm import Agent
+
+import metrics
+import runner
+from tools import model_router
+from tools.model_router import ModelRouter
+
+def _status_error(cls, status):
+    request = httpx.Request("POST", "https://api.openai.com/v1/chat/completions")
+    return cls(f"status {status}", response=httpx.Response(status, request=request), body=None)
+
+def _connection_error():
+    return openai.APIConnectionError(request=httpx.Request("POST", "https://api.openai.com/v1/chat/completions"))
+
+class StubCompletions:
+    """Raises the configured error for a model, or returns an empty completion."""
+
+    def __init__(self, failures):
+        self.failures = failures
+        self.calls = []
+
+    def create(self, **params):
+        self.calls.append(params["model"])
+        error = self.failures.get(params["model"])
+        if error is not None:
+            raise error
+        if params.get("stream"):
+            return iter([])
+        return SimpleNamespace(usage=None, choices=[])
+
+@pytest.fixture
+def router(monkeypatch):
+    monkeypatch.delenv("MODEL", raising=False)
+    router = ModelRouter({
+        "fallbacks": {"gpt-4o": ["gpt-4o-mini", "o1-mini"]},
+        "health": {"min_samples": 1, "max_error_rate": 0.5},
+    })
+    monkeypatch.setattr(model_router, "_router", router)
+    return router
+
+def _complete(failures, stream=False):
+    completions = StubCompletions(failures)
+    client = runner.InstrumentedSwarm(client=SimpleNamespace(chat=SimpleNamespace(completions=completions)))
+    agent = Agent(name="Test Agent", model="gpt-4o", instructions="", functions=[])
+    result = client.get_chat_completion(agent, [{"role": "user", "content": "hi"}], {}, None, stream, False)
+    if stream:
+        list(result)
+    return completions.calls
+
+def _fallbacks(from_model, to_model):
+    return metrics.MODEL_FALLBACKS._values.get((from_model, to_model, "error"), 0)
+
+def test_server_error_fails_over_to_next_model(router):
+    before = _fallbacks("gpt-4o", "gpt-4o-mini")
+    assert _complete({"gpt-4o": _status_error(openai.InternalServerError, 503)}) == ["gpt-4o", "gpt-4o-mini"]
+    assert _fallbacks("gpt-4o", "gpt-4o-mini") == before + 1
+    assert router.is_degraded("gpt-4o")
+    assert router.status()["gpt-4o-mini"]["error_rate"] == 0
+
+def test_rate_limit_fails_over(router):
+    assert _complete({"gpt-4o": _status_error(openai.RateLimitError, 429)}) == ["gpt-4o", "gpt-4o-mini"]
+
+def test_last_model_error_is_raised(router):
+    failures = {model: _connection_error() for model in ("gpt-4o", "gpt-4o-mini", "o1-mini")}
+    with pytest.raises(openai.APIConnectionError):
+        _complete(failures)
+    assert all(router.is_degraded(model) for model in failures)
+
+def test_bad_request_is_not_retried_or_counted(router):
+    with pytest.raises(openai.BadRequestError):
+        _complete({"gpt-4o": _status_error(openai.BadRequestError, 400)})
+    assert "gpt-4o" not in router.status()
+    assert router.route("gpt-4o") == "gpt-4o"
+
+def test_degraded_model_is_skipped(router):
+    router.observe("gpt-4o", error=True)
+    assert _complete({}) == ["gpt-4o-mini"]
+
+def test_stream_errors_count_only_for_model_failures(router):
+    class FailingStream(StubCompletions):
+        def create(self, **params):
+            self.calls.append(params["model"])
+            error = self.failures[params["model"]]
+            def chunks():
+                raise error
+                yield
+            return chunks()
+
+    for error, degraded in ((_status_error(openai.BadRequestError, 400), False), (_connection_error(), True)):
+        completions = FailingStream({"gpt-4o": error})
+        client = runner.InstrumentedSwarm(client=SimpleNamespace(chat=SimpleNamespace(completions=completions)))
+        agent = Agent(name="Test Agent", model="gpt-4o", instructions="", functions=[])
+        with pytest.raises(type(error)):
+            list(client.get_chat_completion(agent, [{"role": "user", "content": "hi"}], {}, None, True, False))
+        assert router.is_degraded("gpt-4o") is degraded
@@ -0,0 +1,92 @@
+# backend/tests/test_model_router.py
+
+import pytest
+
+from tools import model_router
+from tools.model_router import ModelRouter
+
+CONFIG = {
+    "default": "gpt-4o-mini",
+    "agents": {"Code Agent": "gpt-4o"},
+    "fallbacks": {"gpt-4o": ["gpt-4o-mini", "gpt-4o"], "o1-preview": ["o1-mini", "gpt-4o"]},
+    "health": {"window": 10, "min_samples": 4, "max_error_rate": 0.25, "max_ttft_seconds": 5.0,
+               "cooldown_seconds": 30},
+    "model_health": {"o1-preview": {"max_ttft_seconds": 90}},
+}
+
+class Clock:
+    def __init__(self) -> None:
+        self.now = 1000.0
+
+    def __call__(self) -> float:
+        return self.now
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(model_router.time, "monotonic", clock)
+    return clock
+
+@pytest.fixture
+def router(monkeypatch):
+    monkeypatch.delenv("MODEL", raising=False)
+    return ModelRouter(CONFIG)
+
+def test_agent_models_fall_back_to_default(router):
+    assert router.agent_model("Code Agent") == "gpt-4o"
+    assert router.agent_model("Weather Agent") == "gpt-4o-mini"
+
+def test_chain_lists_model_then_fallbacks_once(router, clock):
+    assert router.chain("gpt-4o") == ["gpt-4o", "gpt-4o-mini"]
+    assert router.chain("o1-preview") == ["o1-preview", "o1-mini", "gpt-4o"]
+    assert router.chain("unknown") == ["unknown"]
+
+def test_error_rate_degrades_only_after_min_samples(router, clock):
+    for _ in range(3):
+        router.observe("gpt-4o", error=True)
+    assert not router.is_degraded("gpt-4o")
+    router.observe("gpt-4o", error=True)
+    assert router.is_degraded("gpt-4o")
+    assert router.route("gpt-4o") == "gpt-4o-mini"
+    assert router.chain("gpt-4o") == ["gpt-4o-mini"]
+
+def test_error_rate_at_threshold_is_healthy(router, clock):
+    router.observe("gpt-4o", error=True)
+    for _ in range(3):
+        router.observe("gpt-4o", ttft=0.5)
+    assert not router.is_degraded("gpt-4o")
+
+def test_slow_first_token_degrades(router, clock):
+    for _ in range(4):
+        router.observe("gpt-4o", ttft=6.0)
+    assert router.is_degraded("gpt-4o")
+    assert router.status()["gpt-4o"]["reason"] == "median TTFT 6.00s"
+
+def test_model_health_overrides_thresholds(router, clock):
+    for _ in range(4):
+        router.observe("o1-preview", ttft=60.0)
+    assert not router.is_degraded("o1-preview")
+    for _ in range(4):
+        router.observe("o1-preview", ttft=200.0)
+    assert router.is_degraded("o1-preview")
+    assert router.route("o1-preview") == "o1-mini"
+
+def test_cooldown_expires_and_model_is_judged_afresh(router, clock):
+    for _ in range(4):
+        router.observe("gpt-4o", error=True)
+    assert router.is_degraded("gpt-4o")
+    clock.now += 29
+    assert router.route("gpt-4o") == "gpt-4o-mini"
+    clock.now += 2
+    assert not router.is_degraded("gpt-4o")
+    assert router.route("gpt-4o") == "gpt-4o"
+    # The window was cleared when it degraded, so one more failure is not enough again
+    router.observe("gpt-4o", error=True)
+    assert not router.is_degraded("gpt-4o")
+
+def test_route_keeps_model_when_all_are_degraded(router, clock):
+    for model in ("gpt-4o", "gpt-4o-mini"):
+        for _ in range(4):
+            router.observe(model, error=True)
+    assert router.chain("gpt-4o") == []
+    assert router.route("gpt-4o") == "gpt-4o"
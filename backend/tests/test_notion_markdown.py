@@ -0,0 +1,58 @@
+# backend/tests/test_notion_markdown.py
+
+import json
+
+from tools.notion_markdown import (
+    MAX_REQUEST_BLOCKS,
+    MAX_REQUEST_BYTES,
+    MAX_RICH_TEXT_CHARS,
+    MAX_RICH_TEXT_ITEMS,
+    chunk_blocks,
+    markdown_to_blocks,
+)
+
+def _text(blocks, block_type):
+    return "".join(item["text"]["content"] for block in blocks if block["type"] == block_type
+                   for item in block[block_type]["rich_text"])
+
+def _assert_within_limits(blocks):
+    for block in blocks:
+        items = block.get(block["type"], {}).get("rich_text", [])
+        assert len(items) <= MAX_RICH_TEXT_ITEMS
+        assert all(len(item["text"]["content"]) <= MAX_RICH_TEXT_CHARS for item in items)
+
+def test_heavily_styled_line_round_trips():
+    # 150 styled runs: more rich-text items than one block can hold
+    line = " ".join(f"**bold{i}** plain{i}" for i in range(150)) + " " + "x" * 5000
+    blocks = markdown_to_blocks(line)
+    _assert_within_limits(blocks)
+    assert len(blocks) > 1
+    assert {block["type"] for block in blocks} == {"paragraph"}
+    assert _text(blocks, "paragraph") == line.replace("**", "")
+
+def test_long_list_item_continues_in_same_block_type():
+    item = " ".join(["word"] * 50_000)
+    blocks = markdown_to_blocks(f"- {item}")
+    _assert_within_limits(blocks)
+    assert len(blocks) > 1
+    assert {block["type"] for block in blocks} == {"bulleted_list_item"}
+    assert _text(blocks, "bulleted_list_item") == item
+
+def test_long_code_block_round_trips():
+    code = "\n".join(f"print({i})" for i in range(30_000))
+    blocks = markdown_to_blocks(f"```python\n{code}\n```")
+    _assert_within_limits(blocks)
+    assert len(code) > MAX_RICH_TEXT_CHARS * MAX_RICH_TEXT_ITEMS
+    assert {block["code"]["language"] for block in blocks} == {"python"}
+    assert _text(blocks, "code") == code
+
+def test_batches_respect_nested_and_byte_limits():
+    table = "| a | b |\n|---|---|\n" + "\n".join(f"| {i} | {'y' * 300} |" for i in range(2000))
+    blocks = markdown_to_blocks(table)
+    batches = chunk_blocks(blocks, 100)
+    assert [block for batch in batches for block in batch] == blocks
+    for batch in batches:
+        assert len(batch) <= 100
+        nested = sum(1 + len(block["table"]["children"]) for block in batch)
+        assert nested <= MAX_REQUEST_BLOCKS
+        assert len(json.dumps(batch).encode("utf-8")) <= MAX_REQUEST_BYTES
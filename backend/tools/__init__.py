@@ -1,8 +1,12 @@
-from .web_tools import tavily_search, get_video_transcript, get_website_text_content, get_all_urls, save_to_md
-from .code_tools import execute_command, read_file, install_package, run_python_script
-from .research_tools import fetch_report, run_async, generate_research_report
-from .reasoning_tools import reason_with_o1
-from .image_tools import analyze_image, generate_image
-from .weather_tools import get_current_weather
-from .make_tools import send_to_make
-from .notion_tools import NotionHandler, create_notion_page, update_notion_page, get_notion_page_content, search_notion
\ No newline at end of file
+# Tools are resolved on first access, so importing this package (or one tool) does
+# not import every tool module and its dependencies.
+from .registry import TOOL_MODULES, load_tool
+
+__all__ = list(TOOL_MODULES)
+
+def __getattr__(name):
+    if name in TOOL_MODULES:
+        value = load_tool(name)
+        globals()[name] = value
+        return value
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
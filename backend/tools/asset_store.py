@@ -0,0 +1,102 @@
+# backend/tools/asset_store.py
+
+import hashlib
+import json
+import logging
+import os
+import re
+import threading
+from typing import Any, Dict, Optional
+
+EXTENSIONS = {"image/png": ".png", "image/jpeg": ".jpg", "image/webp": ".webp"}
+ASSET_NAME = re.compile(r"^[0-9a-f]{64}\.(png|jpg|webp)$")
+
+class AssetStore:
+    """
+    Content-addressed store for generated files.
+
+    Files are stored once under the SHA-256 of their bytes, so identical outputs are
+    deduplicated and a stored file never changes (which lets it be served with
+    immutable caching headers). A separate request index maps a hash of the
+    generation parameters to the asset that was produced for them.
+
+    Attributes:
+        root (str): Directory holding the assets and the request index
+    """
+
+    def __init__(self, root: str) -> None:
+        self.root = root
+        self.logger = logging.getLogger(__name__)
+
+    @staticmethod
+    def request_key(**params: Any) -> str:
+        """Hash generation parameters into a stable request key."""
+        return hashlib.sha256(json.dumps(params, sort_keys=True).encode("utf-8")).hexdigest()
+
+    def _atomic_write(self, path: str, data: bytes) -> None:
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = f"{path}.{threading.get_ident()}.tmp"
+        with open(tmp_path, "wb") as f:
+            f.write(data)
+        os.replace(tmp_path, path)
+
+    def put(self, data: bytes, mime: str) -> str:
+        """
+        Store bytes and return the asset name ("<sha256>.<ext>").
+
+        Args:
+            data (bytes): File contents
+            mime (str): MIME type of the contents
+
+        Returns:
+            str: Asset name usable with `path_for`
+        """
+        name = hashlib.sha256(data).hexdigest() + EXTENSIONS.get(mime, ".png")
+        path = self.path_for(name)
+        if not os.path.exists(path):
+            self._atomic_write(path, data)
+        return name
+
+    def path_for(self, name: str) -> Optional[str]:
+        """Return the file path of an asset name, or None if the name is not valid."""
+        if not ASSET_NAME.match(name):
+            return None
+        return os.path.join(self.root, name[:2], name)
+
+    def lookup(self, request_key: str) -> Optional[Dict[str, Any]]:
+        """Return the record stored for a request key if its asset still exists."""
+        try:
+            with open(os.path.join(self.root, "requests", f"{request_key}.json"), "r", encoding="utf-8") as f:
+                record = json.load(f)
+        except (OSError, ValueError):
+            return None
+        path = self.path_for(record.get("asset", ""))
+        if path is None or not os.path.exists(path):
+            return None
+        return record
+
+    def remember(self, request_key: str, record: Dict[str, Any]) -> None:
+        """Associate a request key with a record containing at least an "asset" name."""
+        try:
+            self._atomic_write(
+                os.path.join(self.root, "requests", f"{request_key}.json"),
+                json.dumps(record).encode("utf-8")
+            )
+        except OSError as e:
+            self.logger.warning(f"Could not record generated asset: {str(e)}")
+
+_store: Optional[AssetStore] = None
+_store_lock = threading.Lock()
+
+def get_asset_store() -> AssetStore:
+    """Return the shared asset store (ASSET_DIR, default ./generated_assets)."""
+    global _store
+    with _store_lock:
+        if _store is None:
+            _store = AssetStore(os.path.abspath(os.environ.get("ASSET_DIR", "generated_assets")))
+        return _store
+
+def asset_url(name: str) -> str:
+    """Public URL of an asset as served by the backend's /assets route."""
+    base_url = os.environ.get("ASSET_BASE_URL", "http://localhost:8000").rstrip("/")
+    return f"{base_url}/assets/{name}"
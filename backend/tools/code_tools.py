@@ -1,38 +1,78 @@
 import os
-import subprocess
 import logging
-import PyPDF2 # type: ignore
+from .command_runner import run_command, DEFAULT_TIMEOUT, DEFAULT_MAX_OUTPUT_BYTES
+from .package_installer import get_installer
+from .pdf_tools import PdfTextCache, extract_pdf_text
+from .python_pool import PythonWorkerPool, DEFAULT_PRELOAD
+from .runtime import emit_tool_output, get_current_session, get_workspace_dir
 
-def execute_command(command):
+DEFAULT_READ_MAX_TOKENS = 8000
+CHARS_PER_TOKEN = 4
+
+_python_pool = None
+_pdf_cache = None
+
+def execute_command(command, timeout=DEFAULT_TIMEOUT):
     """
     Execute a shell command and return its output.
 
-    This function runs a given shell command using subprocess and returns the command's
-    standard output. If the command fails, it returns the error message. This function has many uses. For example, performing CRUD operations, running a script, or executing a system command, using webget or curl to download a file, etc.
+    This function runs a given shell command in the WORKSPACE directory and returns the command's
+    combined output. If the command fails, it returns the error output. This function has many uses. For example, performing CRUD operations, running a script, or executing a system command, using webget or curl to download a file, etc.
+    Output is streamed live to the user while the command runs. Long output is summarised as its
+    first and last lines, and the full log is saved to a file in WORKSPACE that can be read with read_file.
 
     Args:
         command (str): The shell command to execute.
+        timeout (int): Maximum number of seconds the command may run before it is killed. Defaults to 120.
 
     Returns:
-        str: The command's standard output if successful, or an error message if the command fails.
+        str: The command's output if successful, or an error message if the command fails.
     """
     logging.info(f"Executing command: {command}")
-    current_dir = os.getcwd()
-    workspace_dir = os.path.join(current_dir, 'WORKSPACE')
-    
+    workspace_dir = get_workspace_dir()
+    os.makedirs(workspace_dir, exist_ok=True)
+
     try:
-        os.chdir(workspace_dir)
-        result = subprocess.run(command, shell=True, check=True, stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True)
-        logging.info("Command executed successfully")
-        return result.stdout.strip()
-    except subprocess.CalledProcessError as e:
-        error_message = f"Command failed with error: {e.stderr.strip()}"
+        result = run_command(
+            command,
+            cwd=workspace_dir,
+            timeout=timeout,
+            on_output=lambda stream, text: emit_tool_output("execute_command", text, stream),
+            log_dir=os.path.join(workspace_dir, '.logs'),
+        )
+    except OSError as e:
+        error_message = f"Command failed to start: {str(e)}"
         logging.error(error_message)
         return error_message
-    finally:
-        os.chdir(current_dir)
 
-def read_file(file_path):
+    output = result.output.strip()
+    if result.log_path:
+        output += f"\n\n[Output truncated. Full log ({result.total_bytes} bytes) saved to {os.path.relpath(result.log_path, workspace_dir)}]"
+
+    if result.timed_out:
+        error_message = f"Command timed out after {timeout} seconds and was killed. Output so far:\n{output}"
+        logging.error(f"Command timed out after {timeout} seconds: {command}")
+        return error_message
+    if result.output_limit_exceeded:
+        error_message = f"Command was killed after producing more than {DEFAULT_MAX_OUTPUT_BYTES} bytes of output:\n{output}"
+        logging.error(f"Command exceeded output limit: {command}")
+        return error_message
+    if result.returncode != 0:
+        error_message = f"Command failed with exit code {result.returncode}: {output}"
+        logging.error(error_message)
+        return error_message
+
+    logging.info(f"Command executed successfully in {result.duration:.2f}s")
+    return output
+
+def _get_pdf_cache():
+    global _pdf_cache
+    if _pdf_cache is None:
+        cache_dir = os.environ.get("PDF_CACHE_DIR") or os.path.join(get_workspace_dir(), '.cache', 'pdf')
+        _pdf_cache = PdfTextCache(cache_dir)
+    return _pdf_cache
+
+def read_file(file_path, pages=None, max_tokens=DEFAULT_READ_MAX_TOKENS):
     """
     Read the contents of various file types from the WORKSPACE directory.
 
@@ -40,8 +80,15 @@ def read_file(file_path):
     The function automatically looks for files in the WORKSPACE directory relative to the
     current working directory.
 
+    PDFs are returned page by page. Use `pages` to read only part of a document, and follow the
+    note at the end of the output to continue reading when the token limit is reached.
+    Text files larger than the token limit are cut off; use read_file_lines, tail_file or
+    search_file to look at the rest of large files.
+
     Args:
         file_path (str): The path to the file to be read, relative to WORKSPACE directory.
+        pages (str): PDF only. 1-based pages to read, e.g. "1-5", "3,7,10-12" or "20-". Defaults to all pages.
+        max_tokens (int): Approximate maximum number of tokens to return. Defaults to 8000.
 
     Returns:
         str: The contents of the file.
@@ -52,12 +99,8 @@ def read_file(file_path):
     """
     logging.info(f"Reading file: {file_path}")
     
-    # Get the current directory and construct the WORKSPACE path
-    current_dir = os.getcwd()
-    workspace_dir = os.path.join(current_dir, 'WORKSPACE')
-    
     # Construct the full file path within WORKSPACE
-    full_file_path = os.path.join(workspace_dir, file_path)
+    full_file_path = os.path.join(get_workspace_dir(), file_path)
     
     file_extension = os.path.splitext(full_file_path)[1].lower()
     supported_extensions = ['.md', '.txt', '.pdf', '.mdx', '.py', '.ts', '.tsx', '.js', '.jsx', '.css', '.scss', '.html', '.json', '.csv', '.xml']
@@ -67,14 +110,17 @@ def read_file(file_path):
     
     try:
         if file_extension == '.pdf':
-            with open(full_file_path, 'rb') as file:
-                pdf_reader = PyPDF2.PdfReader(file)
-                content = ""
-                for page in pdf_reader.pages:
-                    content += page.extract_text()
+            content = extract_pdf_text(full_file_path, _get_pdf_cache(), pages=pages, max_tokens=max_tokens)
         else:
+            budget_chars = max_tokens * CHARS_PER_TOKEN
             with open(full_file_path, 'r', encoding='utf-8') as file:
-                content = file.read()
+                content = file.read(budget_chars + 1)
+            if len(content) > budget_chars:
+                size = os.path.getsize(full_file_path)
+                content = content[:budget_chars] + (
+                    f"\n\n[File truncated at about {max_tokens} tokens; the full file is {size} bytes. "
+                    f"Use read_file_lines, tail_file or search_file to read the rest.]"
+                )
         
         logging.info(f"File {full_file_path} read successfully")
         return content
@@ -87,62 +133,106 @@ def install_package(package_name):
     """
     Install a Python package in the /venv virtual environment.
 
+    Packages that are already installed are skipped, and packages installed before are
+    reinstalled from a local wheel cache without downloading them again.
+
     Args:
-        package_name (str): The name of the package to install.
+        package_name (str): The name of the package to install, optionally with a version specifier (e.g. "pandas>=2").
 
     Returns:
         str: The output of the installation command or an error message.
     """
     logging.info(f"Installing package: {package_name}")
-    venv_path = "venv"
-    pip_path = f"{venv_path}/bin/pip"
-    
-    if not os.path.exists(pip_path):
-        error_message = f"Virtual environment not found at {venv_path}"
-        logging.error(error_message)
-        return error_message
-    
-    try:
-        result = subprocess.run([pip_path, "install", package_name], 
-                                check=True, 
-                                stdout=subprocess.PIPE, 
-                                stderr=subprocess.PIPE, 
-                                text=True)
-        logging.info(f"Package {package_name} installed successfully")
-        return result.stdout.strip()
-    except subprocess.CalledProcessError as e:
-        error_message = f"Failed to install package {package_name}: {e.stderr.strip()}"
-        logging.error(error_message)
-        return error_message
+    result = get_installer(os.environ.get("PACKAGE_VENV_PATH", "venv")).install(package_name)
+
+    if not result.success:
+        logging.error(result.message)
+        return result.message
+
+    if result.skipped:
+        logging.info(f"Package {package_name} already satisfied")
+    else:
+        logging.info(f"Package {package_name} installed successfully{' from cache' if result.cached else ''}")
+    return result.message
+
+def _get_python_pool():
+    global _python_pool
+    if _python_pool is None:
+        _python_pool = PythonWorkerPool(
+            size=int(os.environ.get("PYTHON_POOL_SIZE", "2")),
+            preload=os.environ.get("PYTHON_POOL_PRELOAD", DEFAULT_PRELOAD),
+            max_runs=int(os.environ.get("PYTHON_POOL_MAX_RUNS", "100")),
+            max_rss_mb=int(os.environ.get("PYTHON_POOL_MAX_RSS_MB", "1024")),
+        )
+        _python_pool.warm()
+    return _python_pool
+
+def release_python_session(session_id: str) -> None:
+    """Shut down a closed session's persistent Python kernel; does nothing if no script has run."""
+    if _python_pool is not None:
+        _python_pool.release_session(session_id)
 
-def run_python_script(filename):
+def run_python_script(filename, timeout=DEFAULT_TIMEOUT, persistent=False):
     """
-    Run a Python script using the Python interpreter from the /venv virtual environment.
+    Run a Python script from the WORKSPACE directory on a pre-warmed interpreter.
+
+    Common data-analysis packages (numpy, pandas, matplotlib, ...) are already imported, so
+    scripts start almost instantly. By default every run is isolated. With persistent=True the
+    script runs in this session's persistent kernel, so variables defined by earlier persistent
+    runs are still available (like a notebook).
 
     Args:
-        filename (str): The name of the Python script to run.
+        filename (str): The name of the Python script to run, relative to WORKSPACE.
+        timeout (int): Maximum number of seconds the script may run. Defaults to 120.
+        persistent (bool): Keep variables between runs in this session. Defaults to False.
 
     Returns:
         str: The output of the script or an error message.
     """
     logging.info(f"Running Python script: {filename}")
-    venv_path = "/venv"
-    python_path = f"{venv_path}/bin/python"
-    
-    if not os.path.exists(python_path):
-        error_message = f"Virtual environment not found at {venv_path}"
+    workspace_dir = get_workspace_dir()
+    script_path = os.path.join(workspace_dir, filename)
+    if not os.path.exists(script_path) and os.path.exists(filename):
+        script_path = os.path.abspath(filename)
+
+    if not os.path.exists(script_path):
+        error_message = f"Script not found: {filename}"
         logging.error(error_message)
         return error_message
-    
+
+    pool = _get_python_pool()
+    if not pool.supported:
+        return execute_command(f'"{pool.python_path}" "{script_path}"', timeout=timeout)
+
     try:
-        result = subprocess.run([python_path, filename], 
-                                check=True, 
-                                stdout=subprocess.PIPE, 
-                                stderr=subprocess.PIPE, 
-                                text=True)
-        logging.info(f"Script {filename} executed successfully")
-        return result.stdout.strip()
-    except subprocess.CalledProcessError as e:
-        error_message = f"Failed to run script {filename}: {e.stderr.strip()}"
+        result = pool.run(
+            script_path,
+            cwd=workspace_dir,
+            timeout=timeout,
+            session_id=get_current_session(),
+            persistent=persistent,
+            on_output=lambda text: emit_tool_output("run_python_script", text),
+        )
+    except Exception as e:
+        error_message = f"Failed to run script {filename}: {str(e)}"
+        logging.error(error_message)
+        return error_message
+
+    output = result.output.strip()
+    if result.worker_restarted:
+        output += "\n[The persistent kernel was restarted; previously defined variables are lost.]"
+    if result.timed_out:
+        error_message = f"Script {filename} timed out after {timeout} seconds and was killed. Output so far:\n{output}"
+        logging.error(error_message)
+        return error_message
+    if result.crashed:
+        error_message = f"Script {filename} crashed the Python kernel running it. Output so far:\n{output}"
+        logging.error(error_message)
+        return error_message
+    if not result.success:
+        error_message = f"Failed to run script {filename}: {output}"
         logging.error(error_message)
-        return error_message
\ No newline at end of file
+        return error_message
+
+    logging.info(f"Script {filename} executed successfully in {result.duration:.2f}s")
+    return output
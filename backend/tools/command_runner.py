@@ -0,0 +1,211 @@
+# backend/tools/command_runner.py
+
+import codecs
+import logging
+import os
+import signal
+import subprocess
+import threading
+import time
+import uuid
+from dataclasses import dataclass
+from typing import Callable, IO, List, Optional
+
+DEFAULT_TIMEOUT = 120
+DEFAULT_MAX_OUTPUT_BYTES = 50 * 1024 * 1024
+SUMMARY_HEAD_CHARS = 4000
+SUMMARY_TAIL_CHARS = 4000
+
+OutputCallback = Callable[[str, str], None]
+
+@dataclass
+class CommandResult:
+    command: str
+    returncode: Optional[int]
+    output: str
+    total_bytes: int
+    duration: float
+    timed_out: bool = False
+    output_limit_exceeded: bool = False
+    truncated: bool = False
+    log_path: Optional[str] = None
+
+    @property
+    def success(self) -> bool:
+        return self.returncode == 0 and not self.timed_out and not self.output_limit_exceeded
+
+class _OutputCapture:
+    """
+    Thread-safe capture of a command's combined output.
+
+    Keeps everything in memory until the summary budget is exceeded, then spills the
+    full output to a log file and only keeps the head and tail in memory.
+    """
+
+    def __init__(self, log_dir: str, head_chars: int, tail_chars: int) -> None:
+        self.log_dir = log_dir
+        self.head_chars = head_chars
+        self.tail_chars = tail_chars
+        self.total_bytes = 0
+        self.log_path: Optional[str] = None
+        self._chunks: List[str] = []
+        self._buffered_chars = 0
+        self._head = ""
+        self._tail = ""
+        self._log_file: Optional[IO[str]] = None
+        self._closed = False
+        self._lock = threading.Lock()
+
+    def write(self, text: str, size: int) -> None:
+        with self._lock:
+            if self._closed:
+                return
+            self.total_bytes += size
+            if self._log_file is None:
+                self._chunks.append(text)
+                self._buffered_chars += len(text)
+                if self._buffered_chars > self.head_chars + self.tail_chars:
+                    self._spill()
+                return
+            self._log_file.write(text)
+            self._tail = (self._tail + text)[-self.tail_chars:]
+
+    def _spill(self) -> None:
+        buffered = "".join(self._chunks)
+        self._chunks = []
+        self._head = buffered[:self.head_chars]
+        self._tail = buffered[-self.tail_chars:]
+        try:
+            os.makedirs(self.log_dir, exist_ok=True)
+            name = f"command-{time.strftime('%Y%m%d-%H%M%S')}-{uuid.uuid4().hex[:8]}.txt"
+            self.log_path = os.path.join(self.log_dir, name)
+            self._log_file = open(self.log_path, "w", encoding="utf-8")
+        except OSError as e:
+            logging.error(f"Could not create command log in {self.log_dir}: {str(e)}")
+            self.log_path = None
+            self._log_file = open(os.devnull, "w", encoding="utf-8")
+        self._log_file.write(buffered)
+
+    def close(self) -> None:
+        with self._lock:
+            self._closed = True
+            if self._log_file is not None:
+                self._log_file.close()
+
+    @property
+    def truncated(self) -> bool:
+        return self._log_file is not None
+
+    def summary(self) -> str:
+        with self._lock:
+            if self._log_file is None:
+                return "".join(self._chunks)
+            omitted = self.total_bytes - len(self._head.encode("utf-8")) - len(self._tail.encode("utf-8"))
+            return f"{self._head}\n\n... [{max(omitted, 0)} bytes omitted] ...\n\n{self._tail}"
+
+def _kill(process: subprocess.Popen) -> None:
+    """Kill the command together with any children it spawned."""
+    try:
+        if os.name == "posix":
+            os.killpg(process.pid, signal.SIGKILL)
+        else:
+            process.kill()
+    except (ProcessLookupError, PermissionError):
+        pass
+
+def run_command(
+    command: str,
+    cwd: str,
+    timeout: float = DEFAULT_TIMEOUT,
+    max_output_bytes: int = DEFAULT_MAX_OUTPUT_BYTES,
+    on_output: Optional[OutputCallback] = None,
+    log_dir: Optional[str] = None,
+    head_chars: int = SUMMARY_HEAD_CHARS,
+    tail_chars: int = SUMMARY_TAIL_CHARS,
+) -> CommandResult:
+    """
+    Run a shell command in its own working directory with time and output limits.
+
+    The working directory is passed to the child process instead of changing the
+    process-wide cwd, so concurrent sessions can run commands safely. Output is read
+    incrementally from both pipes and handed to `on_output` as it arrives.
+
+    Args:
+        command (str): The shell command to execute
+        cwd (str): Working directory for the command
+        timeout (float): Wall-clock limit in seconds before the command is killed
+        max_output_bytes (int): Output size after which the command is killed
+        on_output (Optional[Callable]): Called with (stream_name, text) for every chunk read
+        log_dir (Optional[str]): Where the full output is written when it exceeds the
+            summary budget. Defaults to `cwd`.
+        head_chars (int): Characters kept from the start of the output in the summary
+        tail_chars (int): Characters kept from the end of the output in the summary
+
+    Returns:
+        CommandResult: Exit status, head/tail summary of the output and log location
+    """
+    capture = _OutputCapture(log_dir or cwd, head_chars, tail_chars)
+    limit_exceeded = threading.Event()
+    start = time.monotonic()
+
+    process = subprocess.Popen(
+        command,
+        shell=True,
+        cwd=cwd,
+        stdin=subprocess.DEVNULL,
+        stdout=subprocess.PIPE,
+        stderr=subprocess.PIPE,
+        start_new_session=(os.name == "posix"),
+    )
+
+    def _pump(pipe, stream_name: str) -> None:
+        decoder = codecs.getincrementaldecoder("utf-8")(errors="replace")
+        while True:
+            data = pipe.read1(65536)
+            if not data:
+                break
+            text = decoder.decode(data)
+            capture.write(text, len(data))
+            if on_output and text:
+                try:
+                    on_output(stream_name, text)
+                except Exception as e:
+                    logging.debug(f"Output callback failed: {str(e)}")
+            if capture.total_bytes > max_output_bytes and not limit_exceeded.is_set():
+                limit_exceeded.set()
+                _kill(process)
+        tail = decoder.decode(b"", final=True)
+        if tail:
+            capture.write(tail, 0)
+        pipe.close()
+
+    readers = [
+        threading.Thread(target=_pump, args=(process.stdout, "stdout"), daemon=True),
+        threading.Thread(target=_pump, args=(process.stderr, "stderr"), daemon=True),
+    ]
+    for reader in readers:
+        reader.start()
+
+    timed_out = False
+    try:
+        process.wait(timeout=timeout)
+    except subprocess.TimeoutExpired:
+        timed_out = True
+        _kill(process)
+        process.wait()
+
+    for reader in readers:
+        reader.join(timeout=5)
+    capture.close()
+
+    return CommandResult(
+        command=command,
+        returncode=process.returncode,
+        output=capture.summary(),
+        total_bytes=capture.total_bytes,
+        duration=time.monotonic() - start,
+        timed_out=timed_out,
+        output_limit_exceeded=limit_exceeded.is_set(),
+        truncated=capture.truncated,
+        log_path=capture.log_path,
+    )
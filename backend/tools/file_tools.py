@@ -0,0 +1,293 @@
+# backend/tools/file_tools.py
+
+import bisect
+import logging
+import mmap
+import os
+import re
+import threading
+from array import array
+from collections import OrderedDict
+from typing import List, Optional, Tuple
+
+from .runtime import get_workspace_dir
+
+INDEX_BLOCK_BYTES = 256 * 1024
+INDEX_CACHE_ENTRIES = 64
+MAX_LINES_PER_READ = 500
+MAX_BYTES_PER_READ = 64 * 1024
+MAX_LINE_CHARS = 2000
+
+class LineIndex:
+    """
+    Sparse line-offset index of a file.
+
+    Stores one (line number, byte offset) checkpoint per ~256 KB block, counted with
+    C-speed `bytes.count`, so building it is a single linear pass and looking up a
+    line is a bisect plus a short forward scan within one block.
+    """
+
+    def __init__(self, mm: mmap.mmap) -> None:
+        self.line_numbers = array("Q", [0])
+        self.offsets = array("Q", [0])
+        size = len(mm)
+        position = 0
+        lines = 0
+        while position < size:
+            boundary = min(position + INDEX_BLOCK_BYTES, size)
+            newline = mm.find(b"\n", boundary) if boundary < size else -1
+            next_start = size if newline == -1 else newline + 1
+            lines += mm[position:next_start].count(b"\n")
+            position = next_start
+            if position < size:
+                self.line_numbers.append(lines)
+                self.offsets.append(position)
+        ends_with_newline = size > 0 and mm[size - 1:size] == b"\n"
+        self.total_lines = lines if ends_with_newline or size == 0 else lines + 1
+
+    def offset_of_line(self, mm: mmap.mmap, line: int) -> int:
+        """Byte offset where the 0-based `line` starts (len(mm) if past the end)."""
+        i = bisect.bisect_right(self.line_numbers, line) - 1
+        current, offset = self.line_numbers[i], self.offsets[i]
+        while current < line:
+            newline = mm.find(b"\n", offset)
+            if newline == -1:
+                return len(mm)
+            offset = newline + 1
+            current += 1
+        return offset
+
+    def line_of_offset(self, mm: mmap.mmap, offset: int) -> int:
+        """0-based line number containing the byte at `offset`."""
+        i = bisect.bisect_right(self.offsets, offset) - 1
+        return self.line_numbers[i] + mm[self.offsets[i]:offset].count(b"\n")
+
+class _MappedFile:
+    """Context manager yielding a read-only mmap and the cached line index of a file."""
+
+    _cache: "OrderedDict[str, Tuple[int, int, LineIndex]]" = OrderedDict()
+    _lock = threading.Lock()
+
+    def __init__(self, path: str) -> None:
+        self.path = path
+        self.file = None
+        self.mm = None
+
+    def __enter__(self) -> Tuple[Optional[mmap.mmap], "LineIndex"]:
+        self.file = open(self.path, "rb")
+        stat = os.fstat(self.file.fileno())
+        if stat.st_size == 0:
+            return None, None
+        self.mm = mmap.mmap(self.file.fileno(), 0, access=mmap.ACCESS_READ)
+        return self.mm, self._index(stat)
+
+    def _index(self, stat: os.stat_result) -> LineIndex:
+        with self._lock:
+            cached = self._cache.get(self.path)
+            if cached and cached[0] == stat.st_mtime_ns and cached[1] == stat.st_size:
+                self._cache.move_to_end(self.path)
+                return cached[2]
+        index = LineIndex(self.mm)
+        with self._lock:
+            self._cache[self.path] = (stat.st_mtime_ns, stat.st_size, index)
+            while len(self._cache) > INDEX_CACHE_ENTRIES:
+                self._cache.popitem(last=False)
+        return index
+
+    def __exit__(self, *exc) -> None:
+        if self.mm is not None:
+            self.mm.close()
+        self.file.close()
+
+def _resolve(file_path: str) -> str:
+    return os.path.join(get_workspace_dir(), file_path)
+
+def _decode_line(raw: bytes) -> str:
+    text = raw.rstrip(b"\r\n").decode("utf-8", errors="replace")
+    if len(text) > MAX_LINE_CHARS:
+        text = text[:MAX_LINE_CHARS] + " ...[line truncated]"
+    return text
+
+def _read_lines(mm: mmap.mmap, index: LineIndex, start: int, end: int) -> List[str]:
+    """Return 0-based lines [start, end) without touching the rest of the file."""
+    offset = index.offset_of_line(mm, start)
+    lines = []
+    for _ in range(start, end):
+        if offset >= len(mm):
+            break
+        newline = mm.find(b"\n", offset)
+        stop = len(mm) if newline == -1 else newline + 1
+        lines.append(_decode_line(mm[offset:stop]))
+        offset = stop
+    return lines
+
+def _format_lines(lines: List[str], first_line: int) -> str:
+    return "\n".join(f"{first_line + i}: {line}" for i, line in enumerate(lines))
+
+def read_file_lines(file_path: str, start_line: int = 1, end_line: Optional[int] = None) -> str:
+    """
+    Read a range of lines from a (possibly very large) text file in the WORKSPACE directory.
+
+    Only the requested lines are read, so this is safe for multi-gigabyte logs and CSVs.
+    Lines are returned prefixed with their 1-based line number. At most 500 lines are returned per call.
+
+    Args:
+        file_path (str): The path to the file, relative to WORKSPACE directory.
+        start_line (int): First line to read (1-based). Defaults to 1.
+        end_line (int): Last line to read (inclusive). Defaults to start_line + 99.
+
+    Returns:
+        str: The numbered lines and the total line count, or an error message.
+    """
+    logging.info(f"Reading lines {start_line}-{end_line} of {file_path}")
+    start_line = max(start_line, 1)
+    if end_line is None:
+        end_line = start_line + 99
+    end_line = min(end_line, start_line + MAX_LINES_PER_READ - 1)
+    try:
+        with _MappedFile(_resolve(file_path)) as (mm, index):
+            if mm is None:
+                return "File is empty."
+            lines = _read_lines(mm, index, start_line - 1, end_line)
+            header = f"{file_path}: lines {start_line}-{start_line + len(lines) - 1} of {index.total_lines}\n"
+            return header + _format_lines(lines, start_line)
+    except (IOError, ValueError) as e:
+        logging.error(f"Error reading lines from {file_path}: {str(e)}")
+        return f"Error reading file: {str(e)}"
+
+def head_file(file_path: str, lines: int = 50) -> str:
+    """
+    Return the first lines of a text file in the WORKSPACE directory.
+
+    Args:
+        file_path (str): The path to the file, relative to WORKSPACE directory.
+        lines (int): Number of lines to return. Defaults to 50.
+
+    Returns:
+        str: The numbered lines, or an error message.
+    """
+    return read_file_lines(file_path, 1, max(lines, 1))
+
+def tail_file(file_path: str, lines: int = 50) -> str:
+    """
+    Return the last lines of a text file in the WORKSPACE directory.
+
+    Args:
+        file_path (str): The path to the file, relative to WORKSPACE directory.
+        lines (int): Number of lines to return. Defaults to 50.
+
+    Returns:
+        str: The numbered lines, or an error message.
+    """
+    logging.info(f"Reading last {lines} lines of {file_path}")
+    lines = min(max(lines, 1), MAX_LINES_PER_READ)
+    try:
+        with _MappedFile(_resolve(file_path)) as (mm, index):
+            if mm is None:
+                return "File is empty."
+            first = max(index.total_lines - lines, 0)
+            selected = _read_lines(mm, index, first, index.total_lines)
+            header = f"{file_path}: lines {first + 1}-{index.total_lines} of {index.total_lines}\n"
+            return header + _format_lines(selected, first + 1)
+    except (IOError, ValueError) as e:
+        logging.error(f"Error reading tail of {file_path}: {str(e)}")
+        return f"Error reading file: {str(e)}"
+
+def read_file_bytes(file_path: str, offset: int = 0, length: int = 4096) -> str:
+    """
+    Read a byte range from a file in the WORKSPACE directory, decoded as UTF-8.
+
+    Args:
+        file_path (str): The path to the file, relative to WORKSPACE directory.
+        offset (int): Byte offset to start at. Negative values count from the end of the file.
+        length (int): Number of bytes to read (max 65536). Defaults to 4096.
+
+    Returns:
+        str: The decoded bytes, or an error message.
+    """
+    logging.info(f"Reading {length} bytes at offset {offset} of {file_path}")
+    length = min(max(length, 0), MAX_BYTES_PER_READ)
+    try:
+        with open(_resolve(file_path), "rb") as file:
+            size = os.fstat(file.fileno()).st_size
+            if offset < 0:
+                offset = max(size + offset, 0)
+            file.seek(offset)
+            data = file.read(length)
+        header = f"{file_path}: bytes {offset}-{offset + len(data)} of {size}\n"
+        return header + data.decode("utf-8", errors="replace")
+    except IOError as e:
+        logging.error(f"Error reading bytes from {file_path}: {str(e)}")
+        return f"Error reading file: {str(e)}"
+
+def search_file(
+    file_path: str,
+    pattern: str,
+    context_lines: int = 2,
+    max_matches: int = 50,
+    ignore_case: bool = False
+) -> str:
+    """
+    Search a (possibly very large) text file in the WORKSPACE directory with a regular expression.
+
+    The file is scanned through a memory map, so it is never loaded fully into memory.
+    Matching lines are marked with '>' and shown with surrounding context lines.
+
+    Args:
+        file_path (str): The path to the file, relative to WORKSPACE directory.
+        pattern (str): Regular expression (Python syntax) to search for.
+        context_lines (int): Number of lines to show before and after each match. Defaults to 2.
+        max_matches (int): Maximum number of matching lines to report. Defaults to 50.
+        ignore_case (bool): Match case-insensitively. Defaults to False.
+
+    Returns:
+        str: Matches with line numbers and context, or a message if nothing matched.
+    """
+    logging.info(f"Searching {file_path} for: {pattern}")
+    try:
+        regex = re.compile(pattern.encode("utf-8"), re.MULTILINE | (re.IGNORECASE if ignore_case else 0))
+    except re.error as e:
+        return f"Invalid regular expression: {str(e)}"
+
+    try:
+        with _MappedFile(_resolve(file_path)) as (mm, index):
+            if mm is None:
+                return "File is empty."
+
+            match_lines = []
+            for match in regex.finditer(mm):
+                line = index.line_of_offset(mm, match.start())
+                if not match_lines or match_lines[-1] != line:
+                    match_lines.append(line)
+                if len(match_lines) >= max_matches:
+                    break
+
+            if not match_lines:
+                return f"No matches for '{pattern}' in {file_path}."
+
+            # Merge overlapping context windows into contiguous blocks
+            blocks = []
+            for line in match_lines:
+                start = max(line - context_lines, 0)
+                end = min(line + context_lines + 1, index.total_lines)
+                if blocks and start <= blocks[-1][1]:
+                    blocks[-1][1] = max(blocks[-1][1], end)
+                else:
+                    blocks.append([start, end])
+
+            matched = set(match_lines)
+            sections = []
+            for start, end in blocks:
+                lines = _read_lines(mm, index, start, end)
+                sections.append("\n".join(
+                    f"{'>' if start + i in matched else ' '} {start + i + 1}: {text}"
+                    for i, text in enumerate(lines)
+                ))
+
+            summary = f"{len(match_lines)} matching line(s) in {file_path}"
+            if len(match_lines) >= max_matches:
+                summary += f" (stopped after {max_matches})"
+            return summary + ":\n\n" + "\n--\n".join(sections)
+    except (IOError, ValueError) as e:
+        logging.error(f"Error searching {file_path}: {str(e)}")
+        return f"Error searching file: {str(e)}"
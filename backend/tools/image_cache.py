@@ -0,0 +1,119 @@
+# backend/tools/image_cache.py
+
+import hashlib
+import json
+import logging
+import os
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, Iterable, Optional, Tuple
+
+DEFAULT_MAX_MEMORY_BYTES = 32 * 1024 * 1024
+
+def analysis_cache_key(images: Iterable[Tuple[str, bytes]], prompt: str, detail: str, model: str, max_tokens: int) -> str:
+    """
+    Build the cache key of a vision request.
+
+    Args:
+        images (Iterable[Tuple[str, bytes]]): (MIME type, normalised image bytes) pairs in request order
+        prompt (str): The question asked about the image(s)
+        detail (str): Requested detail level
+        model (str): Vision model
+        max_tokens (int): Response token limit
+
+    Returns:
+        str: Hex SHA-256 digest identifying the request
+    """
+    digest = hashlib.sha256()
+    for mime, data in images:
+        digest.update(mime.encode("utf-8"))
+        digest.update(hashlib.sha256(data).digest())
+    digest.update(json.dumps([prompt, detail, model, max_tokens]).encode("utf-8"))
+    return digest.hexdigest()
+
+class AnalysisCache:
+    """
+    Two-tier cache of image analysis results.
+
+    The memory tier is an LRU bounded by the serialised size of its entries; the
+    optional disk tier keeps one JSON file per key and survives restarts.
+
+    Attributes:
+        max_memory_bytes (int): Size budget of the memory tier
+        disk_dir (Optional[str]): Directory of the disk tier, or None to disable it
+    """
+
+    def __init__(self, max_memory_bytes: int = DEFAULT_MAX_MEMORY_BYTES, disk_dir: Optional[str] = None) -> None:
+        self.max_memory_bytes = max_memory_bytes
+        self.disk_dir = disk_dir
+        self._entries: "OrderedDict[str, Tuple[Dict[str, Any], int]]" = OrderedDict()
+        self._memory_bytes = 0
+        self._stats = {"hits": 0, "disk_hits": 0, "misses": 0, "evictions": 0}
+        self._lock = threading.Lock()
+        self.logger = logging.getLogger(__name__)
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+                self._stats["hits"] += 1
+                return entry[0]
+
+        value = self._read_disk(key)
+        with self._lock:
+            if value is None:
+                self._stats["misses"] += 1
+                return None
+            self._stats["disk_hits"] += 1
+        self._remember(key, value)
+        return value
+
+    def put(self, key: str, value: Dict[str, Any]) -> None:
+        self._remember(key, value)
+        self._write_disk(key, value)
+
+    def _remember(self, key: str, value: Dict[str, Any]) -> None:
+        size = len(json.dumps(value))
+        if size > self.max_memory_bytes:
+            return
+        with self._lock:
+            previous = self._entries.pop(key, None)
+            if previous is not None:
+                self._memory_bytes -= previous[1]
+            self._entries[key] = (value, size)
+            self._memory_bytes += size
+            while self._memory_bytes > self.max_memory_bytes:
+                _, (_, evicted_size) = self._entries.popitem(last=False)
+                self._memory_bytes -= evicted_size
+                self._stats["evictions"] += 1
+
+    def _disk_path(self, key: str) -> str:
+        return os.path.join(self.disk_dir, key[:2], f"{key}.json")
+
+    def _read_disk(self, key: str) -> Optional[Dict[str, Any]]:
+        if not self.disk_dir:
+            return None
+        try:
+            with open(self._disk_path(key), "r", encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def _write_disk(self, key: str, value: Dict[str, Any]) -> None:
+        if not self.disk_dir:
+            return
+        path = self._disk_path(key)
+        try:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            tmp_path = f"{path}.{threading.get_ident()}.tmp"
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump(value, f)
+            os.replace(tmp_path, path)
+        except OSError as e:
+            self.logger.warning(f"Could not write image analysis cache entry: {str(e)}")
+
+    def stats(self) -> Dict[str, int]:
+        """Return hit/miss counters and the current memory footprint."""
+        with self._lock:
+            return {**self._stats, "entries": len(self._entries), "memory_bytes": self._memory_bytes}
@@ -1,28 +1,89 @@
 import base64
+import io
 import os
 import requests
 import logging
+import threading
+import uuid
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
-from typing import Union, List, Dict, Optional, Literal
+from typing import TYPE_CHECKING, Union, List, Dict, Optional, Literal, Tuple
 import mimetypes
-from openai import OpenAI
 from urllib.parse import urlparse
-from typing import Union, List, Dict, Optional, Literal
 
-client = OpenAI()
+from .asset_store import AssetStore, asset_url, get_asset_store
+from .image_cache import AnalysisCache, analysis_cache_key, DEFAULT_MAX_MEMORY_BYTES
+from .model_router import get_router, is_failover_error
+from .runtime import get_current_session, get_openai_client, notify
+from .usage import get_usage_tracker, image_cost
+
+if TYPE_CHECKING:
+    from openai import OpenAI
+
+_analyzer = None
+_analyzer_lock = threading.Lock()
+_background_executor = ThreadPoolExecutor(max_workers=4, thread_name_prefix="image-generation")
+_jobs: Dict[str, str] = {}
+_jobs_lock = threading.Lock()
+
+MAX_IMAGE_BYTES = 20 * 1024 * 1024
+DOWNLOAD_TIMEOUT = 30
+MAX_PARALLEL_DOWNLOADS = 8
+LOW_DETAIL_MAX_SIDE = 512
+HIGH_DETAIL_MAX_SIDE = 2048
+HIGH_DETAIL_SHORT_SIDE = 768
+JPEG_QUALITY = 85
+SUPPORTED_MIME_TYPES = {"image/png", "image/jpeg", "image/webp"}
 
 def analyze_image(
     image_source: Union[str, List[str]],
     prompt: str = "What's in this image?",
     detail: Literal["auto", "low", "high"] = "auto",
-    model: str = "gpt-4o",
+    model: Optional[str] = None,
     max_tokens: int = 1000
 ) -> Dict[str, Union[str, Dict[str, int]]]:
     """
     Analyze one or more images using OpenAI's Vision API.
+
+    The model defaults to the one configured for analyze_image in models.json.
+    """
+    tracker = get_usage_tracker()
+    tracker.check()
+    router = get_router()
+    model = tracker.model_for(router.route(model or router.tool_model("analyze_image", "gpt-4o")))
+    try:
+        result = _get_analyzer().analyze_image(image_source, prompt, detail, model, max_tokens)
+    except Exception as e:
+        # Only the model's failures count against it, not unreadable images or rejected requests
+        if is_failover_error(e):
+            router.observe(model, error=True)
+        raise
+    if not result.get("cached"):
+        router.observe(model)
+        tracker.record(model, result["usage"]["prompt_tokens"], result["usage"]["completion_tokens"])
+    return result
+
+def _get_analyzer() -> "ImageAnalyzer":
+    global _analyzer
+    with _analyzer_lock:
+        if _analyzer is None:
+            cache = AnalysisCache(
+                max_memory_bytes=int(os.environ.get("IMAGE_CACHE_MAX_BYTES", DEFAULT_MAX_MEMORY_BYTES)),
+                disk_dir=os.environ.get("IMAGE_CACHE_DIR")
+            )
+            _analyzer = ImageAnalyzer(client=get_openai_client(), cache=cache)
+        return _analyzer
+
+def get_image_cache_stats() -> Dict[str, int]:
+    """
+    Return hit/miss statistics of the image analysis cache.
+
+    Empty until the first image is analyzed, so reading the statistics never
+    creates the analyzer and its OpenAI client.
     """
-    analyzer = ImageAnalyzer()
-    return analyzer.analyze_image(image_source, prompt, detail, model, max_tokens)
+    with _analyzer_lock:
+        analyzer = _analyzer
+    return analyzer.cache.stats() if analyzer is not None and analyzer.cache else {}
 
 class ImageAnalyzer:
     """
@@ -42,37 +103,44 @@ class ImageAnalyzer:
         requests.exceptions.RequestException: If there's an error downloading an image
     """
 
-    def __init__(self, api_key: Optional[str] = None) -> None:
+    def __init__(
+        self,
+        api_key: Optional[str] = None,
+        client: Optional["OpenAI"] = None,
+        cache: Optional[AnalysisCache] = None
+    ) -> None:
         """
         Initialize the ImageAnalyzer with OpenAI API credentials.
 
         Args:
             api_key (Optional[str]): OpenAI API key. If None, will use OPENAI_API_KEY
                 environment variable.
+            client (Optional[OpenAI]): Existing client to reuse instead of creating one.
+            cache (Optional[AnalysisCache]): Cache for analysis results. None disables caching.
 
         Raises:
             ValueError: If neither api_key parameter nor OPENAI_API_KEY environment
                 variable is set
         """
-        self.client = OpenAI(api_key=api_key)
+        if client is None:
+            from openai import OpenAI
+            client = OpenAI(api_key=api_key)
+        self.client = client
+        self.cache = cache
         self.supported_formats = {'.png', '.jpg', '.jpeg', '.webp'}
+        self.session = requests.Session()
 
-    def _encode_image(self, image_path: str) -> str:
+    def _encode_image(self, image_data: bytes) -> str:
         """
-        Encode a local image file to base64 string.
+        Encode image bytes to a base64 string.
 
         Args:
-            image_path (str): Path to the local image file
+            image_data (bytes): Raw image bytes
 
         Returns:
             str: Base64 encoded string of the image
-
-        Raises:
-            FileNotFoundError: If the image file doesn't exist
-            IOError: If there's an error reading the file
         """
-        with open(image_path, "rb") as image_file:
-            return base64.b64encode(image_file.read()).decode('utf-8')
+        return base64.b64encode(image_data).decode('utf-8')
 
     def _validate_image_format(self, file_path: str) -> bool:
         """
@@ -87,36 +155,120 @@ class ImageAnalyzer:
         extension = Path(file_path).suffix.lower()
         return extension in self.supported_formats
 
-    def _download_image(self, url: str, temp_path: str = "temp_image") -> str:
+    def _download_image(self, url: str) -> bytes:
         """
-        Download an image from a URL and save it to a temporary file.
+        Download an image from a URL into memory.
 
         Args:
             url (str): URL of the image to download
-            temp_path (str): Base path for the temporary file
 
         Returns:
-            str: Path to the downloaded temporary file
+            bytes: The downloaded image
 
         Raises:
             requests.exceptions.RequestException: If there's an error downloading the image
-            ValueError: If the image format is not supported
+            ValueError: If the image format is not supported or the image is too large
         """
-        response = requests.get(url, stream=True)
-        response.raise_for_status()
-        
-        content_type = response.headers.get('content-type')
-        extension = mimetypes.guess_extension(content_type) if content_type else Path(urlparse(url).path).suffix
-        
-        if not extension or extension.lower() not in self.supported_formats:
-            raise ValueError(f"Unsupported image format: {extension}")
-            
-        temp_file = f"{temp_path}{extension}"
-        with open(temp_file, 'wb') as f:
-            for chunk in response.iter_content(chunk_size=8192):
-                f.write(chunk)
-                
-        return temp_file
+        with self.session.get(url, stream=True, timeout=DOWNLOAD_TIMEOUT) as response:
+            response.raise_for_status()
+
+            content_type = response.headers.get('content-type', '').split(';')[0].strip()
+            extension = mimetypes.guess_extension(content_type) if content_type else Path(urlparse(url).path).suffix
+
+            if not extension or extension.lower() not in self.supported_formats:
+                raise ValueError(f"Unsupported image format: {extension}")
+
+            declared_size = int(response.headers.get('content-length') or 0)
+            if declared_size > MAX_IMAGE_BYTES:
+                raise ValueError(f"Image too large: {declared_size} bytes (limit {MAX_IMAGE_BYTES})")
+
+            chunks = []
+            received = 0
+            for chunk in response.iter_content(chunk_size=65536):
+                received += len(chunk)
+                if received > MAX_IMAGE_BYTES:
+                    raise ValueError(f"Image too large: more than {MAX_IMAGE_BYTES} bytes")
+                chunks.append(chunk)
+
+        return b"".join(chunks)
+
+    def _load_image(self, source: str) -> bytes:
+        """
+        Load an image from a local path or an HTTP(S) URL.
+
+        Raises:
+            FileNotFoundError: If a local image file cannot be found
+            ValueError: If the image format is not supported or the image is too large
+        """
+        if urlparse(source).scheme in ('http', 'https'):
+            return self._download_image(source)
+        if not os.path.exists(source):
+            raise FileNotFoundError(f"Image file not found: {source}")
+        if not self._validate_image_format(source):
+            raise ValueError(f"Unsupported image format: {source}")
+        if os.path.getsize(source) > MAX_IMAGE_BYTES:
+            raise ValueError(f"Image too large: {source} (limit {MAX_IMAGE_BYTES} bytes)")
+        with open(source, "rb") as image_file:
+            return image_file.read()
+
+    def _prepare_image(self, image_data: bytes, detail: str) -> Tuple[str, bytes]:
+        """
+        Downscale and recompress an image to the size the Vision API will actually use.
+
+        "low" detail images are seen at 512x512, "high"/"auto" ones are fitted within
+        2048x2048 and then scaled so the short side is at most 768px. Sending more pixels
+        only costs upload time and tokens.
+
+        Args:
+            image_data (bytes): Raw image bytes
+            detail (str): Requested detail level
+
+        Returns:
+            Tuple[str, bytes]: MIME type and the (possibly re-encoded) image bytes
+
+        Raises:
+            ValueError: If the data is not a readable image
+        """
+        from PIL import Image, ImageOps
+
+        try:
+            image = Image.open(io.BytesIO(image_data))
+            image.load()
+        except Exception as e:
+            raise ValueError(f"Could not read image: {str(e)}")
+
+        original_mime = Image.MIME.get(image.format or "", "image/jpeg")
+        image = ImageOps.exif_transpose(image)
+        width, height = image.size
+
+        if detail == "low":
+            scale = min(1.0, LOW_DETAIL_MAX_SIDE / max(width, height))
+        else:
+            scale = min(1.0, HIGH_DETAIL_MAX_SIDE / max(width, height))
+            short_side = min(width, height) * scale
+            if short_side > HIGH_DETAIL_SHORT_SIDE:
+                scale *= HIGH_DETAIL_SHORT_SIDE / short_side
+
+        if scale < 1.0:
+            image = image.resize((max(1, round(width * scale)), max(1, round(height * scale))), Image.LANCZOS)
+
+        has_alpha = image.mode in ("RGBA", "LA", "PA") or (image.mode == "P" and "transparency" in image.info)
+        buffer = io.BytesIO()
+        if has_alpha:
+            image.save(buffer, format="PNG", optimize=True)
+            mime = "image/png"
+        else:
+            image.convert("RGB").save(buffer, format="JPEG", quality=JPEG_QUALITY, optimize=True)
+            mime = "image/jpeg"
+
+        encoded = buffer.getvalue()
+        if scale == 1.0 and len(image_data) <= len(encoded) and original_mime in SUPPORTED_MIME_TYPES:
+            # Already small enough; re-encoding would not help
+            return original_mime, image_data
+        return mime, encoded
+
+    def _load_and_prepare(self, source: str, detail: str) -> Tuple[str, bytes]:
+        return self._prepare_image(self._load_image(source), detail)
 
     def analyze_image(
         self,
@@ -155,6 +307,7 @@ class ImageAnalyzer:
                     - prompt_tokens (int): Tokens used in the prompt
                     - completion_tokens (int): Tokens used in the completion
                     - total_tokens (int): Total tokens used
+                - cached (bool): Only present (True) when the result came from the cache
 
         Raises:
             ValueError: If image format is unsupported or detail level is invalid
@@ -184,55 +337,86 @@ class ImageAnalyzer:
         """
         if isinstance(image_source, str):
             image_source = [image_source]
-            
+
+        # Download and shrink all images concurrently; map() keeps their order
+        if len(image_source) == 1:
+            images = [self._load_and_prepare(image_source[0], detail)]
+        else:
+            with ThreadPoolExecutor(max_workers=min(MAX_PARALLEL_DOWNLOADS, len(image_source))) as executor:
+                images = list(executor.map(lambda source: self._load_and_prepare(source, detail), image_source))
+
+        # The key uses the normalised bytes, so the same picture from a file or a URL hits the same entry
+        cache_key = analysis_cache_key(images, prompt, detail, model, max_tokens)
+        if self.cache is not None:
+            cached = self.cache.get(cache_key)
+            if cached is not None:
+                return {**cached, "cached": True}
+
         content = [{"type": "text", "text": prompt}]
-        temp_files = []
-        
-        try:
-            for source in image_source:
-                is_url = urlparse(source).scheme in ('http', 'https')
-                
-                if is_url:
-                    temp_file = self._download_image(source)
-                    temp_files.append(temp_file)
-                    image_path = temp_file
-                else:
-                    if not os.path.exists(source):
-                        raise FileNotFoundError(f"Image file not found: {source}")
-                    if not self._validate_image_format(source):
-                        raise ValueError(f"Unsupported image format: {source}")
-                    image_path = source
-                
-                base64_image = self._encode_image(image_path)
-                content.append({
-                    "type": "image_url",
-                    "image_url": {
-                        "url": f"data:image/jpeg;base64,{base64_image}",
-                        "detail": detail
-                    }
-                })
-            
-            response = self.client.chat.completions.create(
-                model=model,
-                messages=[{"role": "user", "content": content}],
-                max_tokens=max_tokens
-            )
-            
-            return {
-                "content": response.choices[0].message.content,
-                "usage": {
-                    "prompt_tokens": response.usage.prompt_tokens,
-                    "completion_tokens": response.usage.completion_tokens,
-                    "total_tokens": response.usage.total_tokens
+        for mime, data in images:
+            content.append({
+                "type": "image_url",
+                "image_url": {
+                    "url": f"data:{mime};base64,{self._encode_image(data)}",
+                    "detail": detail
                 }
+            })
+
+        response = self.client.chat.completions.create(
+            model=model,
+            messages=[{"role": "user", "content": content}],
+            max_tokens=max_tokens
+        )
+
+        result = {
+            "content": response.choices[0].message.content,
+            "usage": {
+                "prompt_tokens": response.usage.prompt_tokens,
+                "completion_tokens": response.usage.completion_tokens,
+                "total_tokens": response.usage.total_tokens
             }
-            
-        finally:
-            for temp_file in temp_files:
-                try:
-                    os.remove(temp_file)
-                except:
-                    pass
+        }
+        if self.cache is not None:
+            self.cache.put(cache_key, result)
+        return result
+
+def _generate_and_store(request_key: str, params: Dict, session_id: Optional[str] = None) -> Dict:
+    """Call the Images API and persist the result in the asset store."""
+    store = get_asset_store()
+    logging.info(f"Generating image with prompt: {params['prompt']}")
+    response = get_openai_client().images.generate(response_format="b64_json", **params)
+    get_usage_tracker().record(params["model"], cost=image_cost(params["model"], params["quality"], params["size"],
+                                                                len(response.data)),
+                               session_id=session_id, tool="generate_image")
+    names = [store.put(base64.b64decode(item.b64_json), "image/png") for item in response.data]
+    record = {
+        "asset": names[0],
+        "assets": names,
+        "revised_prompt": getattr(response.data[0], 'revised_prompt', None)
+    }
+    store.remember(request_key, record)
+    logging.info(f"Image generated successfully and stored as {names[0]}")
+    return record
+
+def _format_record(record: Dict, cached: bool) -> Dict:
+    result = {
+        "url": asset_url(record["asset"]),
+        "revised_prompt": record.get("revised_prompt"),
+        "cached": cached
+    }
+    if len(record.get("assets", [])) > 1:
+        result["urls"] = [asset_url(name) for name in record["assets"]]
+    return result
+
+def _generate_in_background(job_id: str, session_id: str, request_key: str, params: Dict) -> None:
+    try:
+        frame = {"type": "image_ready", "job_id": job_id, **_format_record(_generate_and_store(request_key, params, session_id), False)}
+    except Exception as e:
+        logging.error(f"Error generating image in background: {str(e)}")
+        frame = {"type": "image_error", "job_id": job_id, "error": str(e)}
+    with _jobs_lock:
+        _jobs.pop(request_key, None)
+    notify(frame, session_id=session_id)
 
 def generate_image(
     prompt: str,
@@ -241,10 +425,13 @@ def generate_image(
     style: Literal["vivid", "natural"] = "vivid",
     model: str = "dall-e-3",
     n: int = 1,
-    response_format: Literal["url", "b64_json"] = "url"
+    background: bool = False
 ) -> dict:
     """
     Generate an image using DALL-E 3.
+
+    Generated images are stored locally and served by this backend, so the returned URL does
+    not expire. Asking again for the same prompt and settings returns the stored image instantly.
     
     Args:
         prompt (str): Text description of the desired image(s). Max 4000 characters.
@@ -253,31 +440,40 @@ def generate_image(
         style (str): Image style - "vivid" or "natural". Defaults to "vivid".
         model (str): Model to use. Defaults to "dall-e-3".
         n (int): Number of images to generate. DALL-E 3 only supports n=1.
-        response_format (str): Format for generated images - "url" or "b64_json". Defaults to "url".
+        background (bool): Return immediately and show the image to the user when it is ready,
+            instead of waiting for it. Defaults to False.
     
     Returns:
-        dict: Response from the OpenAI API containing image data
+        dict: The image "url" and "revised_prompt", or a "job_id" with status "generating" when
+            running in the background
         
     Raises:
         Exception: If the API call fails
     """
+    params = {"model": model, "prompt": prompt, "n": n, "size": size, "quality": quality, "style": style}
+    request_key = AssetStore.request_key(**params)
+
+    record = get_asset_store().lookup(request_key)
+    if record is not None:
+        logging.info(f"Returning stored image {record['asset']} for prompt: {prompt}")
+        return _format_record(record, True)
+
     try:
-        logging.info(f"Generating image with prompt: {prompt}")
-        response = client.images.generate(
-            model=model,
-            prompt=prompt,
-            n=n,
-            size=size,
-            quality=quality,
-            style=style,
-            response_format=response_format
-        )
-        logging.info("Image generated successfully")
-        return {
-            "url": response.data[0].url,
-            "revised_prompt": getattr(response.data[0], 'revised_prompt', None)
-        }
+        get_usage_tracker().check()
+        if background:
+            with _jobs_lock:
+                job_id = _jobs.get(request_key)
+                if job_id is None:
+                    job_id = uuid.uuid4().hex
+                    _jobs[request_key] = job_id
+                    _background_executor.submit(_generate_in_background, job_id, get_current_session(), request_key, params)
+            return {
+                "status": "generating",
+                "job_id": job_id,
+                "message": "The image is being generated and will be shown to the user when it is ready."
+            }
+        return _format_record(_generate_and_store(request_key, params), False)
     except Exception as e:
         error_message = f"Error generating image: {str(e)}"
         logging.error(error_message)
-        return {"error": error_message}
\ No newline at end of file
+        return {"error": error_message}
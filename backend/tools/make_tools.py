@@ -1,11 +1,27 @@
 # backend/tools/make_tools.py
 
-import requests
+import asyncio
+import httpx
 import logging
+import os
+import random
+import threading
+import time
+import uuid
 from typing import Dict, Optional, Any, Union
-from dataclasses import dataclass
+from dataclasses import dataclass, field
 from datetime import datetime
 
+from .runtime import get_current_session, notify
+
+DEFAULT_WEBHOOK_URL = "https://hook.eu2.make.com/lh4bjyea77m4h8gkv3vqc7vvm0290vwu"
+DEFAULT_TIMEOUT = 120.0
+DEFAULT_WAIT_SECONDS = 20.0
+MAX_RETRIES = 3
+# Only retry responses that mean the scenario did not run; a POST may not be idempotent
+RETRYABLE_STATUSES = {429, 503}
+JOB_TTL = 3600.0
+
 @dataclass
 class MakeResponse:
     success: bool
@@ -14,19 +30,159 @@ class MakeResponse:
     thread_id: Optional[str] = None
     error: Optional[str] = None
 
+@dataclass
+class MakeJob:
+    job_id: str
+    session_id: str
+    message: str
+    status: str = "queued"
+    result: Optional[MakeResponse] = None
+    created: float = field(default_factory=time.time)
+    done: threading.Event = field(default_factory=threading.Event)
+    notify_when_done: bool = False
+
+class MakeQueueFull(Exception):
+    """Raised when the dispatch queue has no room for another webhook call."""
+
 class MakeWebhookHandler:
-    def __init__(self):
-        self.webhook_url = "https://hook.eu2.make.com/lh4bjyea77m4h8gkv3vqc7vvm0290vwu"
-        self.thread_id_store: Dict[str, str] = {}
+    """
+    Dispatches messages to a Make.com webhook.
+
+    Calls run on a dedicated event loop thread with a pooled httpx.AsyncClient, fed
+    by a bounded queue and a fixed number of dispatch workers, so a slow scenario
+    never occupies an agent thread. Each chat session has its own Make conversation
+    thread id, and messages of one session are sent in order so a reply's thread id
+    is known before the next message goes out.
+
+    Attributes:
+        webhook_url (str): Make.com webhook URL (MAKE_WEBHOOK_URL)
+        workers (int): Concurrent webhook calls
+        queue_size (int): Jobs that may wait for a worker before submissions are refused
+        timeout (float): Seconds a single webhook call may take
+    """
+
+    def __init__(self, webhook_url: Optional[str] = None, workers: int = 4, queue_size: int = 32,
+                 timeout: float = DEFAULT_TIMEOUT):
+        self.webhook_url = webhook_url or os.environ.get("MAKE_WEBHOOK_URL", DEFAULT_WEBHOOK_URL)
+        self.workers = workers
+        self.queue_size = queue_size
+        self.timeout = timeout
+        self.thread_ids: Dict[str, str] = {}
+        self.jobs: Dict[str, MakeJob] = {}
         self.logger = logging.getLogger(__name__)
+        self._lock = threading.Lock()
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._queue: Optional[asyncio.Queue] = None
+        self._client: Optional[httpx.AsyncClient] = None
+        self._session_locks: Dict[str, asyncio.Lock] = {}
+
+    def _ensure_started(self) -> asyncio.AbstractEventLoop:
+        with self._lock:
+            if self._loop is None:
+                loop = asyncio.new_event_loop()
+                ready = threading.Event()
+                threading.Thread(target=self._run_loop, args=(loop, ready), name="make-dispatch", daemon=True).start()
+                ready.wait()
+                self._loop = loop
+            return self._loop
+
+    def _run_loop(self, loop: asyncio.AbstractEventLoop, ready: threading.Event) -> None:
+        asyncio.set_event_loop(loop)
+        self._queue = asyncio.Queue(maxsize=self.queue_size)
+        self._client = httpx.AsyncClient(
+            timeout=httpx.Timeout(self.timeout, connect=10.0),
+            limits=httpx.Limits(max_connections=self.workers, max_keepalive_connections=self.workers),
+        )
+        for _ in range(self.workers):
+            loop.create_task(self._worker())
+        loop.call_soon(ready.set)
+        loop.run_forever()
+
+    async def _worker(self) -> None:
+        while True:
+            job = await self._queue.get()
+            try:
+                job.status = "running"
+                lock = self._session_locks.setdefault(job.session_id, asyncio.Lock())
+                async with lock:
+                    job.result = await self.send_message(job.message, job.session_id)
+            except Exception as e:
+                error_msg = f"Unexpected error: {str(e)}"
+                self.logger.error(error_msg)
+                job.result = MakeResponse(success=False, content={}, status_code=500, error=error_msg)
+            finally:
+                self._queue.task_done()
+            with self._lock:
+                job.status = "done"
+                job.done.set()
+                deliver = job.notify_when_done
+            if deliver:
+                notify({"type": "make_result", "job_id": job.job_id, "content": format_make_response(job.result)},
+                       session_id=job.session_id)
+
+    async def _enqueue(self, job: MakeJob) -> None:
+        self._queue.put_nowait(job)
+
+    def submit(self, message: str, session_id: str) -> MakeJob:
+        """
+        Queue a message for the webhook.
+
+        Args:
+            message (str): Message to send to Make.com
+            session_id (str): Chat session whose Make thread the message belongs to
+
+        Returns:
+            MakeJob: Handle to wait on or look up later with `get_job`
 
-    def send_message(self, message: str) -> MakeResponse:
+        Raises:
+            MakeQueueFull: If the dispatch queue is full
+        """
+        loop = self._ensure_started()
+        job = MakeJob(job_id=uuid.uuid4().hex[:12], session_id=session_id, message=message)
+        try:
+            asyncio.run_coroutine_threadsafe(self._enqueue(job), loop).result()
+        except asyncio.QueueFull:
+            raise MakeQueueFull(f"{self.queue_size} Make.com requests are already waiting")
+        with self._lock:
+            self._prune_jobs()
+            self.jobs[job.job_id] = job
+        return job
+
+    def wait(self, job: MakeJob, timeout: float) -> bool:
+        """
+        Wait for a job to finish.
+
+        If it does not finish in time, its result is pushed to the session's websocket
+        once it is ready.
+
+        Returns:
+            bool: True if the job finished within `timeout`
+        """
+        if job.done.wait(timeout):
+            return True
+        with self._lock:
+            if job.done.is_set():
+                return True
+            job.notify_when_done = True
+        return False
+
+    def get_job(self, job_id: str) -> Optional[MakeJob]:
+        with self._lock:
+            return self.jobs.get(job_id)
+
+    def _prune_jobs(self) -> None:
+        cutoff = time.time() - JOB_TTL
+        for job_id in [job_id for job_id, job in self.jobs.items() if job.done.is_set() and job.created < cutoff]:
+            del self.jobs[job_id]
+
+    async def send_message(self, message: str, session_id: str) -> MakeResponse:
         """
         Send a message to Make.com webhook and handle various response types.
-        
+
         Args:
             message (str): Message to send to Make.com
-            
+            session_id (str): Chat session whose Make thread the message belongs to
+
         Returns:
             MakeResponse: Structured response containing status and content
         """
@@ -35,59 +191,70 @@ class MakeWebhookHandler:
             'Accept': 'application/json, text/plain, image/*'
         }
 
-        thread_id = self.thread_id_store.get("latest_thread_id")
+        thread_id = self.thread_ids.get(session_id)
         if thread_id:
             headers['thread_id'] = thread_id
 
         data = {"message": message}
-        
+
         try:
             self.logger.debug(f"Sending request to webhook: {data}")
-            
-            response = requests.post(
-                self.webhook_url,
-                json=data,
-                headers=headers,
-                timeout=30
-            )
-            
+
+            for attempt in range(MAX_RETRIES + 1):
+                try:
+                    response = await self._client.post(self.webhook_url, json=data, headers=headers)
+                except (httpx.ConnectError, httpx.ConnectTimeout, httpx.PoolTimeout):
+                    if attempt == MAX_RETRIES:
+                        raise
+                else:
+                    if response.status_code not in RETRYABLE_STATUSES or attempt == MAX_RETRIES:
+                        break
+                delay = min(2 ** attempt, 10) * (0.5 + random.random() / 2)
+                self.logger.warning(f"Make.com webhook unavailable, retrying in {delay:.1f}s")
+                await asyncio.sleep(delay)
+
             # Log response details
             self.logger.debug(f"Response status: {response.status_code}")
             self.logger.debug(f"Response headers: {response.headers}")
-            
+
+            if response.status_code >= 400:
+                return MakeResponse(
+                    success=False,
+                    content={},
+                    status_code=response.status_code,
+                    error=f"Webhook returned HTTP {response.status_code}: {response.text[:500]}"
+                )
+
             # Check if response is an image URL
             content_type = response.headers.get('Content-Type', '')
             if 'image' in content_type or response.text.startswith('http') and any(ext in response.text.lower() for ext in ['.png', '.jpg', '.jpeg', '.gif']):
-                return MakeResponse(
+                return self._remember_thread(session_id, MakeResponse(
                     success=True,
                     content={"type": "image", "url": response.text.strip()},
                     status_code=response.status_code,
                     thread_id=response.headers.get('thread_id')
-                )
-            
+                ))
+
             # Try to parse as JSON
             try:
                 response_data = response.json()
-                thread_id = response_data.get('thread_id')
-                if thread_id:
-                    self.thread_id_store["latest_thread_id"] = thread_id
-                
-                return MakeResponse(
+                thread_id = response_data.get('thread_id') if isinstance(response_data, dict) else None
+                return self._remember_thread(session_id, MakeResponse(
                     success=True,
                     content=response_data,
                     status_code=response.status_code,
-                    thread_id=thread_id
-                )
+                    thread_id=thread_id or response.headers.get('thread_id')
+                ))
             except ValueError:
                 # If not JSON, return text response
-                return MakeResponse(
+                return self._remember_thread(session_id, MakeResponse(
                     success=True,
                     content={"type": "text", "content": response.text},
                     status_code=response.status_code,
                     thread_id=response.headers.get('thread_id')
-                )
-            
-        except requests.Timeout:
+                ))
+
+        except httpx.TimeoutException:
             error_msg = "Request to webhook timed out"
             self.logger.error(error_msg)
             return MakeResponse(
@@ -96,8 +263,8 @@ class MakeWebhookHandler:
                 status_code=504,
                 error=error_msg
             )
-            
-        except requests.RequestException as e:
+
+        except httpx.HTTPError as e:
             error_msg = f"Failed to communicate with webhook: {str(e)}"
             self.logger.error(error_msg)
             return MakeResponse(
@@ -106,32 +273,35 @@ class MakeWebhookHandler:
                 status_code=500,
                 error=error_msg
             )
-            
-        except Exception as e:
-            error_msg = f"Unexpected error: {str(e)}"
-            self.logger.error(error_msg)
-            return MakeResponse(
-                success=False,
-                content={},
-                status_code=500,
-                error=error_msg
-            )
 
-# Create singleton instance
-make_handler = MakeWebhookHandler()
+    def _remember_thread(self, session_id: str, result: MakeResponse) -> MakeResponse:
+        if result.thread_id:
+            self.thread_ids[session_id] = result.thread_id
+        return result
 
-def send_to_make(message: str) -> str:
-    """
-    Function to be used by the Make agent to send messages.
-    
-    Args:
-        message (str): Message to send to Make.com
-        
-    Returns:
-        str: Formatted response message
-    """
-    result = make_handler.send_message(message)
-    
+    def forget_session(self, session_id: str) -> None:
+        """Drop the Make thread of a closed chat session."""
+        self.thread_ids.pop(session_id, None)
+        if self._loop is not None:
+            self._loop.call_soon_threadsafe(self._session_locks.pop, session_id, None)
+
+_make_handler: Optional[MakeWebhookHandler] = None
+_make_handler_lock = threading.Lock()
+
+def get_make_handler() -> MakeWebhookHandler:
+    """Return the shared webhook handler (MAKE_WORKERS, MAKE_QUEUE_SIZE, MAKE_TIMEOUT)."""
+    global _make_handler
+    with _make_handler_lock:
+        if _make_handler is None:
+            _make_handler = MakeWebhookHandler(
+                workers=int(os.environ.get("MAKE_WORKERS", "4")),
+                queue_size=int(os.environ.get("MAKE_QUEUE_SIZE", "32")),
+                timeout=float(os.environ.get("MAKE_TIMEOUT", DEFAULT_TIMEOUT)),
+            )
+        return _make_handler
+
+def format_make_response(result: MakeResponse) -> str:
+    """Render a webhook response as text for the agent."""
     if result.success:
         if isinstance(result.content, dict):
             if result.content.get("type") == "image":
@@ -142,4 +312,50 @@ def send_to_make(message: str) -> str:
                 return str(result.content)
         return str(result.content)
     else:
-        return f"Error: {result.error}"
\ No newline at end of file
+        return f"Error: {result.error}"
+
+def send_to_make(message: str, wait: bool = True) -> str:
+    """
+    Function to be used by the Make agent to send messages.
+
+    Long-running scenarios do not block the conversation: if the reply takes longer than
+    about 20 seconds (or wait is False), a job id is returned and the reply is shown to the
+    user when it arrives. It can also be fetched with get_make_result.
+
+    Args:
+        message (str): Message to send to Make.com
+        wait (bool): Wait briefly for the reply. Set to False to send and continue immediately.
+
+    Returns:
+        str: Formatted response message, or the job id of a request still running
+    """
+    handler = get_make_handler()
+    try:
+        job = handler.submit(message, get_current_session())
+    except MakeQueueFull as e:
+        return f"Error: Make.com is busy ({str(e)}). Try again shortly."
+
+    wait_seconds = float(os.environ.get("MAKE_WAIT_SECONDS", DEFAULT_WAIT_SECONDS)) if wait else 0.0
+    if handler.wait(job, wait_seconds):
+        return format_make_response(job.result)
+    return (f"Make.com is still processing the request (job id: {job.job_id}). "
+            "The result will be shown to the user when it is ready, or call get_make_result to fetch it.")
+
+def get_make_result(job_id: str, wait_seconds: float = 0) -> str:
+    """
+    Get the result of a Make.com request that was still running when send_to_make returned.
+
+    Args:
+        job_id (str): The job id returned by send_to_make
+        wait_seconds (float): Seconds to wait for the result if it is not ready yet (at most 30)
+
+    Returns:
+        str: The formatted response, or the job's current status
+    """
+    handler = get_make_handler()
+    job = handler.get_job(job_id)
+    if job is None or job.session_id != get_current_session():
+        return f"Error: No Make.com job with id {job_id}"
+    if job.done.wait(min(max(wait_seconds, 0), 30)):
+        return format_make_response(job.result)
+    return f"Make.com job {job_id} is still {job.status}."
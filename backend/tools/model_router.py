@@ -0,0 +1,174 @@
+# backend/tools/model_router.py
+
+import collections
+import json
+import logging
+import os
+import statistics
+import threading
+import time
+from typing import Any, Deque, Dict, List, Optional, Tuple
+
+DEFAULT_MODEL = "gpt-4o-mini"
+DEFAULT_CONFIG_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "models.json")
+DEFAULT_HEALTH = {
+    "window": 20,              # most recent calls considered per model
+    "min_samples": 5,          # calls needed before a model can be judged
+    "max_error_rate": 0.25,    # share of failed calls in the window
+    "max_ttft_seconds": 5.0,   # median time to first token in the window
+    "cooldown_seconds": 30.0,  # how long a degraded model is avoided before it is tried again
+}
+
+logger = logging.getLogger(__name__)
+
+def is_failover_error(error: BaseException) -> bool:
+    """
+    Whether a failed call says something about the model rather than the request.
+
+    Connection errors, rate limits and 5xx responses count against a model's
+    health and are worth retrying on a fallback; a bad request (context too
+    long, invalid tool schema, content filter) would fail on any model.
+    """
+    import openai
+
+    if isinstance(error, (openai.APIConnectionError, openai.RateLimitError)):
+        return True
+    return isinstance(error, openai.APIStatusError) and error.status_code >= 500
+
+class ModelHealth:
+    """Recent outcomes of one model's calls, and whether it is being avoided."""
+
+    def __init__(self, window: int) -> None:
+        self.calls: Deque[Tuple[bool, Optional[float]]] = collections.deque(maxlen=window)
+        self.degraded_until = 0.0
+        self.reason: Optional[str] = None
+
+    def error_rate(self) -> float:
+        return sum(1 for ok, _ in self.calls if not ok) / len(self.calls) if self.calls else 0.0
+
+    def median_ttft(self) -> Optional[float]:
+        ttfts = [ttft for ok, ttft in self.calls if ok and ttft is not None]
+        return statistics.median(ttfts) if ttfts else None
+
+class ModelRouter:
+    """
+    Chooses the model for each agent and tool, and steers calls away from degraded models.
+
+    The configuration is a JSON file (MODEL_CONFIG, default backend/models.json):
+
+        default    model for agents not listed (MODEL overrides it)
+        agents     agent name -> model
+        tools      tool name -> model, for tools that call a model themselves
+        fallbacks  model -> models to use, in order, while it is degraded
+        health     thresholds, see DEFAULT_HEALTH
+        model_health  model -> thresholds that differ for it (o1 models think
+                   before their first token, so need a far higher TTFT limit)
+
+    Every call's outcome and time to first token is reported with observe().
+    A model whose error rate or median TTFT over the last `window` calls
+    crosses its threshold is marked degraded for `cooldown_seconds`. Calls are
+    routed to its first healthy fallback until then, and after it the model
+    gets traffic again and is judged afresh on new calls.
+    """
+
+    def __init__(self, config: Optional[Dict[str, Any]] = None) -> None:
+        config = config or {}
+        self.default = os.environ.get("MODEL") or config.get("default") or DEFAULT_MODEL
+        self.agents: Dict[str, str] = config.get("agents", {})
+        self.tools: Dict[str, str] = config.get("tools", {})
+        self.fallbacks: Dict[str, List[str]] = config.get("fallbacks", {})
+        self.health = dict(DEFAULT_HEALTH, **config.get("health", {}))
+        self.model_health: Dict[str, Dict[str, float]] = config.get("model_health", {})
+        self._models: Dict[str, ModelHealth] = {}
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_file(cls, path: str) -> "ModelRouter":
+        if not os.path.exists(path):
+            logger.warning(f"Model config {path} not found; every agent uses the default model")
+            return cls()
+        with open(path) as f:
+            return cls(json.load(f))
+
+    def agent_model(self, agent_name: str) -> str:
+        return self.agents.get(agent_name, self.default)
+
+    def tool_model(self, tool_name: str, default: str) -> str:
+        return self.tools.get(tool_name, default)
+
+    def _threshold(self, model: str, name: str) -> float:
+        return self.model_health.get(model, {}).get(name, self.health[name])
+
+    def _health(self, model: str) -> ModelHealth:
+        health = self._models.get(model)
+        if health is None:
+            health = self._models[model] = ModelHealth(int(self.health["window"]))
+        return health
+
+    def is_degraded(self, model: str) -> bool:
+        with self._lock:
+            health = self._models.get(model)
+            return health is not None and health.degraded_until > time.monotonic()
+
+    def chain(self, model: str) -> List[str]:
+        """The model and its fallbacks that are not degraded, in order of preference."""
+        candidates = [model] + [fallback for fallback in self.fallbacks.get(model, []) if fallback != model]
+        return [candidate for candidate in candidates if not self.is_degraded(candidate)]
+
+    def route(self, model: str) -> str:
+        """The model to call for `model`: itself, a healthy fallback, or itself again if all are degraded."""
+        chain = self.chain(model)
+        return chain[0] if chain else model
+
+    def observe(self, model: str, ttft: Optional[float] = None, error: bool = False) -> None:
+        """
+        Record the outcome of a call.
+
+        Args:
+            model (str): Model that was called
+            ttft (Optional[float]): Seconds to the first streamed chunk, if streamed
+            error (bool): Whether the call failed
+        """
+        with self._lock:
+            health = self._health(model)
+            health.calls.append((not error, ttft))
+            if len(health.calls) < self._threshold(model, "min_samples") or health.degraded_until > time.monotonic():
+                return
+            error_rate, ttft_median = health.error_rate(), health.median_ttft()
+            if error_rate > self._threshold(model, "max_error_rate"):
+                reason = f"error rate {error_rate:.0%}"
+            elif ttft_median is not None and ttft_median > self._threshold(model, "max_ttft_seconds"):
+                reason = f"median TTFT {ttft_median:.2f}s"
+            else:
+                return
+            cooldown = self._threshold(model, "cooldown_seconds")
+            health.degraded_until = time.monotonic() + cooldown
+            health.reason = reason
+            health.calls.clear()
+        logger.warning(f"Model {model} degraded ({reason}); using fallbacks for {cooldown:.0f}s")
+
+    def status(self) -> Dict[str, Dict[str, Any]]:
+        """Health of every model that has been called."""
+        now = time.monotonic()
+        with self._lock:
+            return {
+                model: {
+                    "degraded": health.degraded_until > now,
+                    "reason": health.reason if health.degraded_until > now else None,
+                    "retry_in_seconds": round(max(health.degraded_until - now, 0), 1),
+                    "calls": len(health.calls),
+                    "error_rate": round(health.error_rate(), 3),
+                    "median_ttft_seconds": health.median_ttft(),
+                }
+                for model, health in self._models.items()
+            }
+
+_router: Optional[ModelRouter] = None
+_router_lock = threading.Lock()
+
+def get_router() -> ModelRouter:
+    global _router
+    with _router_lock:
+        if _router is None:
+            _router = ModelRouter.from_file(os.environ.get("MODEL_CONFIG", DEFAULT_CONFIG_PATH))
+        return _router
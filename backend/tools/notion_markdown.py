@@ -0,0 +1,251 @@
+# backend/tools/notion_markdown.py
+
+import json
+import re
+from typing import Any, Dict, List, Optional
+
+MAX_RICH_TEXT_CHARS = 2000
+MAX_RICH_TEXT_ITEMS = 100
+MAX_TABLE_ROWS = 100
+# Per-request limits of the block-children endpoints: nested blocks count towards
+# MAX_REQUEST_BLOCKS, and the page properties around the blocks need some of the 500KB
+MAX_REQUEST_BLOCKS = 1000
+MAX_REQUEST_BYTES = 480_000
+
+# Notion's code block language identifiers for common fence names
+CODE_LANGUAGES = {
+    "py": "python", "python": "python", "js": "javascript", "javascript": "javascript",
+    "ts": "typescript", "typescript": "typescript", "tsx": "typescript", "jsx": "javascript",
+    "sh": "shell", "bash": "bash", "shell": "shell", "zsh": "shell", "json": "json",
+    "yaml": "yaml", "yml": "yaml", "html": "html", "css": "css", "sql": "sql",
+    "go": "go", "rust": "rust", "java": "java", "c": "c", "cpp": "c++", "c++": "c++",
+    "csharp": "c#", "cs": "c#", "ruby": "ruby", "php": "php", "markdown": "markdown",
+    "md": "markdown", "xml": "xml", "diff": "diff", "docker": "docker", "dockerfile": "docker",
+}
+
+INLINE = re.compile(
+    r"(\*\*(?P<bold>.+?)\*\*)"
+    r"|(`(?P<code>[^`]+)`)"
+    r"|(\[(?P<link_text>[^\]]+)\]\((?P<link_url>[^)\s]+)\))"
+    r"|(\*(?P<italic>[^*\s][^*]*?)\*)"
+    r"|(~~(?P<strike>.+?)~~)"
+)
+
+HEADING = re.compile(r"^(#{1,3})\s+(.*)$")
+BULLET = re.compile(r"^\s*[-*+]\s+(.*)$")
+TODO = re.compile(r"^\s*[-*+]\s+\[([ xX])\]\s+(.*)$")
+NUMBERED = re.compile(r"^\s*\d+[.)]\s+(.*)$")
+QUOTE = re.compile(r"^>\s?(.*)$")
+DIVIDER = re.compile(r"^\s*(-{3,}|\*{3,}|_{3,})\s*$")
+FENCE = re.compile(r"^\s*```\s*([\w+#-]*)\s*$")
+TABLE_SEPARATOR = re.compile(r"^\s*\|?\s*:?-{2,}:?\s*(\|\s*:?-{2,}:?\s*)*\|?\s*$")
+
+def _text_item(content: str, annotations: Optional[Dict[str, bool]] = None, url: Optional[str] = None) -> List[Dict[str, Any]]:
+    """Build rich-text items for a run of text, split at Notion's 2,000-character limit."""
+    items = []
+    for start in range(0, len(content), MAX_RICH_TEXT_CHARS):
+        item: Dict[str, Any] = {"type": "text", "text": {"content": content[start:start + MAX_RICH_TEXT_CHARS]}}
+        if url:
+            item["text"]["link"] = {"url": url}
+        if annotations:
+            item["annotations"] = annotations
+        items.append(item)
+    return items
+
+def rich_text(text: str) -> List[Dict[str, Any]]:
+    """
+    Convert a line of markdown inline formatting to Notion rich text.
+
+    Supports **bold**, *italic*, ~~strikethrough~~, `code` and [links](url).
+    """
+    items: List[Dict[str, Any]] = []
+    position = 0
+    for match in INLINE.finditer(text):
+        if match.start() > position:
+            items.extend(_text_item(text[position:match.start()]))
+        if match.group("bold") is not None:
+            items.extend(_text_item(match.group("bold"), {"bold": True}))
+        elif match.group("code") is not None:
+            items.extend(_text_item(match.group("code"), {"code": True}))
+        elif match.group("link_text") is not None:
+            items.extend(_text_item(match.group("link_text"), url=match.group("link_url")))
+        elif match.group("italic") is not None:
+            items.extend(_text_item(match.group("italic"), {"italic": True}))
+        elif match.group("strike") is not None:
+            items.extend(_text_item(match.group("strike"), {"strikethrough": True}))
+        position = match.end()
+    if position < len(text):
+        items.extend(_text_item(text[position:]))
+
+    return items
+
+def _item_groups(items: List[Dict[str, Any]]) -> List[List[Dict[str, Any]]]:
+    """Split rich-text items into groups that fit in one block, keeping at least one group."""
+    return [items[i:i + MAX_RICH_TEXT_ITEMS] for i in range(0, len(items), MAX_RICH_TEXT_ITEMS)] or [[]]
+
+def _blocks(block_type: str, text: str, **extra: Any) -> List[Dict[str, Any]]:
+    """
+    Blocks of one type holding a line of text.
+
+    A block takes at most 100 rich-text items of 2,000 chars; the items of longer
+    or heavily styled text continue in further blocks of the same type.
+    """
+    return [
+        {"object": "block", "type": block_type, block_type: {"rich_text": group, **extra}}
+        for group in _item_groups(rich_text(text))
+    ]
+
+def _table_cells(line: str) -> List[str]:
+    return [cell.strip() for cell in line.strip().strip("|").split("|")]
+
+def _table_blocks(rows: List[List[str]], has_header: bool) -> List[Dict[str, Any]]:
+    """
+    Table blocks of at most 100 rows each.
+
+    A cell can only hold one block's worth of rich text; the rest of an
+    oversized cell follows its table as paragraphs, so no text is lost.
+    """
+    width = max(len(row) for row in rows)
+    blocks = []
+    header = rows[:1] if has_header else []
+    body = rows[1:] if has_header else rows
+    chunk = MAX_TABLE_ROWS - len(header)
+    for start in range(0, max(len(body), 1), chunk):
+        table_rows = []
+        overflow = []
+        for row in header + body[start:start + chunk]:
+            cells = []
+            for cell in row + [""] * (width - len(row)):
+                groups = _item_groups(rich_text(cell))
+                cells.append(groups[0])
+                overflow.extend({"object": "block", "type": "paragraph", "paragraph": {"rich_text": group}}
+                                for group in groups[1:])
+            table_rows.append({"object": "block", "type": "table_row", "table_row": {"cells": cells}})
+        blocks.append({
+            "object": "block",
+            "type": "table",
+            "table": {
+                "table_width": width,
+                "has_column_header": has_header,
+                "has_row_header": False,
+                "children": table_rows
+            }
+        })
+        blocks.extend(overflow)
+    return blocks
+
+def markdown_to_blocks(markdown: str) -> List[Dict[str, Any]]:
+    """
+    Convert markdown to a list of Notion blocks.
+
+    Handles headings (#-###), paragraphs, bulleted/numbered/to-do lists, quotes,
+    dividers, fenced code blocks and pipe tables. Text longer than Notion's
+    per-item limits is split so every block is accepted by the API.
+
+    Args:
+        markdown (str): Markdown source
+
+    Returns:
+        List[Dict[str, Any]]: Notion block objects in document order
+    """
+    blocks: List[Dict[str, Any]] = []
+    lines = markdown.splitlines()
+    paragraph: List[str] = []
+    i = 0
+
+    def flush_paragraph() -> None:
+        if paragraph:
+            blocks.extend(_blocks("paragraph", " ".join(line.strip() for line in paragraph)))
+            paragraph.clear()
+
+    while i < len(lines):
+        line = lines[i]
+
+        fence = FENCE.match(line)
+        if fence:
+            flush_paragraph()
+            code_lines = []
+            i += 1
+            while i < len(lines) and not FENCE.match(lines[i]):
+                code_lines.append(lines[i])
+                i += 1
+            code = "\n".join(code_lines)
+            language = CODE_LANGUAGES.get(fence.group(1).lower(), "plain text")
+            blocks.extend(
+                {"object": "block", "type": "code", "code": {"rich_text": group, "language": language}}
+                for group in _item_groups(_text_item(code) or _text_item(" "))
+            )
+            i += 1
+            continue
+
+        if "|" in line and i + 1 < len(lines) and TABLE_SEPARATOR.match(lines[i + 1]):
+            flush_paragraph()
+            rows = [_table_cells(line)]
+            i += 2
+            while i < len(lines) and "|" in lines[i] and lines[i].strip():
+                rows.append(_table_cells(lines[i]))
+                i += 1
+            blocks.extend(_table_blocks(rows, has_header=True))
+            continue
+
+        if not line.strip():
+            flush_paragraph()
+            i += 1
+            continue
+
+        heading = HEADING.match(line)
+        todo = TODO.match(line)
+        if heading:
+            flush_paragraph()
+            blocks.extend(_blocks(f"heading_{len(heading.group(1))}", heading.group(2).strip()))
+        elif DIVIDER.match(line):
+            flush_paragraph()
+            blocks.append({"object": "block", "type": "divider", "divider": {}})
+        elif todo:
+            flush_paragraph()
+            blocks.extend(_blocks("to_do", todo.group(2), checked=todo.group(1).lower() == "x"))
+        elif BULLET.match(line):
+            flush_paragraph()
+            blocks.extend(_blocks("bulleted_list_item", BULLET.match(line).group(1)))
+        elif NUMBERED.match(line):
+            flush_paragraph()
+            blocks.extend(_blocks("numbered_list_item", NUMBERED.match(line).group(1)))
+        elif QUOTE.match(line):
+            flush_paragraph()
+            blocks.extend(_blocks("quote", QUOTE.match(line).group(1)))
+        else:
+            paragraph.append(line)
+        i += 1
+
+    flush_paragraph()
+    return blocks
+
+def _nested_count(block: Dict[str, Any]) -> int:
+    """The block itself plus every block nested in it (e.g. a table's rows)."""
+    children = block.get(block.get("type"), {}).get("children", [])
+    return 1 + sum(_nested_count(child) for child in children)
+
+def chunk_blocks(blocks: List[Dict[str, Any]], size: int = 100) -> List[List[Dict[str, Any]]]:
+    """
+    Split blocks into batches Notion accepts in one request.
+
+    A batch has at most `size` top-level blocks, at most 1,000 blocks counting
+    nested children, and serializes to under the 500KB payload limit. A block
+    is never split: one that exceeds a limit on its own gets a batch to itself.
+    """
+    batches: List[List[Dict[str, Any]]] = []
+    batch: List[Dict[str, Any]] = []
+    count = size_bytes = 0
+    for block in blocks:
+        block_count = _nested_count(block)
+        block_bytes = len(json.dumps(block).encode("utf-8")) + 1
+        if batch and (len(batch) >= size or count + block_count > MAX_REQUEST_BLOCKS
+                      or size_bytes + block_bytes > MAX_REQUEST_BYTES):
+            batches.append(batch)
+            batch, count, size_bytes = [], 0, 0
+        batch.append(block)
+        count += block_count
+        size_bytes += block_bytes
+    if batch:
+        batches.append(batch)
+    return batches
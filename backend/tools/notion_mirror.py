@@ -0,0 +1,288 @@
+# backend/tools/notion_mirror.py
+
+import logging
+import os
+import sqlite3
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, List, Optional
+
+DEFAULT_SYNC_INTERVAL = 120.0
+FULL_SYNC_INTERVAL = 24 * 3600.0
+MAX_BODY_CHARS = 200000
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS pages (
+    id INTEGER PRIMARY KEY,
+    page_id TEXT UNIQUE NOT NULL,
+    title TEXT NOT NULL,
+    url TEXT,
+    last_edited_time TEXT NOT NULL,
+    synced_at REAL NOT NULL
+);
+CREATE VIRTUAL TABLE IF NOT EXISTS pages_fts USING fts5(
+    title, properties, body, tokenize = 'unicode61 remove_diacritics 2'
+);
+CREATE TABLE IF NOT EXISTS meta (
+    key TEXT PRIMARY KEY,
+    value TEXT NOT NULL
+);
+"""
+
+def _fts_query(query: str) -> str:
+    """Every term must occur; the last term also matches as a prefix so partial words find pages."""
+    terms = [term.replace('"', '""') for term in query.split() if term.strip()]
+    if not terms:
+        return ""
+    return " ".join(f'"{term}"' for term in terms[:-1]) + f' "{terms[-1]}"*'
+
+def _plain_text(rich_text: List[Dict[str, Any]]) -> str:
+    return "".join(item.get("plain_text", "") for item in rich_text or [])
+
+def _property_text(value: Dict[str, Any]) -> str:
+    """Flatten a page property value to searchable text."""
+    kind = value.get("type")
+    data = value.get(kind)
+    if data is None:
+        return ""
+    if kind in ("title", "rich_text"):
+        return _plain_text(data)
+    if kind in ("select", "status"):
+        return data.get("name", "")
+    if kind == "multi_select":
+        return " ".join(option.get("name", "") for option in data)
+    if kind == "date":
+        return " ".join(filter(None, [data.get("start"), data.get("end")]))
+    if kind == "people":
+        return " ".join(person.get("name", "") for person in data if person.get("name"))
+    if kind in ("number", "checkbox", "url", "email", "phone_number"):
+        return str(data)
+    return ""
+
+class NotionMirror:
+    """
+    Local full-text mirror of the Notion pages the integration can access.
+
+    Page titles, properties and the plain text of their blocks are stored in an
+    SQLite FTS5 table. Syncs are incremental: the search API is walked in
+    descending last_edited_time order and stops at the previous sync's
+    watermark, so only edited pages are re-read. A periodic full sync drops
+    pages that were deleted or un-shared.
+
+    Attributes:
+        handler: NotionHandler used for all API calls (and its rate limiter)
+        db_path (str): Location of the SQLite mirror
+    """
+
+    def __init__(self, handler, db_path: str) -> None:
+        self.handler = handler
+        self.db_path = db_path
+        self.logger = logging.getLogger(__name__)
+        self._sync_lock = threading.Lock()
+        self._ready = threading.Event()
+        # Separate from the handler's executor, whose workers fetch the nested blocks of these pages
+        self._executor = ThreadPoolExecutor(max_workers=2, thread_name_prefix="notion-mirror")
+        os.makedirs(os.path.dirname(self.db_path), exist_ok=True)
+        connection = self._connect()
+        try:
+            connection.executescript(SCHEMA)
+            if self._get_meta(connection, "watermark"):
+                self._ready.set()
+        finally:
+            connection.close()
+
+    def _connect(self) -> sqlite3.Connection:
+        connection = sqlite3.connect(self.db_path, timeout=30)
+        connection.execute("PRAGMA journal_mode=WAL")
+        connection.execute("PRAGMA synchronous=NORMAL")
+        return connection
+
+    @staticmethod
+    def _get_meta(connection: sqlite3.Connection, key: str) -> Optional[str]:
+        row = connection.execute("SELECT value FROM meta WHERE key = ?", (key,)).fetchone()
+        return row[0] if row else None
+
+    @staticmethod
+    def _set_meta(connection: sqlite3.Connection, key: str, value: str) -> None:
+        connection.execute("INSERT OR REPLACE INTO meta (key, value) VALUES (?, ?)", (key, value))
+
+    @property
+    def ready(self) -> bool:
+        """True once at least one sync has completed."""
+        return self._ready.is_set()
+
+    def _page_body(self, page_id: str) -> str:
+        parts, size = [], 0
+        for block in self.handler._format_blocks(self.handler.iter_page_blocks(page_id)):
+            if block["content"]:
+                parts.append(block["content"])
+                size += len(block["content"])
+                if size > MAX_BODY_CHARS:
+                    break
+        return "\n".join(parts)[:MAX_BODY_CHARS]
+
+    def sync(self, full: bool = False) -> Dict[str, int]:
+        """
+        Bring the mirror up to date.
+
+        Args:
+            full (bool): Walk every accessible page and remove pages that are no longer returned
+
+        Returns:
+            Dict[str, int]: Number of pages updated, removed and unchanged
+        """
+        with self._sync_lock:
+            stats = {"updated": 0, "removed": 0, "unchanged": 0}
+            connection = self._connect()
+            try:
+                watermark = None if full else self._get_meta(connection, "watermark")
+                known = dict(connection.execute("SELECT page_id, last_edited_time FROM pages"))
+                newest = watermark or ""
+                seen, changed = set(), []
+                for page in self.handler.iter_search(sort_by_last_edited=True):
+                    edited = page.get("last_edited_time", "")
+                    # last_edited_time has minute precision, so pages edited in the watermark's
+                    # minute are re-read rather than assumed unchanged
+                    if watermark and edited < watermark:
+                        break
+                    seen.add(page["id"])
+                    newest = max(newest, edited)
+                    if page.get("archived") or page.get("in_trash"):
+                        if page["id"] in known:
+                            self._remove(connection, page["id"])
+                            stats["removed"] += 1
+                        continue
+                    if not full or known.get(page["id"]) != edited:
+                        changed.append(page)
+                    else:
+                        stats["unchanged"] += 1
+
+                bodies = self._executor.map(lambda page: self._safe_body(page["id"]), changed)
+                for page, body in zip(changed, bodies):
+                    if body is None:
+                        # Hold the watermark back so the page is retried by the next sync
+                        newest = min(newest, page.get("last_edited_time", ""))
+                        continue
+                    self._store(connection, page, body)
+                    stats["updated"] += 1
+                    if stats["updated"] % 50 == 0:
+                        connection.commit()
+
+                if full:
+                    for page_id in set(known) - seen:
+                        self._remove(connection, page_id)
+                        stats["removed"] += 1
+                    self._set_meta(connection, "full_sync", str(time.time()))
+                if newest:
+                    self._set_meta(connection, "watermark", newest)
+                self._set_meta(connection, "last_sync", str(time.time()))
+                connection.commit()
+            finally:
+                connection.close()
+            self._ready.set()
+            self.logger.info(f"Notion mirror synced: {stats}")
+            return stats
+
+    def _safe_body(self, page_id: str) -> Optional[str]:
+        try:
+            return self._page_body(page_id)
+        except Exception as e:
+            self.logger.warning(f"Could not mirror Notion page {page_id}: {str(e)}")
+            return None
+
+    def _store(self, connection: sqlite3.Connection, page: Dict[str, Any], body: str) -> None:
+        properties = page.get("properties", {})
+        property_text = " ".join(
+            f"{name}: {text}" for name, value in properties.items()
+            if value.get("type") != "title" and (text := _property_text(value))
+        )
+        title = self.handler._get_page_title(page)
+        row = connection.execute("SELECT id FROM pages WHERE page_id = ?", (page["id"],)).fetchone()
+        if row:
+            connection.execute(
+                "UPDATE pages SET title = ?, url = ?, last_edited_time = ?, synced_at = ? WHERE id = ?",
+                (title, page.get("url"), page.get("last_edited_time", ""), time.time(), row[0]),
+            )
+            connection.execute("DELETE FROM pages_fts WHERE rowid = ?", (row[0],))
+            rowid = row[0]
+        else:
+            rowid = connection.execute(
+                "INSERT INTO pages (page_id, title, url, last_edited_time, synced_at) VALUES (?, ?, ?, ?, ?)",
+                (page["id"], title, page.get("url"), page.get("last_edited_time", ""), time.time()),
+            ).lastrowid
+        connection.execute(
+            "INSERT INTO pages_fts (rowid, title, properties, body) VALUES (?, ?, ?, ?)",
+            (rowid, title, property_text, body),
+        )
+
+    def _remove(self, connection: sqlite3.Connection, page_id: str) -> None:
+        row = connection.execute("SELECT id FROM pages WHERE page_id = ?", (page_id,)).fetchone()
+        if row:
+            connection.execute("DELETE FROM pages_fts WHERE rowid = ?", (row[0],))
+            connection.execute("DELETE FROM pages WHERE id = ?", (row[0],))
+
+    def ensure_fresh(self, interval: float = DEFAULT_SYNC_INTERVAL) -> None:
+        """Start a background sync when the last one is older than `interval` seconds."""
+        if self._sync_lock.locked():
+            return
+        connection = self._connect()
+        try:
+            last_sync = float(self._get_meta(connection, "last_sync") or 0)
+            last_full = float(self._get_meta(connection, "full_sync") or 0)
+        finally:
+            connection.close()
+        if time.time() - last_sync > interval:
+            full = time.time() - last_full > FULL_SYNC_INTERVAL
+            threading.Thread(target=self._background_sync, args=(full,), daemon=True).start()
+
+    def _background_sync(self, full: bool) -> None:
+        try:
+            self.sync(full=full)
+        except Exception as e:
+            self.logger.error(f"Notion mirror sync failed: {str(e)}")
+
+    def search(self, query: str, limit: int = 10) -> List[Dict[str, Any]]:
+        """
+        Ranked full-text search over mirrored pages.
+
+        Args:
+            query (str): Free-text query; all terms must occur in the page
+            limit (int): Maximum number of results
+
+        Returns:
+            List[Dict]: Results with id, title, url, last_edited and a highlighted snippet
+        """
+        fts_query = _fts_query(query)
+        if not fts_query:
+            return []
+        connection = self._connect()
+        try:
+            rows = connection.execute(
+                """
+                SELECT pages.page_id, pages.title, pages.url, pages.last_edited_time,
+                       snippet(pages_fts, -1, '**', '**', '…', 16)
+                FROM pages_fts JOIN pages ON pages.id = pages_fts.rowid
+                WHERE pages_fts MATCH ?
+                ORDER BY bm25(pages_fts, 10.0, 3.0, 1.0) LIMIT ?
+                """,
+                (fts_query, limit),
+            ).fetchall()
+        finally:
+            connection.close()
+        return [
+            {"id": page_id, "title": title, "url": url, "last_edited": last_edited, "snippet": snippet}
+            for page_id, title, url, last_edited, snippet in rows
+        ]
+
+_mirror: Optional[NotionMirror] = None
+_mirror_lock = threading.Lock()
+
+def get_notion_mirror(handler) -> NotionMirror:
+    """Return the shared mirror (NOTION_MIRROR_PATH, default ./.index/notion.db)."""
+    global _mirror
+    with _mirror_lock:
+        if _mirror is None:
+            db_path = os.environ.get("NOTION_MIRROR_PATH") or os.path.join(os.getcwd(), ".index", "notion.db")
+            _mirror = NotionMirror(handler, os.path.abspath(db_path))
+        return _mirror
@@ -1,29 +1,168 @@
-from typing import Dict, List, Optional, Any, Union
+from typing import Callable, Dict, Iterator, List, Optional, Any, Tuple, Union
+import functools
 import logging
-from notion_client import Client
 import os
+import random
+import sqlite3
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
 from datetime import datetime
 
+from .notion_markdown import chunk_blocks, markdown_to_blocks
+from .notion_mirror import get_notion_mirror
+
+# Blocks whose children are separate pages/databases, not part of this page's content
+SEPARATE_PAGE_TYPES = {"child_page", "child_database"}
+PAGE_CACHE_ENTRIES = 128
+MAX_CHILDREN_PER_REQUEST = 100
+MAX_RETRIES = 5
+RETRYABLE_STATUSES = {429, 500, 502, 503, 504}
+TITLE_UPDATE_WINDOW = 0.5
+
+class RateLimiter:
+    """
+    Thread-safe token bucket.
+
+    Notion allows an average of about 3 requests per second per integration; every
+    API call takes a token first, so concurrent fetches stay under the limit.
+    """
+
+    def __init__(self, rate: float, capacity: Optional[float] = None):
+        self.rate = rate
+        self.capacity = capacity or rate
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+
+    def acquire(self) -> None:
+        while True:
+            with self.lock:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                wait = (1 - self.tokens) / self.rate
+            time.sleep(wait)
+
 class NotionHandler:
     def __init__(self):
+        from notion_client import Client
+
         self.notion = Client(auth=os.environ["NOTION_TOKEN"])
         self.default_parent_id = os.environ.get("NOTION_PARENT_PAGE")
         if not self.default_parent_id:
             raise ValueError("NOTION_PARENT_PAGE environment variable not set")
         self.logger = logging.getLogger(__name__)
+        self.rate_limiter = RateLimiter(float(os.environ.get("NOTION_REQUESTS_PER_SECOND", "3")))
+        self.executor = ThreadPoolExecutor(max_workers=4, thread_name_prefix="notion")
+        self._page_cache: Dict[str, Tuple[str, List[Dict[str, Any]]]] = {}
+        self._page_cache_lock = threading.Lock()
+        self._pending_titles: Dict[str, Dict[str, Any]] = {}
+        self._pending_titles_lock = threading.Lock()
 
-    def search_pages(self, query: str) -> Dict[str, Any]:
+    def _request(self, method, **kwargs) -> Dict[str, Any]:
+        """
+        Call a notion_client endpoint method after taking a rate-limit token.
+
+        Rate-limited (429) and transient server errors are retried with exponential
+        backoff, honouring the Retry-After header when Notion sends one.
+        """
+        from notion_client import APIResponseError
+
+        for attempt in range(MAX_RETRIES + 1):
+            self.rate_limiter.acquire()
+            try:
+                return method(**kwargs)
+            except APIResponseError as e:
+                if e.status not in RETRYABLE_STATUSES or attempt == MAX_RETRIES:
+                    raise
+                retry_after = getattr(e, "headers", {}).get("retry-after")
+                try:
+                    delay = float(retry_after)
+                except (TypeError, ValueError):
+                    delay = min(2 ** attempt, 30) * (0.5 + random.random() / 2)
+                self.logger.warning(f"Notion returned {e.status}, retrying in {delay:.1f}s")
+                time.sleep(delay)
+
+    def append_blocks(self, block_id: str, blocks: List[Dict[str, Any]]) -> None:
+        """Append blocks to a page or block in batches that fit Notion's per-request limits."""
+        # Batches are sent in order: Notion appends each batch after the previous one
+        for batch in chunk_blocks(blocks, MAX_CHILDREN_PER_REQUEST):
+            self._request(self.notion.blocks.children.append, block_id=block_id, children=batch)
+
+    def _list_children(self, block_id: str) -> List[Dict[str, Any]]:
+        """Return all children of a block, following pagination cursors."""
+        children = []
+        cursor = None
+        while True:
+            kwargs = {"block_id": block_id, "page_size": 100}
+            if cursor:
+                kwargs["start_cursor"] = cursor
+            response = self._request(self.notion.blocks.children.list, **kwargs)
+            children.extend(response.get("results", []))
+            if not response.get("has_more"):
+                return children
+            cursor = response.get("next_cursor")
+
+    def iter_page_blocks(self, page_id: str) -> Iterator[Tuple[int, Dict[str, Any]]]:
+        """
+        Yield (depth, block) for every block of a page in document order.
+
+        Children of all blocks at one level are requested concurrently as soon as
+        that level is known, while blocks are yielded strictly in order.
+        """
+        def walk(blocks: List[Dict[str, Any]], depth: int) -> Iterator[Tuple[int, Dict[str, Any]]]:
+            pending = {
+                block["id"]: self.executor.submit(self._list_children, block["id"])
+                for block in blocks
+                if block.get("has_children") and block.get("type") not in SEPARATE_PAGE_TYPES
+            }
+            for block in blocks:
+                yield depth, block
+                if block["id"] in pending:
+                    yield from walk(pending[block["id"]].result(), depth + 1)
+
+        yield from walk(self._list_children(page_id), 0)
+
+    def iter_search(self, query: str = "", sort_by_last_edited: bool = False) -> Iterator[Dict[str, Any]]:
+        """Yield every page matching a search query, following pagination cursors."""
+        cursor = None
+        while True:
+            kwargs: Dict[str, Any] = {
+                "query": query,
+                "filter": {"property": "object", "value": "page"},
+                "page_size": 100,
+            }
+            if sort_by_last_edited:
+                kwargs["sort"] = {"direction": "descending", "timestamp": "last_edited_time"}
+            if cursor:
+                kwargs["start_cursor"] = cursor
+            response = self._request(self.notion.search, **kwargs)
+            yield from response.get("results", [])
+            if not response.get("has_more"):
+                return
+            cursor = response.get("next_cursor")
+
+    def search_pages(self, query: str, limit: int = 20) -> Dict[str, Any]:
         """
         Search for pages in Notion.
         
         Args:
             query (str): Search query
+            limit (int): Maximum number of results; further result pages are requested as needed
             
         Returns:
             Dict containing search results
         """
         try:
-            results = self.notion.search(query=query).get("results", [])
+            results = []
+            for page in self.iter_search(query):
+                results.append(page)
+                if len(results) >= limit:
+                    break
             return {
                 "success": True,
                 "results": [
@@ -43,6 +182,9 @@ class NotionHandler:
     def create_page(self, title: str, content: List[Dict[str, Any]], parent_id: Optional[str] = None) -> Dict[str, Any]:
         """
         Create a new page in Notion.
+
+        The first batch of blocks (see chunk_blocks) is sent with the page itself; the
+        rest are appended in follow-up batches, so content of any length can be written.
         
         Args:
             title (str): Page title
@@ -55,9 +197,11 @@ class NotionHandler:
         try:
             # Use provided parent_id or default to NOTION_PARENT_PAGE
             page_parent_id = parent_id or self.default_parent_id
+            first_batch = next(iter(chunk_blocks(content, MAX_CHILDREN_PER_REQUEST)), [])
             
             # Create the page
-            new_page = self.notion.pages.create(
+            new_page = self._request(
+                self.notion.pages.create,
                 parent={"page_id": page_parent_id},
                 properties={
                     "title": {
@@ -70,8 +214,10 @@ class NotionHandler:
                         ]
                     }
                 },
-                children=content
+                children=first_batch
             )
+            if len(content) > len(first_batch):
+                self.append_blocks(new_page["id"], content[len(first_batch):])
             
             return {
                 "success": True,
@@ -94,7 +240,8 @@ class NotionHandler:
             Dict containing the update status
         """
         try:
-            updated_page = self.notion.pages.update(
+            updated_page = self._request(
+                self.notion.pages.update,
                 page_id=page_id,
                 properties=properties
             )
@@ -107,9 +254,64 @@ class NotionHandler:
             self.logger.error(f"Error updating page: {str(e)}")
             return {"success": False, "error": str(e)}
 
+    def create_pages(self, pages: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """
+        Create several pages concurrently.
+
+        Requests from all pages share the rate limiter, so the batch runs as fast as
+        the API allows without tripping its limit.
+
+        Args:
+            pages (List[Dict]): Items with "title", "content" (a list of blocks) and an optional "parent_id"
+
+        Returns:
+            List of create_page results, in the order of `pages`
+        """
+        futures = [
+            self.executor.submit(self.create_page, page["title"], page["content"], page.get("parent_id"))
+            for page in pages
+        ]
+        return [future.result() for future in futures]
+
+    def update_title(self, page_id: str, title: str) -> Dict[str, Any]:
+        """
+        Set a page's title, coalescing rapid updates of the same page.
+
+        Updates arriving within TITLE_UPDATE_WINDOW seconds of each other are merged
+        into a single API call carrying the latest title; every caller receives the
+        result of that call.
+
+        Args:
+            page_id (str): ID of the page to update
+            title (str): New title
+
+        Returns:
+            Dict containing the update status
+        """
+        with self._pending_titles_lock:
+            pending = self._pending_titles.get(page_id)
+            if pending is None:
+                pending = {"title": title, "future": Future()}
+                self._pending_titles[page_id] = pending
+                timer = threading.Timer(TITLE_UPDATE_WINDOW, self._flush_title, args=(page_id,))
+                timer.daemon = True
+                timer.start()
+            else:
+                pending["title"] = title
+        return pending["future"].result()
+
+    def _flush_title(self, page_id: str) -> None:
+        with self._pending_titles_lock:
+            pending = self._pending_titles.pop(page_id)
+        properties = {"title": {"title": [{"text": {"content": pending["title"]}}]}}
+        pending["future"].set_result(self.update_page(page_id, properties))
+
     def get_page_content(self, page_id: str) -> Dict[str, Any]:
         """
-        Get the content of a page.
+        Get the content of a page, including nested blocks.
+
+        Results are cached by the page's last_edited_time, so an unchanged page costs a
+        single API call.
         
         Args:
             page_id (str): ID of the page
@@ -118,10 +320,21 @@ class NotionHandler:
             Dict containing the page content
         """
         try:
-            blocks = self.notion.blocks.children.list(page_id).get("results", [])
+            page = self._request(self.notion.pages.retrieve, page_id=page_id)
+            last_edited = page.get("last_edited_time", "")
+            with self._page_cache_lock:
+                cached = self._page_cache.get(page_id)
+            if cached and cached[0] == last_edited:
+                return {"success": True, "content": cached[1], "cached": True}
+
+            content = self._format_blocks(self.iter_page_blocks(page_id))
+            with self._page_cache_lock:
+                self._page_cache[page_id] = (last_edited, content)
+                while len(self._page_cache) > PAGE_CACHE_ENTRIES:
+                    self._page_cache.pop(next(iter(self._page_cache)))
             return {
                 "success": True,
-                "content": self._format_blocks(blocks)
+                "content": content
             }
         except Exception as e:
             self.logger.error(f"Error getting page content: {str(e)}")
@@ -137,29 +350,90 @@ class NotionHandler:
                     return title_items[0]["plain_text"]
         return "Untitled"
 
-    def _format_blocks(self, blocks: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
-        """Helper method to format blocks for display"""
+    def _format_blocks(self, blocks) -> List[Dict[str, Any]]:
+        """Helper method to format (depth, block) pairs for display"""
         formatted_blocks = []
-        for block in blocks:
+        for depth, block in blocks:
             block_type = block["type"]
             if block_type in block:
                 content = block[block_type]
-                if "text" in content:
-                    text_content = " ".join([text["plain_text"] for text in content["text"]])
-                    formatted_blocks.append({
-                        "type": block_type,
-                        "content": text_content
-                    })
+                # Current API payloads use "rich_text"; "text" is the pre-2022 name
+                rich_text = content.get("rich_text", content.get("text"))
+                if rich_text is not None:
+                    text_content = "".join([text.get("plain_text", "") for text in rich_text])
+                elif block_type == "child_page":
+                    text_content = content.get("title", "")
+                else:
+                    continue
+                formatted = {
+                    "type": block_type,
+                    "content": text_content,
+                    "depth": depth
+                }
+                if block_type == "to_do":
+                    formatted["checked"] = content.get("checked", False)
+                formatted_blocks.append(formatted)
         return formatted_blocks
 
-# Create singleton instance
-notion_handler = NotionHandler()
+_notion_handler: Optional[NotionHandler] = None
+_notion_handler_lock = threading.Lock()
+
+class NotionNotConfigured(Exception):
+    """Raised when NOTION_TOKEN or NOTION_PARENT_PAGE is missing."""
 
-def search_notion(query: str) -> str:
+def get_notion_handler() -> NotionHandler:
+    """Return the shared handler, creating it (and the Notion client) on first use."""
+    global _notion_handler
+    with _notion_handler_lock:
+        if _notion_handler is None:
+            try:
+                _notion_handler = NotionHandler()
+            except (KeyError, ValueError) as e:
+                raise NotionNotConfigured(f"Notion is not configured: {str(e)}")
+        return _notion_handler
+
+def _requires_notion(func: Callable[..., str]) -> Callable[..., str]:
+    """Report missing Notion credentials as the tool's result instead of failing the turn."""
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        try:
+            return func(*args, **kwargs)
+        except NotionNotConfigured as e:
+            logging.error(str(e))
+            return f"Error: {str(e)}"
+    return wrapper
+
+@_requires_notion
+def search_notion(query: str, fresh: bool = False, limit: int = 10) -> str:
     """
-    Search Notion pages and return formatted results.
+    Search Notion pages by title, properties and page text and return formatted results.
+
+    Answers come from a local mirror that is synced in the background every couple of
+    minutes. Set fresh=True only when the result must reflect edits made moments ago.
+
+    Args:
+        query (str): Words to search for
+        fresh (bool): Query the Notion API directly instead of the local mirror
+        limit (int): Maximum number of results
     """
-    result = notion_handler.search_pages(query)
+    if not fresh:
+        try:
+            mirror = get_notion_mirror(get_notion_handler())
+            mirror.ensure_fresh()
+            if mirror.ready:
+                pages = mirror.search(query, limit=limit)
+                if pages:
+                    lines = ["Found the following pages:\n"]
+                    for page in pages:
+                        lines.append(f"- [{page['title']}]({page['url']})")
+                        if page["snippet"]:
+                            lines.append(f"  {page['snippet']}")
+                    return "\n".join(lines) + "\n"
+        except sqlite3.Error as e:
+            logging.error(f"Notion mirror search failed: {str(e)}")
+
+    # The mirror is not built yet, has no match (the page may be brand new) or freshness was requested
+    result = get_notion_handler().search_pages(query, limit=limit)
     if result["success"]:
         if not result["results"]:
             return "No results found."
@@ -170,62 +444,72 @@ def search_notion(query: str) -> str:
         return response
     return f"Error searching Notion: {result.get('error')}"
 
+@_requires_notion
 def create_notion_page(title: str, content: str, parent_id: Optional[str] = None) -> str:
     """
     Create a new Notion page with the given content.
     
     Args:
         title (str): The title of the new page
-        content (str): The content for the page
+        content (str): The content for the page, as markdown (headings, lists, code blocks and tables are converted)
         parent_id (Optional[str]): Parent page ID. If None, uses NOTION_PARENT_PAGE from environment
     """
-    # Convert content string to Notion blocks format
-    blocks = [{
-        "object": "block",
-        "type": "paragraph",
-        "paragraph": {
-            "rich_text": [{"type": "text", "text": {"content": content}}]
-        }
-    }]
-    
-    result = notion_handler.create_page(title, blocks, parent_id)
+    result = get_notion_handler().create_page(title, markdown_to_blocks(content), parent_id)
     if result["success"]:
         return f"Page created successfully: {result['url']}"
     return f"Error creating page: {result.get('error')}"
 
+@_requires_notion
+def create_notion_pages(pages: List[Dict[str, str]]) -> str:
+    """
+    Create several Notion pages at once.
+
+    Args:
+        pages (List[Dict[str, str]]): Pages to create, each with "title", markdown "content" and an optional "parent_id"
+    """
+    results = get_notion_handler().create_pages([
+        {"title": page["title"], "content": markdown_to_blocks(page.get("content", "")), "parent_id": page.get("parent_id")}
+        for page in pages
+    ])
+    lines = []
+    for page, result in zip(pages, results):
+        if result["success"]:
+            lines.append(f"- {page['title']}: {result['url']}")
+        else:
+            lines.append(f"- {page['title']}: Error creating page: {result.get('error')}")
+    created = sum(1 for result in results if result["success"])
+    return f"Created {created} of {len(pages)} pages:\n" + "\n".join(lines)
+
+@_requires_notion
 def get_notion_page_content(page_id: str) -> str:
     """
     Get the content of a Notion page.
     """
-    result = notion_handler.get_page_content(page_id)
+    result = get_notion_handler().get_page_content(page_id)
     if result["success"]:
         content = result["content"]
         if not content:
             return "Page is empty."
         
-        response = "Page content:\n\n"
+        lines = ["Page content:\n\n"]
         for block in content:
-            response += f"{block['content']}\n\n"
-        return response
+            indent = "  " * block.get("depth", 0)
+            if block["type"] == "to_do":
+                marker = "[x] " if block.get("checked") else "[ ] "
+            elif block["type"] in ("bulleted_list_item", "numbered_list_item"):
+                marker = "- "
+            else:
+                marker = ""
+            lines.append(f"{indent}{marker}{block['content']}\n\n")
+        return "".join(lines)
     return f"Error getting page content: {result.get('error')}"
 
+@_requires_notion
 def update_notion_page(page_id: str, title: str) -> str:
     """
     Update a Notion page's title.
     """
-    properties = {
-        "title": {
-            "title": [
-                {
-                    "text": {
-                        "content": title
-                    }
-                }
-            ]
-        }
-    }
-    
-    result = notion_handler.update_page(page_id, properties)
+    result = get_notion_handler().update_title(page_id, title)
     if result["success"]:
         return f"Page updated successfully: {result['url']}"
     return f"Error updating page: {result.get('error')}"
\ No newline at end of file
@@ -0,0 +1,157 @@
+# backend/tools/package_installer.py
+
+import glob
+import logging
+import os
+import subprocess
+import threading
+from concurrent.futures import Future
+from dataclasses import dataclass
+from importlib import metadata
+from typing import Dict, Optional
+
+from packaging.requirements import InvalidRequirement, Requirement
+from packaging.utils import canonicalize_name
+
+DEFAULT_INSTALL_TIMEOUT = 600
+
+@dataclass
+class InstallResult:
+    success: bool
+    message: str
+    cached: bool = False
+    skipped: bool = False
+
+class PackageInstaller:
+    """
+    Install service for one virtual environment.
+
+    Installs are serialised per environment (pip is not safe to run concurrently on
+    the same site-packages), identical requests that arrive while an install is
+    running share its result, and requirements that are already satisfied are
+    answered from the environment's metadata without starting pip. Every package
+    that is downloaded is also built into a local wheelhouse, so later installs
+    of it run offline.
+
+    Attributes:
+        venv_path (str): Root of the virtual environment
+        wheelhouse (str): Directory of cached wheels
+        timeout (int): Seconds a single pip invocation may take
+    """
+
+    def __init__(self, venv_path: str, wheelhouse: str, timeout: int = DEFAULT_INSTALL_TIMEOUT) -> None:
+        self.venv_path = venv_path
+        self.pip_path = os.path.join(venv_path, "bin", "pip")
+        self.wheelhouse = wheelhouse
+        self.timeout = timeout
+        self._install_lock = threading.Lock()
+        self._inflight: Dict[str, Future] = {}
+        self._inflight_lock = threading.Lock()
+        self.logger = logging.getLogger(__name__)
+
+    def _site_packages(self):
+        return glob.glob(os.path.join(self.venv_path, "lib", "python*", "site-packages"))
+
+    def is_satisfied(self, requirement: Requirement) -> bool:
+        """Check the environment's installed distributions without running pip."""
+        for distribution in metadata.distributions(path=self._site_packages()):
+            name = distribution.metadata["Name"]
+            if name and canonicalize_name(name) == canonicalize_name(requirement.name):
+                return not requirement.specifier or requirement.specifier.contains(distribution.version, prereleases=True)
+        return False
+
+    def install(self, package_spec: str) -> InstallResult:
+        """
+        Install a requirement, coalescing with an identical install already in progress.
+
+        Args:
+            package_spec (str): A pip requirement such as "pandas" or "requests>=2.31"
+
+        Returns:
+            InstallResult: Outcome of the install
+        """
+        try:
+            requirement = Requirement(package_spec)
+        except InvalidRequirement as e:
+            return InstallResult(False, f"Invalid package specification '{package_spec}': {str(e)}")
+
+        if not os.path.exists(self.pip_path):
+            return InstallResult(False, f"Virtual environment not found at {self.venv_path}")
+
+        if not requirement.url and self.is_satisfied(requirement):
+            return InstallResult(True, f"{package_spec} is already installed", skipped=True)
+
+        key = str(requirement).lower()
+        with self._inflight_lock:
+            future = self._inflight.get(key)
+            owner = future is None
+            if owner:
+                future = Future()
+                self._inflight[key] = future
+
+        if not owner:
+            self.logger.info(f"Waiting for in-progress install of {package_spec}")
+            return future.result()
+
+        try:
+            result = self._install(requirement, package_spec)
+            future.set_result(result)
+            return result
+        except Exception as e:
+            result = InstallResult(False, f"Failed to install package {package_spec}: {str(e)}")
+            future.set_result(result)
+            return result
+        finally:
+            with self._inflight_lock:
+                self._inflight.pop(key, None)
+
+    def _pip(self, *args: str) -> subprocess.CompletedProcess:
+        return subprocess.run(
+            [self.pip_path, *args, "--disable-pip-version-check"],
+            stdout=subprocess.PIPE,
+            stderr=subprocess.PIPE,
+            text=True,
+            timeout=self.timeout,
+        )
+
+    def _install(self, requirement: Requirement, package_spec: str) -> InstallResult:
+        with self._install_lock:
+            # Another session may have installed it while we waited for the lock
+            if not requirement.url and self.is_satisfied(requirement):
+                return InstallResult(True, f"{package_spec} is already installed", skipped=True)
+
+            os.makedirs(self.wheelhouse, exist_ok=True)
+            try:
+                offline = self._pip("install", "--no-index", "--find-links", self.wheelhouse, package_spec)
+                if offline.returncode == 0:
+                    self.logger.info(f"Installed {package_spec} from the local wheelhouse")
+                    return InstallResult(True, offline.stdout.strip(), cached=True)
+
+                built = self._pip("wheel", "--wheel-dir", self.wheelhouse, "--find-links", self.wheelhouse, package_spec)
+                if built.returncode != 0:
+                    # Fall back to a plain install for packages that cannot be built as wheels
+                    self.logger.warning(f"Could not cache wheels for {package_spec}: {built.stderr.strip()}")
+                    installed = self._pip("install", package_spec)
+                else:
+                    installed = self._pip("install", "--no-index", "--find-links", self.wheelhouse, package_spec)
+            except subprocess.TimeoutExpired:
+                return InstallResult(False, f"Installing {package_spec} timed out after {self.timeout} seconds")
+
+            if installed.returncode != 0:
+                return InstallResult(False, f"Failed to install package {package_spec}: {installed.stderr.strip()}")
+            return InstallResult(True, installed.stdout.strip())
+
+_installers: Dict[str, PackageInstaller] = {}
+_installers_lock = threading.Lock()
+
+def get_installer(venv_path: str = "venv", wheelhouse: Optional[str] = None) -> PackageInstaller:
+    """Return the shared installer of a virtual environment."""
+    venv_path = os.path.abspath(venv_path)
+    with _installers_lock:
+        installer = _installers.get(venv_path)
+        if installer is None:
+            wheelhouse = wheelhouse or os.environ.get("WHEELHOUSE_DIR") or os.path.join(os.path.dirname(venv_path), ".wheelhouse")
+            timeout = int(os.environ.get("PIP_INSTALL_TIMEOUT", DEFAULT_INSTALL_TIMEOUT))
+            installer = PackageInstaller(venv_path, os.path.abspath(wheelhouse), timeout)
+            _installers[venv_path] = installer
+    return installer
@@ -0,0 +1,221 @@
+# backend/tools/pdf_tools.py
+
+import hashlib
+import json
+import logging
+import multiprocessing
+import os
+import threading
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, List, Optional
+
+CHARS_PER_TOKEN = 4
+PARALLEL_PAGE_THRESHOLD = 40
+PAGES_PER_TASK = 16
+MEMORY_CACHE_ENTRIES = 32
+
+_executor: Optional[ProcessPoolExecutor] = None
+_executor_lock = threading.Lock()
+
+def parse_page_range(pages: Optional[str], num_pages: int) -> List[int]:
+    """
+    Parse a 1-based page selection such as "1-5,8,12-" into 0-based page indices.
+
+    Args:
+        pages (Optional[str]): Page selection. None or "" selects every page.
+        num_pages (int): Number of pages in the document
+
+    Returns:
+        List[int]: Sorted, de-duplicated 0-based page indices within the document
+
+    Raises:
+        ValueError: If the selection cannot be parsed
+    """
+    if not pages or not str(pages).strip():
+        return list(range(num_pages))
+
+    selected = set()
+    for part in str(pages).replace(" ", "").split(","):
+        if not part:
+            continue
+        if "-" in part:
+            start_text, end_text = part.split("-", 1)
+            start = int(start_text) if start_text else 1
+            end = int(end_text) if end_text else num_pages
+        else:
+            start = end = int(part)
+        if start < 1 or end < start:
+            raise ValueError(f"Invalid page range: {part}")
+        selected.update(range(start - 1, min(end, num_pages)))
+    return sorted(selected)
+
+def format_page_range(indices: List[int]) -> str:
+    """Format sorted 0-based page indices as a 1-based selection such as "1-3,50-60"."""
+    runs = []
+    for index in indices:
+        if runs and index == runs[-1][1] + 1:
+            runs[-1][1] = index
+        else:
+            runs.append([index, index])
+    return ",".join(f"{start + 1}-{end + 1}" if end > start else f"{start + 1}" for start, end in runs)
+
+def _extract_pages(path: str, indices: List[int]) -> Dict[int, str]:
+    """Extract the text of the given pages. Runs in pool workers, so it opens its own reader."""
+    import PyPDF2 # type: ignore
+
+    with open(path, "rb") as file:
+        reader = PyPDF2.PdfReader(file)
+        return {index: reader.pages[index].extract_text() or "" for index in indices}
+
+def _fill_missing_pages(path: str, entry: Dict, indices: List[int]) -> bool:
+    """Extract pages not yet in the cache entry. Returns True if anything was added."""
+    missing = [index for index in indices if index not in entry["pages"]]
+    if not missing:
+        return False
+    if len(missing) >= PARALLEL_PAGE_THRESHOLD and (os.cpu_count() or 1) > 1:
+        chunks = [missing[i:i + PAGES_PER_TASK] for i in range(0, len(missing), PAGES_PER_TASK)]
+        for extracted in _get_executor().map(_extract_pages, [path] * len(chunks), chunks):
+            entry["pages"].update(extracted)
+    else:
+        entry["pages"].update(_extract_pages(path, missing))
+    return True
+
+def _pool_size() -> int:
+    return max(1, min(4, (os.cpu_count() or 1)))
+
+def _get_executor() -> ProcessPoolExecutor:
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            # The pool is created lazily from a worker thread while other threads run; a forked
+            # child could inherit a lock one of them holds, so workers come from a forkserver
+            method = "forkserver" if "forkserver" in multiprocessing.get_all_start_methods() else "spawn"
+            _executor = ProcessPoolExecutor(max_workers=_pool_size(), mp_context=multiprocessing.get_context(method))
+        return _executor
+
+def _budgeted_batch_size() -> int:
+    """
+    Pages to extract at a time when output is capped by a token budget.
+
+    On more than one CPU this is a full round of the process pool, and never
+    less than PARALLEL_PAGE_THRESHOLD, so budgeted reads take the parallel path.
+    Pages past the budget stay in the cache for the follow-up read.
+    """
+    if (os.cpu_count() or 1) <= 1:
+        return PAGES_PER_TASK
+    return max(PARALLEL_PAGE_THRESHOLD, PAGES_PER_TASK * _pool_size())
+
+class PdfTextCache:
+    """
+    Per-page text cache for PDFs keyed by path, mtime and size.
+
+    Pages live in a small in-memory LRU and in JSON files on disk, so a PDF that was
+    read once (even partially) is served instantly after a restart, and an edited
+    file automatically gets a new key.
+    """
+
+    def __init__(self, cache_dir: str) -> None:
+        self.cache_dir = cache_dir
+        self._memory: "OrderedDict[str, Dict]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def key_for(path: str) -> str:
+        stat = os.stat(path)
+        raw = f"{os.path.abspath(path)}:{stat.st_mtime_ns}:{stat.st_size}"
+        return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+    def _disk_path(self, key: str) -> str:
+        return os.path.join(self.cache_dir, f"{key}.json")
+
+    def load(self, key: str) -> Dict:
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is not None:
+                self._memory.move_to_end(key)
+                return entry
+        entry = {"num_pages": None, "pages": {}}
+        try:
+            with open(self._disk_path(key), "r", encoding="utf-8") as f:
+                stored = json.load(f)
+            entry = {"num_pages": stored["num_pages"], "pages": {int(k): v for k, v in stored["pages"].items()}}
+        except (OSError, ValueError, KeyError):
+            pass
+        self._remember(key, entry)
+        return entry
+
+    def store(self, key: str, entry: Dict) -> None:
+        self._remember(key, entry)
+        try:
+            os.makedirs(self.cache_dir, exist_ok=True)
+            tmp_path = f"{self._disk_path(key)}.{threading.get_ident()}.tmp"
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump({"num_pages": entry["num_pages"], "pages": dict(entry["pages"])}, f)
+            os.replace(tmp_path, self._disk_path(key))
+        except OSError as e:
+            logging.warning(f"Could not write PDF cache entry: {str(e)}")
+
+    def _remember(self, key: str, entry: Dict) -> None:
+        with self._lock:
+            self._memory[key] = entry
+            self._memory.move_to_end(key)
+            while len(self._memory) > MEMORY_CACHE_ENTRIES:
+                self._memory.popitem(last=False)
+
+def extract_pdf_text(
+    path: str,
+    cache: PdfTextCache,
+    pages: Optional[str] = None,
+    max_tokens: Optional[int] = None,
+) -> str:
+    """
+    Extract text from selected pages of a PDF, using the cache where possible.
+
+    Missing pages of large selections are extracted in parallel in a process pool,
+    a pool-sized window at a time when there is a token budget. Output stops at the first page that would exceed `max_tokens`, with a note
+    telling the caller which pages to request next.
+
+    Args:
+        path (str): Path of the PDF file
+        cache (PdfTextCache): Page text cache
+        pages (Optional[str]): 1-based page selection, e.g. "1-5,8". Defaults to all pages.
+        max_tokens (Optional[int]): Approximate token budget of the returned text
+
+    Returns:
+        str: Page texts, each preceded by a page marker
+    """
+    key = cache.key_for(path)
+    entry = cache.load(key)
+
+    if entry["num_pages"] is None:
+        import PyPDF2 # type: ignore
+
+        with open(path, "rb") as file:
+            entry["num_pages"] = len(PyPDF2.PdfReader(file).pages)
+
+    indices = parse_page_range(pages, entry["num_pages"])
+    budget_chars = max_tokens * CHARS_PER_TOKEN if max_tokens else None
+    # Without a budget everything is needed up front; with one, extract batch by batch
+    batch_size = len(indices) if budget_chars is None else _budgeted_batch_size()
+
+    parts = []
+    used = 0
+    for batch_start in range(0, len(indices), max(batch_size, 1)):
+        batch = indices[batch_start:batch_start + batch_size]
+        if _fill_missing_pages(path, entry, batch):
+            cache.store(key, entry)
+        for offset, index in enumerate(batch):
+            text = f"--- Page {index + 1} ---\n{entry['pages'].get(index, '')}\n"
+            if budget_chars is not None and used + len(text) > budget_chars and parts:
+                remaining = indices[batch_start + offset:]
+                parts.append(
+                    f"\n[Stopped at the token limit. {len(remaining)} more selected page(s) remain, "
+                    f"starting at page {remaining[0] + 1} of {entry['num_pages']}. "
+                    f"Call read_file again with pages=\"{format_page_range(remaining)}\".]"
+                )
+                return "".join(parts)
+            parts.append(text)
+            used += len(text)
+
+    return "".join(parts)
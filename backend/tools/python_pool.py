@@ -0,0 +1,345 @@
+# backend/tools/python_pool.py
+
+import json
+import logging
+import os
+import select
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from dataclasses import dataclass
+from typing import Callable, Dict, List, Optional
+
+WORKER_SCRIPT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "python_worker.py")
+DEFAULT_PRELOAD = "numpy,pandas,matplotlib,matplotlib.pyplot,scipy,requests"
+MAX_OUTPUT_CHARS = 8000
+
+OutputCallback = Callable[[str], None]
+
+def resolve_python_executable() -> str:
+    """
+    Find the interpreter used to run user scripts.
+
+    Order: PYTHON_EXECUTABLE environment variable, the backend's `venv`, the
+    legacy `/venv` location, then the interpreter running the server.
+    """
+    configured = os.environ.get("PYTHON_EXECUTABLE")
+    if configured:
+        return configured
+    for candidate in ("venv/bin/python", "/venv/bin/python"):
+        if os.path.exists(candidate):
+            return os.path.abspath(candidate)
+    return sys.executable
+
+@dataclass
+class ScriptResult:
+    returncode: Optional[int]
+    output: str
+    duration: float
+    timed_out: bool = False
+    crashed: bool = False
+    worker_restarted: bool = False
+
+    @property
+    def success(self) -> bool:
+        return self.returncode == 0 and not self.timed_out and not self.crashed
+
+class WorkerError(Exception):
+    """Raised when a worker interpreter dies or breaks the protocol"""
+    pass
+
+class _Worker:
+    """A single worker interpreter speaking the python_worker.py protocol."""
+
+    def __init__(self, python_path: str, mode: str, preload: str) -> None:
+        self.mode = mode
+        self.runs = 0
+        self.rss_kb = 0
+        self.last_used = time.monotonic()
+        self.lock = threading.Lock()
+        self.process = subprocess.Popen(
+            [python_path, "-u", WORKER_SCRIPT, "--mode", mode, "--preload", preload],
+            stdin=subprocess.PIPE,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.DEVNULL,
+            text=True,
+            bufsize=1,
+        )
+        self.ready: Optional[Dict] = None
+
+    def wait_ready(self, timeout: float) -> Dict:
+        if self.ready is None:
+            self.ready = self._read_response(timeout)
+            self.rss_kb = self.ready.get("rss_kb", 0)
+        return self.ready
+
+    def _read_response(self, timeout: float) -> Dict:
+        readable, _, _ = select.select([self.process.stdout], [], [], timeout)
+        if not readable:
+            raise TimeoutError("Worker did not answer in time")
+        line = self.process.stdout.readline()
+        if not line:
+            raise WorkerError(f"Worker exited with code {self.process.poll()}")
+        return json.loads(line)
+
+    def run(self, request: Dict, timeout: float) -> Dict:
+        self.process.stdin.write(json.dumps(request) + "\n")
+        self.process.stdin.flush()
+        response = self._read_response(timeout)
+        self.runs += 1
+        self.rss_kb = response.get("rss_kb", self.rss_kb)
+        self.last_used = time.monotonic()
+        return response
+
+    @property
+    def alive(self) -> bool:
+        return self.process.poll() is None
+
+    def close(self) -> None:
+        if self.alive:
+            self.process.kill()
+            self.process.wait()
+
+class PythonWorkerPool:
+    """
+    Pool of warm Python interpreters for running workspace scripts.
+
+    Zygote workers import the heavy data-analysis modules once and fork a fresh child
+    per script, so each run starts with numpy & co. already loaded but shares no
+    state with other runs or sessions. Persistent kernels are one interpreter per
+    session whose globals survive between calls.
+
+    Attributes:
+        python_path (str): Interpreter used for workers
+        size (int): Number of idle zygotes kept warm
+        max_runs (int): Runs after which a worker is replaced
+        max_rss_mb (int): Resident memory after which a worker is replaced
+        kernel_idle_timeout (float): Seconds before an unused kernel is shut down
+    """
+
+    def __init__(
+        self,
+        python_path: Optional[str] = None,
+        size: int = 2,
+        preload: str = DEFAULT_PRELOAD,
+        max_runs: int = 100,
+        max_rss_mb: int = 1024,
+        kernel_idle_timeout: float = 1800,
+        startup_timeout: float = 60,
+    ) -> None:
+        self.python_path = python_path or resolve_python_executable()
+        self.size = size
+        self.preload = preload
+        self.max_runs = max_runs
+        self.max_rss_mb = max_rss_mb
+        self.kernel_idle_timeout = kernel_idle_timeout
+        self.startup_timeout = startup_timeout
+        self.supported = hasattr(os, "fork") and os.name == "posix"
+        self._idle: List[_Worker] = []
+        self._kernels: Dict[str, _Worker] = {}
+        self._lock = threading.Lock()
+        self.logger = logging.getLogger(__name__)
+
+    def warm(self) -> None:
+        """Start zygotes in the background until `size` idle workers are available."""
+        if not self.supported:
+            return
+        with self._lock:
+            missing = self.size - len(self._idle)
+        for _ in range(max(missing, 0)):
+            threading.Thread(target=self._add_idle_worker, daemon=True).start()
+
+    def _add_idle_worker(self) -> None:
+        try:
+            worker = _Worker(self.python_path, "zygote", self.preload)
+            worker.wait_ready(self.startup_timeout)
+        except Exception as e:
+            self.logger.error(f"Failed to start Python worker: {str(e)}")
+            return
+        with self._lock:
+            if len(self._idle) < self.size:
+                self._idle.append(worker)
+                return
+        worker.close()
+
+    def _checkout(self) -> _Worker:
+        with self._lock:
+            while self._idle:
+                worker = self._idle.pop()
+                if worker.alive:
+                    break
+            else:
+                worker = None
+        self.warm()
+        if worker is None:
+            worker = _Worker(self.python_path, "zygote", self.preload)
+        worker.wait_ready(self.startup_timeout)
+        return worker
+
+    def _checkin(self, worker: _Worker) -> None:
+        if self._should_recycle(worker):
+            worker.close()
+            self.warm()
+            return
+        with self._lock:
+            if len(self._idle) < self.size:
+                self._idle.append(worker)
+                return
+        worker.close()
+
+    def _should_recycle(self, worker: _Worker) -> bool:
+        return (
+            not worker.alive
+            or worker.runs >= self.max_runs
+            or worker.rss_kb > self.max_rss_mb * 1024
+        )
+
+    def _kernel_for(self, session_id: str) -> _Worker:
+        self._reap_kernels()
+        with self._lock:
+            worker = self._kernels.get(session_id)
+            if worker is not None and worker.alive:
+                return worker
+            worker = _Worker(self.python_path, "kernel", self.preload)
+            self._kernels[session_id] = worker
+        worker.wait_ready(self.startup_timeout)
+        return worker
+
+    def _reap_kernels(self) -> None:
+        now = time.monotonic()
+        with self._lock:
+            expired = [
+                session_id for session_id, worker in self._kernels.items()
+                if not worker.alive or now - worker.last_used > self.kernel_idle_timeout
+            ]
+            workers = [self._kernels.pop(session_id) for session_id in expired]
+        for worker in workers:
+            worker.close()
+
+    def reset_kernel(self, session_id: str) -> bool:
+        """Shut down the persistent kernel of a session. Returns True if one existed."""
+        with self._lock:
+            worker = self._kernels.pop(session_id, None)
+        if worker is None:
+            return False
+        worker.close()
+        return True
+
+    def release_session(self, session_id: str) -> None:
+        """Free what a session that has ended holds in the pool: its persistent kernel, if any."""
+        if self.reset_kernel(session_id):
+            self.logger.info(f"Shut down the Python kernel of closed session {session_id}")
+
+    def run(
+        self,
+        path: str,
+        cwd: str,
+        timeout: float = 120,
+        session_id: str = "default",
+        persistent: bool = False,
+        on_output: Optional[OutputCallback] = None,
+    ) -> ScriptResult:
+        """
+        Run a Python script on a warm worker.
+
+        Args:
+            path (str): Absolute path of the script
+            cwd (str): Working directory for the script
+            timeout (float): Seconds before the script is killed
+            session_id (str): Chat session the run belongs to
+            persistent (bool): Run in the session's persistent kernel
+            on_output (Optional[Callable]): Called with output fragments while the script runs
+
+        Returns:
+            ScriptResult: Exit status and (truncated) output of the script
+        """
+        fd, output_path = tempfile.mkstemp(prefix="pyrun-", suffix=".log")
+        os.close(fd)
+        try:
+            start = time.monotonic()
+            done = threading.Event()
+            tail = threading.Thread(target=self._tail_output, args=(output_path, done, on_output), daemon=True)
+            if on_output:
+                tail.start()
+
+            request = {"path": path, "cwd": cwd, "timeout": timeout, "output_path": output_path}
+            restarted = False
+            try:
+                if persistent:
+                    worker = self._kernel_for(session_id)
+                    with worker.lock:
+                        # A hung or crashed kernel loses its state either way
+                        try:
+                            response = worker.run(request, timeout)
+                        except TimeoutError:
+                            self.reset_kernel(session_id)
+                            response = {"returncode": None, "timed_out": True}
+                            restarted = True
+                        except WorkerError as e:
+                            self.logger.warning(f"Python kernel of session {session_id} crashed: {str(e)}")
+                            self.reset_kernel(session_id)
+                            response = {"returncode": None, "crashed": True}
+                            restarted = True
+                        if self._should_recycle(worker):
+                            self.reset_kernel(session_id)
+                            restarted = True
+                else:
+                    worker = self._checkout()
+                    try:
+                        # The worker enforces the timeout itself; the margin only guards against a hung worker
+                        response = worker.run(request, timeout + 10)
+                    except (TimeoutError, WorkerError):
+                        worker.close()
+                        raise
+                    finally:
+                        self._checkin(worker)
+            finally:
+                done.set()
+                if on_output:
+                    tail.join(timeout=1)
+
+            with open(output_path, "r", encoding="utf-8", errors="replace") as f:
+                output = f.read(MAX_OUTPUT_CHARS + 1)
+        finally:
+            try:
+                os.remove(output_path)
+            except OSError:
+                pass
+        if len(output) > MAX_OUTPUT_CHARS:
+            output = output[:MAX_OUTPUT_CHARS] + "\n... [output truncated]"
+
+        return ScriptResult(
+            returncode=response.get("returncode"),
+            output=output,
+            duration=time.monotonic() - start,
+            timed_out=response.get("timed_out", False),
+            crashed=response.get("crashed", False),
+            worker_restarted=restarted,
+        )
+
+    def _tail_output(self, output_path: str, done: threading.Event, on_output: OutputCallback) -> None:
+        position = 0
+        while True:
+            finished = done.wait(0.1)
+            try:
+                with open(output_path, "r", encoding="utf-8", errors="replace") as f:
+                    f.seek(position)
+                    chunk = f.read()
+                    position = f.tell()
+            except OSError:
+                return
+            if chunk:
+                on_output(chunk)
+            if finished:
+                return
+
+    def shutdown(self) -> None:
+        """Stop all idle workers and kernels."""
+        with self._lock:
+            workers = self._idle + list(self._kernels.values())
+            self._idle = []
+            self._kernels = {}
+        for worker in workers:
+            worker.close()
@@ -0,0 +1,174 @@
+# backend/tools/python_worker.py
+#
+# Worker interpreter for the run_python_script pool. This file is executed as a
+# standalone script by python_pool.py (never imported), so it only uses the stdlib.
+#
+# Protocol: one JSON request per line on stdin, one JSON response per line on the
+# original stdout. Script output goes to the file named in the request.
+#
+#   zygote mode  - heavy modules are imported once, then every request runs in a
+#                  forked child so scripts start warm and never see each other's state.
+#   kernel mode  - requests run in this process with a persistent namespace, so
+#                  variables survive between calls of the same session.
+
+import argparse
+import importlib
+import json
+import os
+import runpy
+import signal
+import sys
+import time
+import traceback
+
+_here = os.path.dirname(os.path.abspath(__file__))
+if sys.path and os.path.abspath(sys.path[0] or ".") == _here:
+    sys.path.pop(0)
+
+def _preload(modules):
+    loaded = []
+    for name in modules:
+        try:
+            importlib.import_module(name)
+            loaded.append(name)
+        except Exception:
+            pass
+    return loaded
+
+def _rss_kb():
+    try:
+        with open("/proc/self/status") as status:
+            for line in status:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1])
+    except OSError:
+        pass
+    return 0
+
+def _redirect_output(output_path):
+    fd = os.open(output_path, os.O_WRONLY | os.O_CREAT | os.O_APPEND, 0o600)
+    os.dup2(fd, 1)
+    os.dup2(fd, 2)
+    os.close(fd)
+
+def _detach_stdin():
+    fd = os.open(os.devnull, os.O_RDONLY)
+    os.dup2(fd, 0)
+    os.close(fd)
+    sys.stdin = open(0, closefd=False)
+
+def _print_script_traceback(path):
+    """Print the current exception without the worker's own frames."""
+    _, value, tb = sys.exc_info()
+    script_tb = tb
+    while script_tb is not None and script_tb.tb_frame.f_code.co_filename != path:
+        script_tb = script_tb.tb_next
+    traceback.print_exception(type(value), value, script_tb or tb)
+
+def _run_in_child(request):
+    """Fork, run the script in the child and wait for it with a timeout."""
+    pid = os.fork()
+    if pid == 0:
+        code = 0
+        try:
+            os.setsid()
+            _detach_stdin()
+            _redirect_output(request["output_path"])
+            os.chdir(request["cwd"])
+            path = request["path"]
+            sys.argv = [path] + request.get("args", [])
+            sys.path.insert(0, os.path.dirname(os.path.abspath(path)))
+            runpy.run_path(path, run_name="__main__")
+        except SystemExit as e:
+            code = e.code if isinstance(e.code, int) else (0 if e.code is None else 1)
+            if not isinstance(e.code, (int, type(None))):
+                print(e.code, file=sys.stderr)
+        except BaseException:
+            _print_script_traceback(request["path"])
+            code = 1
+        finally:
+            try:
+                sys.stdout.flush()
+                sys.stderr.flush()
+            finally:
+                os._exit(code)
+
+    deadline = time.monotonic() + request["timeout"]
+    delay = 0.001
+    while True:
+        waited, status = os.waitpid(pid, os.WNOHANG)
+        if waited:
+            return {"returncode": os.waitstatus_to_exitcode(status), "timed_out": False}
+        if time.monotonic() >= deadline:
+            try:
+                os.killpg(pid, signal.SIGKILL)
+            except ProcessLookupError:
+                pass
+            os.waitpid(pid, 0)
+            return {"returncode": None, "timed_out": True}
+        time.sleep(delay)
+        delay = min(delay * 2, 0.02)
+
+def _run_in_kernel(request, namespace):
+    """Run the script in this process, keeping its globals for the next request."""
+    saved = (os.dup(1), os.dup(2))
+    cwd = os.getcwd()
+    stdin = sys.stdin
+    code = 0
+    try:
+        sys.stdin = open(os.devnull)
+        _redirect_output(request["output_path"])
+        os.chdir(request["cwd"])
+        path = request["path"]
+        sys.argv = [path] + request.get("args", [])
+        with open(path, "rb") as source:
+            compiled = compile(source.read(), path, "exec")
+        namespace["__file__"] = path
+        exec(compiled, namespace)
+    except SystemExit as e:
+        code = e.code if isinstance(e.code, int) else (0 if e.code is None else 1)
+    except BaseException:
+        _print_script_traceback(request["path"])
+        code = 1
+    finally:
+        sys.stdout.flush()
+        sys.stderr.flush()
+        os.dup2(saved[0], 1)
+        os.dup2(saved[1], 2)
+        os.close(saved[0])
+        os.close(saved[1])
+        sys.stdin.close()
+        sys.stdin = stdin
+        os.chdir(cwd)
+    return {"returncode": code, "timed_out": False}
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--mode", choices=["zygote", "kernel"], default="zygote")
+    parser.add_argument("--preload", default="")
+    options = parser.parse_args()
+
+    # Keep the protocol channel private; anything the worker itself prints goes nowhere.
+    protocol = os.fdopen(os.dup(1), "w", buffering=1)
+    devnull = os.open(os.devnull, os.O_WRONLY)
+    os.dup2(devnull, 1)
+    os.close(devnull)
+
+    preloaded = _preload([name for name in options.preload.split(",") if name])
+    namespace = {"__name__": "__main__", "__builtins__": __builtins__}
+    protocol.write(json.dumps({"ready": True, "preloaded": preloaded, "rss_kb": _rss_kb()}) + "\n")
+
+    requests = sys.stdin
+    for line in requests:
+        request = json.loads(line)
+        start = time.monotonic()
+        if options.mode == "zygote":
+            response = _run_in_child(request)
+        else:
+            response = _run_in_kernel(request, namespace)
+        response["duration"] = time.monotonic() - start
+        response["rss_kb"] = _rss_kb()
+        protocol.write(json.dumps(response) + "\n")
+
+if __name__ == "__main__":
+    main()
@@ -1,13 +1,20 @@
-from openai import OpenAI
+import logging
+import time
 from typing import List, Dict, Generator
 
-client = OpenAI()
+from .model_router import get_router, is_failover_error
+from .runtime import get_openai_client, streaming_tool
+from .usage import get_usage_tracker
 
+@streaming_tool
 def reason_with_o1(
     messages: List[Dict[str, str]], 
 ) -> Generator[str, None, None]:
     """
     Stream chat completions from OpenAI API.
+
+    The answer is streamed live to the user while it is generated and returned in full
+    once it is complete.
     
     Args:
         messages: List of message dictionaries with 'role' and 'content' keys
@@ -23,18 +30,51 @@ def reason_with_o1(
         for chunk in stream_chat_completion(messages):
             print(chunk, end='', flush=True)
     """
-    # Create new client if none provided
-    if client is None:
-        client = OpenAI()
-    
+    start = time.monotonic()
+    first_chunk_latency = None
+    usage = None
+    tracker = get_usage_tracker()
+    tracker.check()
+    router = get_router()
+    model = tracker.model_for(router.route(router.tool_model("reason_with_o1", "o1-preview")))
+
     # Create streaming completion
-    completion = client.chat.completions.create(
-        model="o1-preview",
-        messages=messages,
-        stream=True,
-    )
+    try:
+        completion = get_openai_client().chat.completions.create(
+            model=model,
+            messages=messages,
+            stream=True,
+            stream_options={"include_usage": True},
+        )
+    except Exception as e:
+        if is_failover_error(e):
+            router.observe(model, error=True)
+        raise
     
-    # Yield content from chunks
-    for chunk in completion:
-        if chunk.choices[0].delta.content is not None:
-            yield chunk.choices[0].delta.content
\ No newline at end of file
+    # Yield content from chunks; the final chunk carries usage and no choices.
+    # Closing the generator early (the run was cancelled) closes the stream too.
+    try:
+        for chunk in completion:
+            if chunk.usage is not None:
+                usage = chunk.usage
+            if not chunk.choices:
+                continue
+            content = chunk.choices[0].delta.content
+            if content is not None:
+                if first_chunk_latency is None:
+                    first_chunk_latency = time.monotonic() - start
+                    router.observe(model, ttft=first_chunk_latency)
+                yield content
+    finally:
+        completion.close()
+
+    if usage is not None:
+        tracker.record(model, usage.prompt_tokens, usage.completion_tokens)
+
+    first_chunk = f"{first_chunk_latency:.2f}s" if first_chunk_latency is not None else "n/a"
+    logging.info(
+        f"reason_with_o1 finished in {time.monotonic() - start:.2f}s with {model} "
+        f"(first chunk after {first_chunk}, "
+        f"prompt_tokens={getattr(usage, 'prompt_tokens', None)}, "
+        f"completion_tokens={getattr(usage, 'completion_tokens', None)})"
+    )
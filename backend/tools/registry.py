@@ -0,0 +1,131 @@
+# backend/tools/registry.py
+
+import importlib
+import logging
+import sys
+import threading
+import time
+from typing import Any, Callable, Dict, List, Tuple
+
+# Public tool name -> submodule of this package defining it
+TOOL_MODULES: Dict[str, str] = {
+    "tavily_search": "web_tools",
+    "get_video_transcript": "web_tools",
+    "get_website_text_content": "web_tools",
+    "get_all_urls": "web_tools",
+    "save_to_md": "web_tools",
+    "execute_command": "code_tools",
+    "read_file": "code_tools",
+    "install_package": "code_tools",
+    "run_python_script": "code_tools",
+    "read_file_lines": "file_tools",
+    "head_file": "file_tools",
+    "tail_file": "file_tools",
+    "read_file_bytes": "file_tools",
+    "search_file": "file_tools",
+    "search_workspace": "workspace_index",
+    "find_symbol": "workspace_index",
+    "fetch_report": "research_tools",
+    "run_async": "research_tools",
+    "generate_research_report": "research_tools",
+    "reason_with_o1": "reasoning_tools",
+    "analyze_image": "image_tools",
+    "generate_image": "image_tools",
+    "get_image_cache_stats": "image_tools",
+    "get_current_weather": "weather_tools",
+    "get_weather_for_locations": "weather_tools",
+    "send_to_make": "make_tools",
+    "get_make_result": "make_tools",
+    "NotionHandler": "notion_tools",
+    "create_notion_page": "notion_tools",
+    "create_notion_pages": "notion_tools",
+    "update_notion_page": "notion_tools",
+    "get_notion_page_content": "notion_tools",
+    "search_notion": "notion_tools",
+}
+
+_import_times: Dict[str, float] = {}
+_lock = threading.RLock()
+
+logger = logging.getLogger(__name__)
+
+def load_tool(name: str) -> Callable[..., Any]:
+    """
+    Return a tool by name, importing its module on first use.
+
+    Tool modules import their heavy dependencies and construct API clients lazily,
+    so loading a tool is cheap and does not require the tool's credentials.
+
+    Args:
+        name (str): Public tool name, e.g. "search_notion"
+
+    Returns:
+        Callable: The tool function (or class)
+
+    Raises:
+        AttributeError: If no tool of that name is registered
+    """
+    module_name = TOOL_MODULES.get(name)
+    if module_name is None:
+        raise AttributeError(f"No tool named {name!r}")
+    qualified = f"{__package__}.{module_name}"
+    with _lock:
+        if module_name not in _import_times:
+            start = time.perf_counter()
+            module = importlib.import_module(qualified)
+            _import_times[module_name] = time.perf_counter() - start
+        else:
+            module = importlib.import_module(qualified)
+    return getattr(module, name)
+
+def import_times() -> List[Tuple[str, float]]:
+    """Return (tool module, seconds spent importing it) pairs, slowest first."""
+    with _lock:
+        return sorted(_import_times.items(), key=lambda item: item[1], reverse=True)
+
+# Stand-in for a registered tool that imports the tool's module on first use.
+# Agents hold these instead of the tool functions, so a tool module is imported
+# when one of its tools is first described to the model (Swarm reads the name,
+# docstring and signature to build the function schema) or called, not when the
+# agent is defined. wrap is applied to the loaded tool (e.g. to instrument it)
+# and calls go to its result; __wrapped__ is the tool itself, as it would be for
+# a functools.wraps wrapper.
+class LazyTool:
+    def __init__(self, name: str, wrap: Callable[[Callable[..., Any]], Callable[..., Any]] = lambda tool: tool):
+        if name not in TOOL_MODULES:
+            raise AttributeError(f"No tool named {name!r}")
+        self.__name__ = self.__qualname__ = name
+        self._wrap = wrap
+        self._call = None
+
+    def _resolve(self) -> Callable[..., Any]:
+        if self._call is None:
+            self._call = self._wrap(load_tool(self.__name__))
+        return self._call
+
+    @property
+    def __wrapped__(self) -> Callable[..., Any]:
+        return load_tool(self.__name__)
+
+    @property
+    def __doc__(self) -> str:
+        return self.__wrapped__.__doc__
+
+    @property
+    def __code__(self):
+        # Swarm checks the code object for a context_variables parameter
+        return self._resolve().__code__
+
+    def __call__(self, *args, **kwargs):
+        return self._resolve()(*args, **kwargs)
+
+    def __repr__(self) -> str:
+        return f"<lazy tool {self.__name__}>"
+
+def is_loaded(name: str) -> bool:
+    """Return whether the module defining a tool has been imported."""
+    return f"{__package__}.{TOOL_MODULES.get(name)}" in sys.modules
+
+def loaded_modules() -> List[str]:
+    """Return the tool modules imported so far, through load_tool or directly."""
+    return sorted(module for module in set(TOOL_MODULES.values()) if f"{__package__}.{module}" in sys.modules)
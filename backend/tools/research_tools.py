@@ -1,18 +1,31 @@
 import asyncio
 import logging
-from gpt_researcher import GPTResearcher # type: ignore
-import asyncio
 import nest_asyncio  # type: ignore # Add this import
 
+from .usage import get_usage_tracker
+
 # Apply nest_asyncio to allow nested event loops
 nest_asyncio.apply()
+
+def _record_costs(researcher) -> None:
+    """Record what a GPTResearcher run spent; it reports a dollar total, not tokens."""
+    try:
+        get_usage_tracker().record("gpt-researcher", cost=float(researcher.get_costs() or 0))
+    except Exception as e:
+        logging.warning(f"Could not read GPTResearcher costs: {str(e)}")
+
 async def fetch_report(query):
     """
     Fetch a research report based on the provided query and report type.
     """
+    # gpt_researcher pulls in langchain and friends; import it only when research is requested
+    from gpt_researcher import GPTResearcher # type: ignore
+
+    get_usage_tracker().check()
     researcher = GPTResearcher(query=query)
     await researcher.conduct_research()
     report = await researcher.write_report()
+    _record_costs(researcher)
     return report
 
 def run_async(coroutine):
@@ -31,9 +44,14 @@ def generate_research_report(query: str) -> str:
     """
     async def _async_research():
         try:
+            from gpt_researcher import GPTResearcher # type: ignore
+
+            get_usage_tracker().check()
             researcher = GPTResearcher(query=query)
             await researcher.conduct_research()
-            return await researcher.write_report()
+            report = await researcher.write_report()
+            _record_costs(researcher)
+            return report
         except Exception as e:
             logging.error(f"Error in _async_research: {str(e)}")
             return f"Error conducting research: {str(e)}"
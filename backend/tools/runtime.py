@@ -0,0 +1,151 @@
+# backend/tools/runtime.py
+
+import contextvars
+import functools
+import inspect
+import logging
+import os
+import threading
+from typing import Any, Callable, Dict, Optional
+
+Notifier = Callable[[Dict[str, Any]], None]
+
+_current_session: contextvars.ContextVar[str] = contextvars.ContextVar("current_session", default="default")
+# Replaces the current session's sink in this context, e.g. to hold back a speculative run's frames
+_frame_sink: contextvars.ContextVar[Optional[Notifier]] = contextvars.ContextVar("frame_sink", default=None)
+# Raises in this context once its work should stop, e.g. when a speculative run is cancelled
+_cancel_check: contextvars.ContextVar[Optional[Callable[[], None]]] = contextvars.ContextVar("cancel_check", default=None)
+_notifiers: Dict[str, Notifier] = {}
+_lock = threading.Lock()
+_openai_client = None
+_openai_client_lock = threading.Lock()
+
+logger = logging.getLogger(__name__)
+
+def register_session(session_id: str, notifier: Notifier) -> None:
+    """
+    Register the frame sink for a chat session.
+
+    The notifier must be thread-safe: tools call it from Swarm worker threads while
+    the websocket lives on the event loop.
+
+    Args:
+        session_id (str): Identifier of the chat session
+        notifier (Callable): Function accepting a websocket frame dict
+    """
+    with _lock:
+        _notifiers[session_id] = notifier
+
+def unregister_session(session_id: str) -> None:
+    """Forget the frame sink of a closed chat session."""
+    with _lock:
+        _notifiers.pop(session_id, None)
+
+def set_current_session(session_id: str) -> contextvars.Token:
+    """Bind the current thread/task context to a chat session."""
+    return _current_session.set(session_id)
+
+def get_current_session() -> str:
+    """Return the chat session the current tool call belongs to."""
+    return _current_session.get()
+
+def redirect_frames(notifier: Optional[Notifier]) -> contextvars.Token:
+    """Send frames for the current session to another sink in the current context."""
+    return _frame_sink.set(notifier)
+
+def watch_cancellation(check: Optional[Callable[[], None]]) -> contextvars.Token:
+    """Have streaming tools in the current context call `check` between pieces and stop if it raises."""
+    return _cancel_check.set(check)
+
+def notify(frame: Dict[str, Any], session_id: Optional[str] = None) -> bool:
+    """
+    Send a frame to the websocket of a chat session.
+
+    Args:
+        frame (Dict): JSON-serialisable websocket frame
+        session_id (Optional[str]): Target session. Defaults to the current session.
+
+    Returns:
+        bool: True if the session had a registered sink, False otherwise
+    """
+    notifier = _frame_sink.get() if session_id is None else None
+    if notifier is None:
+        with _lock:
+            notifier = _notifiers.get(session_id or get_current_session())
+    if notifier is None:
+        return False
+    try:
+        notifier(frame)
+        return True
+    except Exception as e:
+        logger.debug(f"Dropping frame for session {session_id}: {str(e)}")
+        return False
+
+def emit_tool_output(tool: str, content: str, stream: str = "stdout") -> bool:
+    """
+    Forward partial output of a running tool to the current session's websocket.
+
+    Args:
+        tool (str): Name of the tool producing the output
+        content (str): Output fragment
+        stream (str): Output stream name, e.g. "stdout" or "stderr"
+
+    Returns:
+        bool: True if the frame was delivered to a sink
+    """
+    if not content:
+        return False
+    return notify({"type": "tool_output", "tool": tool, "stream": stream, "content": content})
+
+def get_openai_client():
+    """
+    Return the OpenAI client shared by the tools, creating it on first use.
+
+    Constructing it lazily keeps a missing OPENAI_API_KEY from failing at import
+    time; the error surfaces in the tool that needs the client instead.
+    """
+    global _openai_client
+    with _openai_client_lock:
+        if _openai_client is None:
+            from openai import OpenAI
+            _openai_client = OpenAI()
+        return _openai_client
+
+def get_workspace_dir() -> str:
+    """Return the absolute path of the WORKSPACE directory tools operate in."""
+    return os.path.join(os.getcwd(), "WORKSPACE")
+
+def streaming_tool(func: Callable) -> Callable:
+    """
+    Decorator for tools that yield their output in pieces.
+
+    Swarm stores whatever a tool returns as the tool message, so a generator would be
+    sent to the model as "<generator object ...>". The wrapper drains the generator,
+    forwards every piece to the session's websocket as a tool_output frame while it
+    runs, and returns the concatenated text as the tool's result. Tools that return
+    a plain value are passed through unchanged.
+
+    If the context's cancellation check (see watch_cancellation) raises between
+    pieces, the generator is closed, ending the tool's own work, and the error
+    propagates.
+    """
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        result = func(*args, **kwargs)
+        if not inspect.isgenerator(result):
+            return result
+        check = _cancel_check.get()
+        parts = []
+        try:
+            for chunk in result:
+                if check is not None:
+                    check()
+                if chunk is None:
+                    continue
+                text = str(chunk)
+                parts.append(text)
+                emit_tool_output(func.__name__, text)
+        finally:
+            result.close()
+        return "".join(parts)
+    return wrapper
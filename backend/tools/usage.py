@@ -0,0 +1,285 @@
+# backend/tools/usage.py
+
+import contextvars
+import hmac
+import json
+import logging
+import os
+import threading
+import time
+from dataclasses import asdict, dataclass
+from typing import Any, Dict, Optional
+
+from .runtime import get_current_session
+
+# USD per million tokens (input, output). Override or extend with MODEL_PRICES='{"model": [in, out]}'.
+DEFAULT_PRICES: Dict[str, tuple] = {
+    "gpt-4o-mini": (0.15, 0.60),
+    "gpt-4o": (2.50, 10.00),
+    "gpt-4-turbo": (10.00, 30.00),
+    "o1-mini": (3.00, 12.00),
+    "o1-preview": (15.00, 60.00),
+    "o1": (15.00, 60.00),
+}
+# USD per image, by model, quality and size
+IMAGE_PRICES: Dict[tuple, float] = {
+    ("dall-e-3", "standard", "1024x1024"): 0.04,
+    ("dall-e-3", "standard", "1792x1024"): 0.08,
+    ("dall-e-3", "standard", "1024x1792"): 0.08,
+    ("dall-e-3", "hd", "1024x1024"): 0.08,
+    ("dall-e-3", "hd", "1792x1024"): 0.12,
+    ("dall-e-3", "hd", "1024x1792"): 0.12,
+}
+DEFAULT_DOWNGRADES = {"gpt-4o": "gpt-4o-mini", "gpt-4-turbo": "gpt-4o-mini", "o1-preview": "o1-mini", "o1": "o1-mini"}
+DEFAULT_DOWNGRADE_AT = 0.8
+DEFAULT_CONTEXT_MESSAGES = 12
+DEFAULT_TENANT = "default"
+
+OK, DOWNGRADE, EXCEEDED = "ok", "downgrade", "exceeded"
+
+logger = logging.getLogger(__name__)
+
+# Tool whose code is running, so LLM calls made by tools are attributed to them
+_current_tool: contextvars.ContextVar[Optional[str]] = contextvars.ContextVar("current_tool", default=None)
+
+class BudgetExceeded(Exception):
+    """Raised when a session or its tenant has used up its budget."""
+    pass
+
+@dataclass
+class Usage:
+    """Token counts and cost of a group of model calls."""
+    calls: int = 0
+    prompt_tokens: int = 0
+    completion_tokens: int = 0
+    cost_usd: float = 0.0
+
+    def add(self, prompt_tokens: int, completion_tokens: int, cost: float) -> None:
+        self.calls += 1
+        self.prompt_tokens += prompt_tokens
+        self.completion_tokens += completion_tokens
+        self.cost_usd += cost
+
+    def minus(self, other: "Usage") -> "Usage":
+        return Usage(self.calls - other.calls, self.prompt_tokens - other.prompt_tokens,
+                     self.completion_tokens - other.completion_tokens, self.cost_usd - other.cost_usd)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return dict(asdict(self), cost_usd=round(self.cost_usd, 6))
+
+class SessionUsage:
+    """Usage of one chat session, in total and per agent, model and tool."""
+
+    def __init__(self, tenant: str) -> None:
+        self.tenant = tenant
+        self.total = Usage()
+        self.by_agent: Dict[str, Usage] = {}
+        self.by_model: Dict[str, Usage] = {}
+        self.by_tool: Dict[str, Usage] = {}
+        self.turn_start = Usage()
+
+def set_current_tool(name: Optional[str]) -> contextvars.Token:
+    return _current_tool.set(name)
+
+def reset_current_tool(token: contextvars.Token) -> None:
+    _current_tool.reset(token)
+
+class UsageTracker:
+    """
+    Token and cost accounting with per-session and per-tenant budgets.
+
+    Every model call (agent completions from the runner, and the vision, o1,
+    image and research calls tools make) is recorded against the current
+    session, its agent or tool, and the session's tenant. Budgets are in USD:
+    SESSION_BUDGET_USD per session and TENANT_BUDGET_USD per tenant and UTC
+    day, both unlimited when unset. The budget state is that of whichever is
+    closer to its limit:
+
+        ok         below BUDGET_DOWNGRADE_AT (default 0.8) of the budget
+        downgrade  models are swapped for cheaper ones (BUDGET_DOWNGRADES) and
+                   agents see at most BUDGET_CONTEXT_MESSAGES history messages
+        exceeded   new turns and model calls are refused with BudgetExceeded
+
+    A session lasts one websocket connection or one /chat request, so the
+    session budget caps a single conversation but a client can always open a
+    new one. The tenant budget is the one clients cannot evade: tenants are
+    assigned by the server from the caller's API key (TENANT_KEYS, see
+    tenant_for), never taken from the request. Totals are kept in memory, so
+    each worker process enforces its own share.
+    """
+
+    def __init__(self) -> None:
+        self.session_budget = self._float_env("SESSION_BUDGET_USD")
+        self.tenant_budget = self._float_env("TENANT_BUDGET_USD")
+        self.downgrade_at = self._float_env("BUDGET_DOWNGRADE_AT") or DEFAULT_DOWNGRADE_AT
+        self.context_messages = int(os.environ.get("BUDGET_CONTEXT_MESSAGES", DEFAULT_CONTEXT_MESSAGES))
+        self.downgrades = dict(DEFAULT_DOWNGRADES, **json.loads(os.environ.get("BUDGET_DOWNGRADES", "{}")))
+        self.prices = dict(DEFAULT_PRICES, **{model: tuple(price) for model, price
+                                              in json.loads(os.environ.get("MODEL_PRICES", "{}")).items()})
+        self.tenant_keys: Dict[str, str] = json.loads(os.environ.get("TENANT_KEYS", "{}"))
+        self._sessions: Dict[str, SessionUsage] = {}
+        # Today's usage per tenant; earlier days are dropped when the UTC day changes
+        self._tenant_day: Optional[str] = None
+        self._tenants: Dict[str, Usage] = {}
+        self._unpriced = set()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _float_env(name: str) -> Optional[float]:
+        value = os.environ.get(name)
+        return float(value) if value else None
+
+    def price(self, model: str, prompt_tokens: int, completion_tokens: int) -> float:
+        """Cost in USD of a completion, matching dated model names to their base model."""
+        key = max((name for name in self.prices if model == name or model.startswith(name + "-")),
+                  key=len, default=None)
+        if key is None:
+            if model not in self._unpriced:
+                self._unpriced.add(model)
+                logger.warning(f"No price for model {model}; its calls are counted at $0")
+            return 0.0
+        input_price, output_price = self.prices[key]
+        return (prompt_tokens * input_price + completion_tokens * output_price) / 1_000_000
+
+    def tenant_for(self, api_key: Optional[str]) -> Optional[str]:
+        """
+        The tenant a caller's API key belongs to.
+
+        TENANT_KEYS='{"<api key>": "<tenant>", ...}' assigns tenants. Without it
+        every caller is the default tenant and shares one tenant budget.
+
+        Returns:
+            Optional[str]: The tenant, or None if TENANT_KEYS is set and the key is not in it
+        """
+        if not self.tenant_keys:
+            return DEFAULT_TENANT
+        # Compare against every key so the time taken does not depend on which one matched
+        tenant = None
+        for key, name in self.tenant_keys.items():
+            if hmac.compare_digest((api_key or "").encode(), key.encode()):
+                tenant = name
+        return tenant
+
+    def start_session(self, session_id: str, tenant: Optional[str] = None) -> None:
+        with self._lock:
+            self._sessions.setdefault(session_id, SessionUsage(tenant or DEFAULT_TENANT))
+
+    def end_session(self, session_id: str) -> None:
+        with self._lock:
+            self._sessions.pop(session_id, None)
+
+    def _tenant_usage(self, tenant: str) -> Usage:
+        day = time.strftime("%Y-%m-%d", time.gmtime())
+        if day != self._tenant_day:
+            self._tenant_day = day
+            self._tenants.clear()
+        return self._tenants.setdefault(tenant, Usage())
+
+    def record(self, model: str, prompt_tokens: int = 0, completion_tokens: int = 0, agent: Optional[str] = None,
+               cost: Optional[float] = None, session_id: Optional[str] = None, tool: Optional[str] = None) -> float:
+        """
+        Record a model call against a session.
+
+        Args:
+            model (str): Model used
+            prompt_tokens (int): Input tokens
+            completion_tokens (int): Output tokens
+            agent (Optional[str]): Agent that made the call; tool calls are attributed to the running tool
+            cost (Optional[float]): Cost in USD when it is not token-priced (images, GPTResearcher)
+            session_id (Optional[str]): Defaults to the current session
+            tool (Optional[str]): Defaults to the running tool
+
+        Returns:
+            float: The call's cost in USD
+        """
+        if cost is None:
+            cost = self.price(model, prompt_tokens, completion_tokens)
+        tool = tool or _current_tool.get()
+        with self._lock:
+            session = self._sessions.get(session_id or get_current_session())
+            if session is None:
+                return cost
+            session.total.add(prompt_tokens, completion_tokens, cost)
+            session.by_model.setdefault(model, Usage()).add(prompt_tokens, completion_tokens, cost)
+            if tool is not None:
+                session.by_tool.setdefault(tool, Usage()).add(prompt_tokens, completion_tokens, cost)
+            elif agent is not None:
+                session.by_agent.setdefault(agent, Usage()).add(prompt_tokens, completion_tokens, cost)
+            self._tenant_usage(session.tenant).add(prompt_tokens, completion_tokens, cost)
+        return cost
+
+    def _ratio(self, session: SessionUsage) -> float:
+        ratios = [0.0]
+        if self.session_budget:
+            ratios.append(session.total.cost_usd / self.session_budget)
+        if self.tenant_budget:
+            ratios.append(self._tenant_usage(session.tenant).cost_usd / self.tenant_budget)
+        return max(ratios)
+
+    def budget_state(self, session_id: Optional[str] = None) -> str:
+        with self._lock:
+            session = self._sessions.get(session_id or get_current_session())
+            if session is None:
+                return OK
+            ratio = self._ratio(session)
+        if ratio >= 1:
+            return EXCEEDED
+        return DOWNGRADE if ratio >= self.downgrade_at else OK
+
+    def check(self, session_id: Optional[str] = None) -> None:
+        """Raise BudgetExceeded if the session may not spend any more."""
+        if self.budget_state(session_id) == EXCEEDED:
+            raise BudgetExceeded("The usage budget for this session has been reached")
+
+    def model_for(self, model: str, session_id: Optional[str] = None) -> str:
+        """The model to call instead of `model` under the session's budget state."""
+        if self.budget_state(session_id) == OK:
+            return model
+        return self.downgrades.get(model, model)
+
+    def context_limit(self, session_id: Optional[str] = None) -> Optional[int]:
+        """Maximum history messages an agent should see, or None for no limit."""
+        return self.context_messages if self.budget_state(session_id) != OK else None
+
+    def begin_turn(self, session_id: str) -> None:
+        with self._lock:
+            session = self._sessions.get(session_id)
+            if session is not None:
+                session.turn_start = Usage(**asdict(session.total))
+
+    def summary(self, session_id: str) -> Optional[Dict[str, Any]]:
+        """Usage of the session and its last turn, per agent, model and tool, with the budget state."""
+        state = self.budget_state(session_id)
+        with self._lock:
+            session = self._sessions.get(session_id)
+            if session is None:
+                return None
+            budget = {"state": state}
+            if self.session_budget:
+                budget["session_limit_usd"] = self.session_budget
+                budget["session_remaining_usd"] = round(max(self.session_budget - session.total.cost_usd, 0), 6)
+            if self.tenant_budget:
+                tenant_cost = self._tenant_usage(session.tenant).cost_usd
+                budget["tenant_limit_usd"] = self.tenant_budget
+                budget["tenant_remaining_usd"] = round(max(self.tenant_budget - tenant_cost, 0), 6)
+            return {
+                "turn": session.total.minus(session.turn_start).to_dict(),
+                "session": session.total.to_dict(),
+                "by_agent": {name: usage.to_dict() for name, usage in session.by_agent.items()},
+                "by_model": {name: usage.to_dict() for name, usage in session.by_model.items()},
+                "by_tool": {name: usage.to_dict() for name, usage in session.by_tool.items()},
+                "budget": budget,
+            }
+
+_tracker: Optional[UsageTracker] = None
+_tracker_lock = threading.Lock()
+
+def get_usage_tracker() -> UsageTracker:
+    global _tracker
+    with _tracker_lock:
+        if _tracker is None:
+            _tracker = UsageTracker()
+        return _tracker
+
+def image_cost(model: str, quality: str, size: str, n: int = 1) -> float:
+    return IMAGE_PRICES.get((model, quality, size), 0.0) * n
@@ -1,10 +1,23 @@
 import os
+import json
+import re
+import threading
+import time
 import requests
 import logging
-from typing import Dict, Optional, Union
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional, Tuple, Union
 from dataclasses import dataclass
 from datetime import datetime
 
+WEATHER_API_URL = "http://api.weatherapi.com/v1/current.json"
+# weatherapi.com refreshes current conditions about every 15 minutes
+UPDATE_INTERVAL = 15 * 60
+MIN_TTL = 60
+MAX_BATCH_LOCATIONS = 20
+MAX_ALIASES = 4096
+
 @dataclass
 class WeatherData:
     location: str
@@ -17,10 +30,126 @@ class WeatherData:
     wind_mph: float
     last_updated: datetime
 
+    def to_dict(self) -> Dict[str, Union[str, float, int]]:
+        return {
+            "location": self.location,
+            "temperature_c": self.temperature_c,
+            "temperature_f": self.temperature_f,
+            "condition": self.condition,
+            "icon_url": self.icon_url,
+            "humidity": self.humidity,
+            "wind_kph": self.wind_kph,
+            "wind_mph": self.wind_mph,
+            "last_updated": self.last_updated.strftime('%Y-%m-%d %H:%M')
+        }
+
+    def __str__(self) -> str:
+        # Swarm sends str(result) to the model: compact JSON, ready to paste into a ```weather block
+        return json.dumps(self.to_dict(), separators=(",", ":"), ensure_ascii=False)
+
 class WeatherAPIError(Exception):
     """Custom exception for Weather API errors"""
     pass
 
+def normalize_location(location: str) -> str:
+    """Canonical form of a location query: lower case, single spaces, tidy commas."""
+    location = " ".join(location.lower().split())
+    return re.sub(r"\s*,\s*", ",", location).strip(" ,")
+
+class WeatherCache:
+    """
+    TTL cache of current conditions.
+
+    Entries are stored under the resolved coordinates of the location, and every
+    normalised query that resolved to them is remembered as an alias, so "London",
+    "london, uk" and "51.52,-0.11" share one entry. An entry expires when the
+    upstream data is expected to change: UPDATE_INTERVAL after its last_updated
+    time, but never sooner than MIN_TTL after it was fetched. Aliases are kept
+    in an LRU of at most `max_aliases` queries, since every spelling a user
+    types becomes one.
+    """
+
+    def __init__(self, max_ttl: float = UPDATE_INTERVAL, max_aliases: int = MAX_ALIASES) -> None:
+        self.max_ttl = max_ttl
+        self.max_aliases = max_aliases
+        self._aliases: "OrderedDict[str, str]" = OrderedDict()
+        self._entries: Dict[str, Tuple[WeatherData, float]] = {}
+        self._lock = threading.Lock()
+
+    def get(self, query: str) -> Optional[WeatherData]:
+        with self._lock:
+            key = self._aliases.get(query)
+            entry = self._entries.get(key) if key else None
+            if entry is None:
+                return None
+            self._aliases.move_to_end(query)
+            if entry[1] <= time.time():
+                del self._entries[key]
+                return None
+            return entry[0]
+
+    def put(self, query: str, coordinates: str, weather: WeatherData, last_updated_epoch: Optional[int]) -> None:
+        now = time.time()
+        expires = now + self.max_ttl
+        if last_updated_epoch:
+            expires = min(expires, max(last_updated_epoch + UPDATE_INTERVAL, now + MIN_TTL))
+        with self._lock:
+            for alias in (query, coordinates):
+                self._aliases[alias] = coordinates
+                self._aliases.move_to_end(alias)
+            while len(self._aliases) > self.max_aliases:
+                self._aliases.popitem(last=False)
+            self._entries[coordinates] = (weather, expires)
+            # Drop expired entries so the cache stays bounded by the locations in current use
+            for key in [key for key, (_, expiry) in self._entries.items() if expiry <= now]:
+                del self._entries[key]
+
+_cache = WeatherCache(float(os.environ.get("WEATHER_CACHE_TTL", UPDATE_INTERVAL)))
+_session = requests.Session()
+
+def _fetch_weather(location: str, api_key: str) -> Tuple[WeatherData, str, Optional[int]]:
+    """Request current conditions; returns the data, its resolved coordinates and last_updated_epoch."""
+    params = {
+        "key": api_key,
+        "q": location,  # requests encodes query parameters itself
+        "aqi": "no"
+    }
+    response = _session.get(
+        WEATHER_API_URL,
+        params=params,
+        timeout=10  # Add timeout to prevent hanging
+    )
+    try:
+        data = response.json()
+    except ValueError:
+        response.raise_for_status()
+        raise
+    # API errors (unknown location, bad key) come back as a 4xx with a JSON message
+    if "error" in data:
+        raise WeatherAPIError(data["error"].get("message", "Unknown error"))
+    response.raise_for_status()
+
+    # Parse the last_updated string into a datetime object
+    last_updated = datetime.strptime(
+        data['current']['last_updated'],
+        '%Y-%m-%d %H:%M'
+    )
+
+    # Create WeatherData object
+    weather_data = WeatherData(
+        location=f"{data['location']['name']}, {data['location']['region']}, {data['location']['country']}",
+        temperature_c=float(data['current']['temp_c']),
+        temperature_f=float(data['current']['temp_f']),
+        condition=data['current']['condition']['text'],
+        icon_url=f"https:{data['current']['condition']['icon']}",  # Use HTTPS
+        humidity=int(data['current']['humidity']),
+        wind_kph=float(data['current']['wind_kph']),
+        wind_mph=float(data['current']['wind_mph']),
+        last_updated=last_updated
+    )
+    coordinates = f"{float(data['location']['lat']):.2f},{float(data['location']['lon']):.2f}"
+    return weather_data, coordinates, data['current'].get('last_updated_epoch')
+
 def get_current_weather(location: str) -> Union[WeatherData, Dict[str, str]]:
     """
     Get the current weather for a given location using weatherapi.com API.
@@ -36,56 +165,25 @@ def get_current_weather(location: str) -> Union[WeatherData, Dict[str, str]]:
         WeatherAPIError: If there's an issue with the API key or request.
     """
     WEATHER_API_KEY = os.environ.get("WEATHER_API_KEY")
-    
+
     if not WEATHER_API_KEY:
         logging.error("WEATHER_API_KEY environment variable not set")
         raise WeatherAPIError("Weather API key not set")
 
-    # URL encode the location parameter
-    encoded_location = requests.utils.quote(location)
-    url = f"http://api.weatherapi.com/v1/current.json"
-    
-    params = {
-        "key": WEATHER_API_KEY,
-        "q": encoded_location,
-        "aqi": "no"
-    }
+    query = normalize_location(location)
+    cached = _cache.get(query)
+    if cached is not None:
+        logging.info(f"Returning cached weather for {location}")
+        return cached
 
     try:
-        response = requests.get(
-            url,
-            params=params,
-            timeout=10  # Add timeout to prevent hanging
-        )
-        response.raise_for_status()
-        data = response.json()
-        
-        if "error" in data:
-            error_message = data["error"].get("message", "Unknown error")
-            logging.error(f"Error from weather API: {error_message}")
-            return {"error": error_message}
-        
-        # Parse the last_updated string into a datetime object
-        last_updated = datetime.strptime(
-            data['current']['last_updated'],
-            '%Y-%m-%d %H:%M'
-        )
-        
-        # Create WeatherData object
-        weather_data = WeatherData(
-            location=f"{data['location']['name']}, {data['location']['region']}, {data['location']['country']}",
-            temperature_c=float(data['current']['temp_c']),
-            temperature_f=float(data['current']['temp_f']),
-            condition=data['current']['condition']['text'],
-            icon_url=f"https:{data['current']['condition']['icon']}",  # Use HTTPS
-            humidity=int(data['current']['humidity']),
-            wind_kph=float(data['current']['wind_kph']),
-            wind_mph=float(data['current']['wind_mph']),
-            last_updated=last_updated
-        )
-        
+        weather_data, coordinates, last_updated_epoch = _fetch_weather(query, WEATHER_API_KEY)
+        _cache.put(query, coordinates, weather_data, last_updated_epoch)
         return weather_data
-        
+
+    except WeatherAPIError as e:
+        logging.error(f"Error from weather API: {str(e)}")
+        return {"error": str(e)}
     except requests.Timeout:
         logging.error("Request timed out")
         return {"error": "Request timed out"}
@@ -95,3 +193,30 @@ def get_current_weather(location: str) -> Union[WeatherData, Dict[str, str]]:
     except (KeyError, ValueError) as e:
         logging.error(f"Data parsing error: {e}")
         return {"error": "Error parsing weather data"}
+
+def get_weather_for_locations(locations: List[str]) -> str:
+    """
+    Get the current weather for several locations at once.
+
+    The locations are looked up concurrently, so this is much faster than calling
+    get_current_weather once per location.
+
+    Args:
+        locations (List[str]): Locations to retrieve weather data for (at most 20).
+
+    Returns:
+        str: One line per location with its weather data as JSON, or an error message.
+    """
+    if len(locations) > MAX_BATCH_LOCATIONS:
+        return f"Error: at most {MAX_BATCH_LOCATIONS} locations can be requested at once"
+
+    # Duplicate spellings of the same place are fetched once
+    unique = list(dict.fromkeys(normalize_location(location) for location in locations))
+    with ThreadPoolExecutor(max_workers=min(8, max(len(unique), 1)), thread_name_prefix="weather") as executor:
+        results = dict(zip(unique, executor.map(get_current_weather, unique)))
+
+    lines = []
+    for location in locations:
+        result = results[normalize_location(location)]
+        lines.append(f"{location}: {result if isinstance(result, WeatherData) else json.dumps(result)}")
+    return "\n".join(lines)
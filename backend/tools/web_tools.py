@@ -1,18 +1,24 @@
-import trafilatura # type: ignore
 import os
 import logging
-from bs4 import BeautifulSoup # type: ignore
-from tavily import TavilyClient # type: ignore
+import threading
 from urllib.parse import urljoin, urlparse
-from youtube_transcript_api import YouTubeTranscriptApi # type: ignore
-from gpt_researcher import GPTResearcher # type: ignore
 import asyncio
 import nest_asyncio  # type: ignore # Add this import
 
 # Apply nest_asyncio to allow nested event loops
 nest_asyncio.apply()
 
-tavily_client = TavilyClient(api_key=os.environ["TAVILY_API_KEY"])
+# Scraping, search and research libraries are slow to import; each is imported on first use
+_tavily_client = None
+_tavily_client_lock = threading.Lock()
+
+def _get_tavily_client():
+    global _tavily_client
+    with _tavily_client_lock:
+        if _tavily_client is None:
+            from tavily import TavilyClient # type: ignore
+            _tavily_client = TavilyClient(api_key=os.environ["TAVILY_API_KEY"])
+        return _tavily_client
 
 def tavily_search(query: str) -> str:
     """
@@ -29,7 +35,7 @@ def tavily_search(query: str) -> str:
     """
     logging.info(f"Performing Tavily search with query: {query}")
     try:
-        search_result = tavily_client.get_search_context(query, search_depth="basic", max_tokens=8000)
+        search_result = _get_tavily_client().get_search_context(query, search_depth="basic", max_tokens=8000)
         logging.info("Tavily search completed successfully")
         return search_result
     except Exception as e:
@@ -43,6 +49,8 @@ async def fetch_report(query):
     """
     Fetch a research report based on the provided query and report type.
     """
+    from gpt_researcher import GPTResearcher # type: ignore
+
     researcher = GPTResearcher(query=query)
     await researcher.conduct_research()
     report = await researcher.write_report()
@@ -64,6 +72,8 @@ def generate_research_report(query: str) -> str:
     """
     async def _async_research():
         try:
+            from gpt_researcher import GPTResearcher # type: ignore
+
             researcher = GPTResearcher(query=query)
             await researcher.conduct_research()
             return await researcher.write_report()
@@ -99,6 +109,8 @@ def get_video_transcript(video_id):
     """
     logging.info(f"Fetching transcript for video ID: {video_id}")
     try:
+        from youtube_transcript_api import YouTubeTranscriptApi # type: ignore
+
         transcript = YouTubeTranscriptApi.get_transcript(video_id)
         logging.info("Video transcript fetched successfully")
         return transcript
@@ -120,6 +132,8 @@ def get_website_text_content(url: str) -> str:
     Raises:
         Any exceptions raised by trafilatura.fetch_url or trafilatura.extract.
     """
+    import trafilatura # type: ignore
+
     logging.info(f"Fetching content from URL: {url}")
     downloaded = trafilatura.fetch_url(url)
     text = trafilatura.extract(downloaded)
@@ -167,6 +181,9 @@ def get_all_urls(base_url):
     logging.info(f"Processing URL: {base_url}")
     connected_urls = []
     try:
+        import trafilatura # type: ignore
+        from bs4 import BeautifulSoup # type: ignore
+
         downloaded = trafilatura.fetch_url(base_url)
         if downloaded is None:
             logging.warning(f"Failed to download {base_url}")
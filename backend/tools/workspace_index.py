@@ -0,0 +1,363 @@
+# backend/tools/workspace_index.py
+
+import logging
+import os
+import re
+import sqlite3
+import threading
+import time
+from typing import Dict, Iterator, List, Optional, Tuple
+
+from .runtime import get_workspace_dir
+
+SKIP_DIRS = {'.git', 'node_modules', 'venv', '.venv', '__pycache__', '.next', 'dist', 'build',
+             '.cache', '.index', '.logs', '.mypy_cache', '.pytest_cache'}
+MAX_FILE_BYTES = 1024 * 1024
+MAX_LINES_PER_FILE = 20000
+MAX_LINE_CHARS = 500
+MAX_INDEX_BYTES = 512 * 1024 * 1024
+REFRESH_INTERVAL = 5.0
+
+SYMBOL_PATTERNS = {
+    '.py': [
+        (re.compile(r'^\s*(?:async\s+)?def\s+([A-Za-z_]\w*)'), 'function'),
+        (re.compile(r'^\s*class\s+([A-Za-z_]\w*)'), 'class'),
+        (re.compile(r'^([A-Z_][A-Z0-9_]*)\s*[:=]'), 'constant'),
+    ],
+    '.ts': [
+        (re.compile(r'^\s*(?:export\s+)?(?:default\s+)?(?:async\s+)?function\s*\*?\s*([A-Za-z_$][\w$]*)'), 'function'),
+        (re.compile(r'^\s*(?:export\s+)?(?:default\s+)?(?:abstract\s+)?class\s+([A-Za-z_$][\w$]*)'), 'class'),
+        (re.compile(r'^\s*(?:export\s+)?interface\s+([A-Za-z_$][\w$]*)'), 'interface'),
+        (re.compile(r'^\s*(?:export\s+)?type\s+([A-Za-z_$][\w$]*)\s*[=<]'), 'type'),
+        (re.compile(r'^\s*(?:export\s+)?(?:const\s+)?enum\s+([A-Za-z_$][\w$]*)'), 'enum'),
+        (re.compile(r'^\s*(?:export\s+)?(?:const|let|var)\s+([A-Za-z_$][\w$]*)\s*(?::[^=]+)?=\s*(?:async\s*)?(?:\([^)]*\)|[A-Za-z_$][\w$]*)\s*(?::[^=]+)?=>'), 'function'),
+    ],
+}
+for _extension in ('.tsx', '.js', '.jsx', '.mjs'):
+    SYMBOL_PATTERNS[_extension] = SYMBOL_PATTERNS['.ts']
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS files (
+    id INTEGER PRIMARY KEY,
+    path TEXT UNIQUE NOT NULL,
+    mtime_ns INTEGER NOT NULL,
+    size INTEGER NOT NULL,
+    first_row INTEGER NOT NULL,
+    last_row INTEGER NOT NULL
+);
+CREATE VIRTUAL TABLE IF NOT EXISTS lines USING fts5(
+    text, file_id UNINDEXED, lineno UNINDEXED
+);
+CREATE TABLE IF NOT EXISTS symbols (
+    name TEXT NOT NULL COLLATE NOCASE,
+    kind TEXT NOT NULL,
+    file_id INTEGER NOT NULL,
+    lineno INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS symbols_name ON symbols(name);
+CREATE INDEX IF NOT EXISTS symbols_file ON symbols(file_id);
+"""
+
+def _fts_query(query: str) -> str:
+    """Turn free text into an FTS5 query: every term must occur, terms are matched literally."""
+    terms = [term.replace('"', '""') for term in query.split() if term.strip()]
+    return " ".join(f'"{term}"' for term in terms)
+
+class WorkspaceIndex:
+    """
+    Incremental full-text and symbol index over the WORKSPACE directory.
+
+    Lines of text files are stored in an SQLite FTS5 table ranked with bm25, and
+    Python/TypeScript definitions in a symbol table. The index is kept up to date
+    by mtime/size scans: a search triggers a background rescan at most every
+    REFRESH_INTERVAL seconds, and only changed files are re-read.
+
+    Attributes:
+        root (str): Directory being indexed
+        db_path (str): Location of the SQLite index
+    """
+
+    def __init__(self, root: str, db_path: Optional[str] = None) -> None:
+        self.root = root
+        self.db_path = db_path or os.path.join(root, '.index', 'workspace.db')
+        self.logger = logging.getLogger(__name__)
+        self._refresh_lock = threading.Lock()
+        self._last_refresh = 0.0
+        self._ready = threading.Event()
+        self._next_row = 1
+        os.makedirs(os.path.dirname(self.db_path), exist_ok=True)
+        connection = self._connect()
+        try:
+            connection.executescript(SCHEMA)
+        finally:
+            connection.close()
+
+    def _connect(self) -> sqlite3.Connection:
+        connection = sqlite3.connect(self.db_path, timeout=30)
+        connection.execute("PRAGMA journal_mode=WAL")
+        connection.execute("PRAGMA synchronous=NORMAL")
+        return connection
+
+    def _walk(self) -> Iterator[Tuple[str, os.stat_result]]:
+        stack = [self.root]
+        while stack:
+            directory = stack.pop()
+            try:
+                entries = list(os.scandir(directory))
+            except OSError:
+                continue
+            for entry in entries:
+                if entry.is_dir(follow_symlinks=False):
+                    if entry.name not in SKIP_DIRS:
+                        stack.append(entry.path)
+                elif entry.is_file(follow_symlinks=False):
+                    stat = entry.stat(follow_symlinks=False)
+                    if stat.st_size <= MAX_FILE_BYTES:
+                        yield os.path.relpath(entry.path, self.root), stat
+
+    def refresh(self) -> Dict[str, int]:
+        """
+        Bring the index up to date with the files on disk.
+
+        Returns:
+            Dict[str, int]: Number of files added/updated, removed and unchanged
+        """
+        with self._refresh_lock:
+            stats = {"indexed": 0, "removed": 0, "unchanged": 0}
+            connection = self._connect()
+            try:
+                known = {path: (file_id, mtime_ns, size) for file_id, path, mtime_ns, size
+                         in connection.execute("SELECT id, path, mtime_ns, size FROM files")}
+                self._next_row = connection.execute(
+                    "SELECT coalesce(max(last_row), 0) + 1 FROM files"
+                ).fetchone()[0]
+                seen = set()
+                over_budget = False
+                for path, stat in self._walk():
+                    seen.add(path)
+                    previous = known.get(path)
+                    if previous and previous[1] == stat.st_mtime_ns and previous[2] == stat.st_size:
+                        stats["unchanged"] += 1
+                        continue
+                    if over_budget:
+                        continue
+                    if previous:
+                        self._remove(connection, previous[0])
+                    if not self._index_file(connection, path, stat):
+                        continue
+                    stats["indexed"] += 1
+                    if stats["indexed"] % 500 == 0:
+                        connection.commit()
+                        over_budget = os.path.getsize(self.db_path) > MAX_INDEX_BYTES
+                        if over_budget:
+                            self.logger.warning(f"Workspace index reached {MAX_INDEX_BYTES} bytes; skipping remaining files")
+                for path, (file_id, _, _) in known.items():
+                    if path not in seen:
+                        self._remove(connection, file_id)
+                        stats["removed"] += 1
+                connection.commit()
+            finally:
+                connection.close()
+            self._last_refresh = time.monotonic()
+            self._ready.set()
+            return stats
+
+    def _remove(self, connection: sqlite3.Connection, file_id: int) -> None:
+        # file_id is not indexed in the FTS table; each file owns a contiguous rowid range instead
+        connection.execute(
+            "DELETE FROM lines WHERE rowid BETWEEN (SELECT first_row FROM files WHERE id = ?) "
+            "AND (SELECT last_row FROM files WHERE id = ?)",
+            (file_id, file_id),
+        )
+        connection.execute("DELETE FROM symbols WHERE file_id = ?", (file_id,))
+        connection.execute("DELETE FROM files WHERE id = ?", (file_id,))
+
+    def _index_file(self, connection: sqlite3.Connection, path: str, stat: os.stat_result) -> bool:
+        try:
+            with open(os.path.join(self.root, path), 'rb') as file:
+                data = file.read()
+        except OSError:
+            return False
+        # Binary files are remembered with an empty row range so they are not re-read every scan
+        cursor = connection.execute(
+            "INSERT INTO files (path, mtime_ns, size, first_row, last_row) VALUES (?, ?, ?, 1, 0)",
+            (path, stat.st_mtime_ns, stat.st_size),
+        )
+        file_id = cursor.lastrowid
+        if b'\0' in data[:8192]:
+            return False
+        text = data.decode('utf-8', errors='replace')
+        patterns = SYMBOL_PATTERNS.get(os.path.splitext(path)[1].lower(), [])
+        rows, symbols = [], []
+        row = first_row = self._next_row
+        for lineno, line in enumerate(text.splitlines()[:MAX_LINES_PER_FILE], start=1):
+            if not line.strip():
+                continue
+            rows.append((row, line[:MAX_LINE_CHARS], file_id, lineno))
+            row += 1
+            for pattern, kind in patterns:
+                match = pattern.match(line)
+                if match:
+                    symbols.append((match.group(1), kind, file_id, lineno))
+                    break
+        # Paths are indexed too, so searching for a file name finds it
+        rows.append((row, path.replace(os.sep, ' ').replace('.', ' '), file_id, 0))
+        self._next_row = row + 1
+        connection.executemany("INSERT INTO lines (rowid, text, file_id, lineno) VALUES (?, ?, ?, ?)", rows)
+        connection.execute("UPDATE files SET first_row = ?, last_row = ? WHERE id = ?", (first_row, row, file_id))
+        connection.executemany("INSERT INTO symbols (name, kind, file_id, lineno) VALUES (?, ?, ?, ?)", symbols)
+        return True
+
+    def ensure_fresh(self) -> None:
+        """Build the index on first use, then rescan in the background when it may be stale."""
+        if not self._ready.is_set():
+            self.refresh()
+            return
+        if time.monotonic() - self._last_refresh > REFRESH_INTERVAL and not self._refresh_lock.locked():
+            threading.Thread(target=self._background_refresh, daemon=True).start()
+
+    def _background_refresh(self) -> None:
+        try:
+            self.refresh()
+        except Exception as e:
+            self.logger.error(f"Workspace index refresh failed: {str(e)}")
+
+    def search(self, query: str, limit: int = 20, path_prefix: Optional[str] = None) -> List[Dict]:
+        """
+        Ranked full-text search. Symbol definitions matching the query rank first.
+
+        Args:
+            query (str): Free-text query; all terms must occur on the line
+            limit (int): Maximum number of hits
+            path_prefix (Optional[str]): Only return hits below this directory
+
+        Returns:
+            List[Dict]: Hits with path, line, text and kind ("symbol" or "text")
+        """
+        fts_query = _fts_query(query)
+        if not fts_query:
+            return []
+        like = f"{path_prefix.rstrip('/')}/%" if path_prefix else "%"
+        hits, seen = [], set()
+        connection = self._connect()
+        try:
+            if len(query.split()) == 1:
+                for hit in self._symbols(connection, query.strip(), limit, like):
+                    seen.add((hit["path"], hit["line"]))
+                    hits.append(hit)
+            rows = connection.execute(
+                """
+                SELECT files.path, lines.lineno, lines.text
+                FROM lines JOIN files ON files.id = lines.file_id
+                WHERE lines MATCH ? AND files.path LIKE ?
+                ORDER BY bm25(lines) LIMIT ?
+                """,
+                (fts_query, like, limit * 2),
+            ).fetchall()
+        except sqlite3.OperationalError as e:
+            self.logger.error(f"Workspace search failed: {str(e)}")
+            return hits
+        finally:
+            connection.close()
+
+        for path, lineno, text in rows:
+            if (path, lineno) in seen:
+                continue
+            seen.add((path, lineno))
+            hits.append({"path": path, "line": lineno, "text": text.strip(), "kind": "text"})
+        return hits[:limit]
+
+    def _symbols(self, connection: sqlite3.Connection, name: str, limit: int, like: str) -> List[Dict]:
+        rows = connection.execute(
+            """
+            SELECT files.path, symbols.lineno, symbols.kind, symbols.name
+            FROM symbols JOIN files ON files.id = symbols.file_id
+            WHERE (symbols.name = ? OR symbols.name LIKE ?) AND files.path LIKE ?
+            ORDER BY symbols.name = ? DESC, length(symbols.name) LIMIT ?
+            """,
+            (name, f"{name}%", like, name, limit),
+        ).fetchall()
+        return [{"path": path, "line": lineno, "text": f"{kind} {symbol}", "kind": "symbol"}
+                for path, lineno, kind, symbol in rows]
+
+    def find_symbol(self, name: str, limit: int = 20) -> List[Dict]:
+        """Return definitions whose name equals or starts with `name` (case-insensitive)."""
+        connection = self._connect()
+        try:
+            return self._symbols(connection, name, limit, "%")
+        finally:
+            connection.close()
+
+_indexes: Dict[str, WorkspaceIndex] = {}
+_indexes_lock = threading.Lock()
+
+def get_workspace_index() -> WorkspaceIndex:
+    """Return the shared index for the current WORKSPACE directory."""
+    root = get_workspace_dir()
+    with _indexes_lock:
+        index = _indexes.get(root)
+        if index is None:
+            os.makedirs(root, exist_ok=True)
+            index = WorkspaceIndex(root, os.environ.get("WORKSPACE_INDEX_PATH"))
+            _indexes[root] = index
+    return index
+
+def _format_hits(hits: List[Dict]) -> str:
+    return "\n".join(
+        f"{hit['path']}:{hit['line']}: {'[' + hit['text'] + ']' if hit['kind'] == 'symbol' else hit['text']}"
+        for hit in hits
+    )
+
+def search_workspace(query: str, limit: int = 20, path: Optional[str] = None) -> str:
+    """
+    Search all files in the WORKSPACE directory and return ranked file:line hits.
+
+    Much faster than grep or reading files one by one. All words of the query must appear on
+    the same line. For a single word, matching function/class definitions are listed first.
+
+    Args:
+        query (str): Words to search for, e.g. "load_config" or "websocket reconnect".
+        limit (int): Maximum number of hits to return. Defaults to 20.
+        path (str): Only search below this directory, relative to WORKSPACE. Defaults to everything.
+
+    Returns:
+        str: One "path:line: text" hit per line, best matches first, or a message if nothing matched.
+    """
+    logging.info(f"Searching workspace for: {query}")
+    try:
+        index = get_workspace_index()
+        index.ensure_fresh()
+        hits = index.search(query, limit=limit, path_prefix=path)
+    except (OSError, sqlite3.Error) as e:
+        error_message = f"Error searching workspace: {str(e)}"
+        logging.error(error_message)
+        return error_message
+    if not hits:
+        return f"No matches for '{query}' in the workspace."
+    return _format_hits(hits)
+
+def find_symbol(name: str) -> str:
+    """
+    Find where a function, class, interface, type or constant is defined in the WORKSPACE directory.
+
+    Works for Python, TypeScript and JavaScript files. Matching is case-insensitive and also
+    returns names that start with the given text.
+
+    Args:
+        name (str): The symbol name (or its beginning), e.g. "WeatherData".
+
+    Returns:
+        str: One "path:line: [kind name]" entry per definition, or a message if none was found.
+    """
+    logging.info(f"Finding symbol: {name}")
+    try:
+        index = get_workspace_index()
+        index.ensure_fresh()
+        hits = index.find_symbol(name)
+    except (OSError, sqlite3.Error) as e:
+        error_message = f"Error finding symbol: {str(e)}"
+        logging.error(error_message)
+        return error_message
+    if not hits:
+        return f"No definition of '{name}' found in the workspace."
+    return _format_hits(hits)
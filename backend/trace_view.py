@@ -0,0 +1,126 @@
+# backend/trace_view.py
+"""
+Render traces written by tracing.py as a waterfall in the terminal.
+
+Usage:
+    python trace_view.py                 # list the most recent traces
+    python trace_view.py <trace_id>      # waterfall of one trace (a unique prefix is enough)
+    python trace_view.py --dir traces <trace_id>
+"""
+
+import argparse
+import glob
+import json
+import os
+import sys
+from typing import Dict, Iterator, List
+
+from tracing import DEFAULT_TRACE_DIR
+
+BAR_WIDTH = 48
+KIND_MARKS = {"turn": "=", "llm": "#", "tool": "+", "handoff": ">"}
+
+def iter_spans(trace_dir: str, trace_id: str = "") -> Iterator[Dict]:
+    """Yield spans from the current and rotated span files, oldest file first."""
+    paths = sorted(glob.glob(os.path.join(trace_dir, "spans*.jsonl")), key=os.path.getmtime)
+    for path in paths:
+        with open(path, encoding="utf-8") as f:
+            for line in f:
+                # Cheap substring test before parsing, the files can hold many traces
+                if trace_id and trace_id not in line:
+                    continue
+                try:
+                    span = json.loads(line)
+                except json.JSONDecodeError:
+                    continue
+                if span["trace_id"].startswith(trace_id):
+                    yield span
+
+def list_traces(trace_dir: str, limit: int) -> str:
+    roots = [span for span in iter_spans(trace_dir) if span["parent_id"] is None]
+    roots.sort(key=lambda span: span["start"], reverse=True)
+    lines = []
+    for root in roots[:limit]:
+        final_agent = root["attributes"].get("final_agent", "")
+        lines.append(f"{root['trace_id']}  {root['duration_ms'] / 1000:8.2f}s  {root['status']:5}  "
+                     f"{root['name']}{' -> ' + final_agent if final_agent and final_agent != root['name'] else ''}")
+    return "\n".join(lines) if lines else f"No traces in {trace_dir}"
+
+def _ordered(spans: List[Dict]) -> List[tuple]:
+    # Depth-first by start time, so children follow their parent
+    children: Dict[str, List[Dict]] = {}
+    ids = {span["span_id"] for span in spans}
+    roots = []
+    for span in spans:
+        parent = span["parent_id"]
+        if parent in ids:
+            children.setdefault(parent, []).append(span)
+        else:
+            roots.append(span)
+    ordered = []
+
+    def visit(span: Dict, depth: int) -> None:
+        ordered.append((span, depth))
+        for child in sorted(children.get(span["span_id"], []), key=lambda s: s["start"]):
+            visit(child, depth + 1)
+
+    for root in sorted(roots, key=lambda s: s["start"]):
+        visit(root, 0)
+    return ordered
+
+def _details(span: Dict) -> str:
+    attributes = span["attributes"]
+    if span["kind"] == "llm":
+        parts = [attributes.get("model", "")]
+        if "ttft_ms" in attributes:
+            parts.append(f"ttft {attributes['ttft_ms']:.0f}ms")
+        if "prompt_tokens" in attributes:
+            parts.append(f"{attributes['prompt_tokens']}+{attributes['completion_tokens']} tok")
+        return " ".join(parts)
+    if span["kind"] == "handoff":
+        return f"-> {attributes.get('to_agent', '')}"
+    if span["kind"] == "tool":
+        return f"args {attributes.get('args_bytes', 0)}B result {attributes.get('result_bytes', 0)}B"
+    return ""
+
+def render_waterfall(spans: List[Dict], width: int = BAR_WIDTH) -> str:
+    """Format spans of one trace as indented rows with a bar on a shared time axis."""
+    start = min(span["start"] for span in spans)
+    end = max(span["end"] for span in spans)
+    total = max(end - start, 1e-9)
+    rows = _ordered(spans)
+    label_width = max(len("  " * depth + f"{span['kind']} {span['name']}") for span, depth in rows)
+    lines = [f"trace {spans[0]['trace_id']}  {total * 1000:.0f}ms  {len(spans)} spans"]
+    for span, depth in rows:
+        first = int((span["start"] - start) / total * width)
+        last = max(first + 1, int(round((span["end"] - start) / total * width)))
+        bar = " " * first + KIND_MARKS.get(span["kind"], "-") * (last - first)
+        label = "  " * depth + f"{span['kind']} {span['name']}"
+        error = " ERROR " + span["attributes"].get("error", "") if span["status"] == "error" else ""
+        lines.append(f"{label:<{label_width}} |{bar:<{width}}| {span['duration_ms']:9.1f}ms  {_details(span)}{error}")
+    return "\n".join(lines)
+
+def main(argv: List[str] = None) -> int:
+    parser = argparse.ArgumentParser(description="Show agent run traces as a terminal waterfall.")
+    parser.add_argument("trace_id", nargs="?", default="", help="Trace id or unique prefix; omit to list traces")
+    parser.add_argument("--dir", default=os.environ.get("TRACE_DIR", DEFAULT_TRACE_DIR), help="Trace directory")
+    parser.add_argument("--limit", type=int, default=20, help="Number of traces to list")
+    args = parser.parse_args(argv)
+
+    if not args.trace_id:
+        print(list_traces(args.dir, args.limit))
+        return 0
+
+    spans = list(iter_spans(args.dir, args.trace_id))
+    trace_ids = {span["trace_id"] for span in spans}
+    if not spans:
+        print(f"No spans for trace {args.trace_id}", file=sys.stderr)
+        return 1
+    if len(trace_ids) > 1:
+        print(f"Prefix {args.trace_id} matches {len(trace_ids)} traces", file=sys.stderr)
+        return 1
+    print(render_waterfall(spans))
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,260 @@
+# backend/tracing.py
+
+import contextlib
+import contextvars
+import glob
+import json
+import logging
+import os
+import queue
+import random
+import threading
+import time
+import urllib.request
+import uuid
+from typing import Any, Dict, Iterator, List, Optional
+
+DEFAULT_TRACE_DIR = "traces"
+DEFAULT_MAX_FILE_BYTES = 50 * 1024 * 1024
+DEFAULT_MAX_FILES = 20
+QUEUE_SIZE = 10000
+OTLP_BATCH_SIZE = 256
+
+logger = logging.getLogger(__name__)
+
+_current_span: contextvars.ContextVar[Optional["Span"]] = contextvars.ContextVar("current_span", default=None)
+
+class Span:
+    """
+    One timed operation of a trace: a turn, an LLM completion, a tool call or a handoff.
+
+    Attributes:
+        trace_id (str): Identifier shared by all spans of a run
+        span_id (str): Identifier of this span
+        parent_id (Optional[str]): Span this one is nested in
+        name (str): Operation name, e.g. the tool or agent name
+        kind (str): "turn", "llm", "tool" or "handoff"
+        attributes (Dict[str, Any]): JSON-serialisable details
+    """
+
+    __slots__ = ("trace_id", "span_id", "parent_id", "name", "kind", "start", "end", "status",
+                 "attributes", "sampled", "_token")
+
+    def __init__(self, trace_id: str, parent_id: Optional[str], name: str, kind: str,
+                 attributes: Dict[str, Any], sampled: bool) -> None:
+        self.trace_id = trace_id
+        self.span_id = uuid.uuid4().hex[:16]
+        self.parent_id = parent_id
+        self.name = name
+        self.kind = kind
+        self.start = time.time()
+        self.end: Optional[float] = None
+        self.status = "ok"
+        self.attributes = attributes
+        self.sampled = sampled
+        self._token = None
+
+    def set(self, **attributes: Any) -> None:
+        self.attributes.update(attributes)
+
+    def finish(self, error: Optional[BaseException] = None) -> None:
+        if self.end is not None:
+            return
+        self.end = time.time()
+        if error is not None:
+            self.status = "error"
+            self.attributes["error"] = f"{type(error).__name__}: {error}"
+        if self.sampled:
+            _exporter.export(self)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "trace_id": self.trace_id,
+            "span_id": self.span_id,
+            "parent_id": self.parent_id,
+            "name": self.name,
+            "kind": self.kind,
+            "start": self.start,
+            "end": self.end,
+            "duration_ms": round((self.end - self.start) * 1000, 3),
+            "status": self.status,
+            "attributes": self.attributes,
+        }
+
+def start_span(name: str, kind: str, activate: bool = True, **attributes: Any) -> Span:
+    """
+    Start a span as a child of the current span, or as the root of a new trace.
+
+    Args:
+        name (str): Operation name
+        kind (str): Span kind
+        activate (bool): Make the span current, so spans started later in this context nest
+            under it. Call `end_span` to deactivate it. Streams that outlive the call that
+            created them use activate=False and `Span.finish`.
+        **attributes: Span attributes
+
+    Returns:
+        Span: The started span
+    """
+    parent = _current_span.get()
+    if parent is None:
+        trace_id = uuid.uuid4().hex
+        sampled = _exporter.enabled and random.random() < _exporter.sample_rate
+        span = Span(trace_id, None, name, kind, attributes, sampled)
+    else:
+        span = Span(parent.trace_id, parent.span_id, name, kind, attributes, parent.sampled)
+    if activate:
+        span._token = _current_span.set(span)
+    return span
+
+def end_span(span: Span, error: Optional[BaseException] = None) -> None:
+    """Finish a span started with activate=True and restore the previous current span."""
+    span.finish(error)
+    if span._token is not None:
+        _current_span.reset(span._token)
+        span._token = None
+
+@contextlib.contextmanager
+def span(name: str, kind: str, **attributes: Any) -> Iterator[Span]:
+    """Context manager around start_span/end_span that records raised exceptions."""
+    current = start_span(name, kind, **attributes)
+    try:
+        yield current
+    except BaseException as e:
+        end_span(current, e)
+        raise
+    end_span(current)
+
+def current_trace_id() -> Optional[str]:
+    current = _current_span.get()
+    return current.trace_id if current else None
+
+class _OtlpExporter:
+    """Posts spans to an OTLP/HTTP collector using the JSON encoding (no SDK needed)."""
+
+    def __init__(self, endpoint: str, service_name: str) -> None:
+        self.url = endpoint.rstrip("/") + "/v1/traces"
+        self.service_name = service_name
+
+    @staticmethod
+    def _value(value: Any) -> Dict[str, Any]:
+        if isinstance(value, bool):
+            return {"boolValue": value}
+        if isinstance(value, int):
+            return {"intValue": str(value)}
+        if isinstance(value, float):
+            return {"doubleValue": value}
+        return {"stringValue": value if isinstance(value, str) else json.dumps(value)}
+
+    def export(self, spans: List[Dict[str, Any]]) -> None:
+        otlp_spans = [
+            {
+                # OTLP ids are 16 (trace) and 8 (span) bytes, hex encoded
+                "traceId": span["trace_id"],
+                "spanId": span["span_id"],
+                "parentSpanId": span["parent_id"] or "",
+                "name": f"{span['kind']} {span['name']}",
+                "kind": 1,
+                "startTimeUnixNano": str(int(span["start"] * 1e9)),
+                "endTimeUnixNano": str(int(span["end"] * 1e9)),
+                "attributes": [{"key": key, "value": self._value(value)} for key, value in span["attributes"].items()],
+                "status": {"code": 2 if span["status"] == "error" else 1},
+            }
+            for span in spans
+        ]
+        body = {
+            "resourceSpans": [{
+                "resource": {"attributes": [{"key": "service.name", "value": {"stringValue": self.service_name}}]},
+                "scopeSpans": [{"scope": {"name": "swarm-backend"}, "spans": otlp_spans}],
+            }]
+        }
+        request = urllib.request.Request(
+            self.url, data=json.dumps(body).encode("utf-8"), headers={"Content-Type": "application/json"}
+        )
+        with urllib.request.urlopen(request, timeout=10) as response:
+            response.read()
+
+class SpanExporter:
+    """
+    Writes finished spans from a background thread.
+
+    Spans are queued without blocking the caller (and dropped if the queue is full)
+    and appended to spans.jsonl in the trace directory, which is rotated by size.
+    When OTEL_EXPORTER_OTLP_ENDPOINT is set they are also sent to that collector.
+
+    Attributes:
+        trace_dir (str): Directory of the JSONL files (TRACE_DIR)
+        sample_rate (float): Fraction of traces recorded (TRACE_SAMPLE_RATE)
+        enabled (bool): False when TRACING=0
+    """
+
+    def __init__(self) -> None:
+        self.enabled = os.environ.get("TRACING", "1") != "0"
+        self.sample_rate = float(os.environ.get("TRACE_SAMPLE_RATE", "1.0"))
+        self.trace_dir = os.path.abspath(os.environ.get("TRACE_DIR", DEFAULT_TRACE_DIR))
+        self.max_file_bytes = int(os.environ.get("TRACE_MAX_FILE_BYTES", DEFAULT_MAX_FILE_BYTES))
+        self.max_files = int(os.environ.get("TRACE_MAX_FILES", DEFAULT_MAX_FILES))
+        endpoint = os.environ.get("OTEL_EXPORTER_OTLP_ENDPOINT")
+        self.otlp = _OtlpExporter(endpoint, os.environ.get("OTEL_SERVICE_NAME", "swarm-backend")) if endpoint else None
+        self.dropped = 0
+        self._queue: "queue.Queue[Dict[str, Any]]" = queue.Queue(maxsize=QUEUE_SIZE)
+        self._thread: Optional[threading.Thread] = None
+        self._lock = threading.Lock()
+
+    def export(self, span: Span) -> None:
+        if self._thread is None:
+            self._start()
+        try:
+            self._queue.put_nowait(span.to_dict())
+        except queue.Full:
+            self.dropped += 1
+
+    def _start(self) -> None:
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="span-exporter", daemon=True)
+                self._thread.start()
+
+    def _run(self) -> None:
+        os.makedirs(self.trace_dir, exist_ok=True)
+        path = os.path.join(self.trace_dir, "spans.jsonl")
+        file = open(path, "a", encoding="utf-8")
+        while True:
+            batch = [self._queue.get()]
+            # Drain whatever else is queued so a burst costs one write and one flush
+            while len(batch) < OTLP_BATCH_SIZE:
+                try:
+                    batch.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+            try:
+                file.write("".join(json.dumps(span, default=str) + "\n" for span in batch))
+                file.flush()
+                if file.tell() > self.max_file_bytes:
+                    file.close()
+                    self._rotate(path)
+                    file = open(path, "a", encoding="utf-8")
+            except OSError as e:
+                logger.warning(f"Could not write spans: {str(e)}")
+            if self.otlp is not None:
+                try:
+                    self.otlp.export(batch)
+                except Exception as e:
+                    logger.warning(f"Could not export spans to OTLP collector: {str(e)}")
+
+    def _rotate(self, path: str) -> None:
+        os.replace(path, os.path.join(self.trace_dir, f"spans-{time.strftime('%Y%m%d-%H%M%S')}-{uuid.uuid4().hex[:6]}.jsonl"))
+        rotated = sorted(glob.glob(os.path.join(self.trace_dir, "spans-*.jsonl")), key=os.path.getmtime)
+        for old in rotated[:max(0, len(rotated) - self.max_files)]:
+            os.remove(old)
+
+    def flush(self, timeout: float = 5.0) -> None:
+        """Wait until queued spans have been handed to the writer."""
+        deadline = time.monotonic() + timeout
+        while not self._queue.empty() and time.monotonic() < deadline:
+            time.sleep(0.01)
+
+_exporter = SpanExporter()
+
+def get_exporter() -> SpanExporter:
+    return _exporter
@@ -5,8 +5,14 @@ interface Message {
   role: 'user' | 'assistant';
   content: string;
   timestamp: Date;
+  // Set on messages showing a running tool's live output; these are not sent back as history
+  tool?: string;
+  output?: string;
 }
 
+const formatToolOutput = (tool: string, output: string) =>
+  `\`${tool}\` output:\n\n\`\`\`text\n${output}\n\`\`\``;
+
 interface WebSocketHookReturn {
   messages: Message[];
   isLoading: boolean;
@@ -38,7 +44,7 @@ export const useWebSocket = (url: string): WebSocketHookReturn => {
       if (data.type === 'content') {
         setMessages(prevMessages => {
           const lastMessage = prevMessages[prevMessages.length - 1];
-          if (lastMessage && lastMessage.role === 'assistant') {
+          if (lastMessage && lastMessage.role === 'assistant' && !lastMessage.tool) {
             return [
               ...prevMessages.slice(0, -1),
               { ...lastMessage, content: lastMessage.content + data.content }
@@ -53,10 +59,51 @@ export const useWebSocket = (url: string): WebSocketHookReturn => {
           }
         });
         setIsLoading(false);
+      } else if (data.type === 'tool_output') {
+        // Pieces of a running tool's output (o1 answers, command and script output) grow one message
+        setMessages(prevMessages => {
+          const lastMessage = prevMessages[prevMessages.length - 1];
+          if (lastMessage && lastMessage.tool === data.tool) {
+            const output = (lastMessage.output ?? '') + data.content;
+            return [
+              ...prevMessages.slice(0, -1),
+              { ...lastMessage, output, content: formatToolOutput(data.tool, output) }
+            ];
+          }
+          return [...prevMessages, {
+            id: Date.now().toString(),
+            role: 'assistant',
+            content: formatToolOutput(data.tool, data.content),
+            timestamp: new Date(),
+            tool: data.tool,
+            output: data.content
+          }];
+        });
       } else if (data.type === 'agent_change') {
         setCurrentAgent(data.agent);
       } else if (data.type === 'end') {
         setIsLoading(false);
+      } else if (data.type === 'image_ready') {
+        setMessages(prevMessages => [...prevMessages, {
+          id: Date.now().toString(),
+          role: 'assistant',
+          content: `![Generated Image](${data.url})`,
+          timestamp: new Date()
+        }]);
+      } else if (data.type === 'image_error') {
+        setMessages(prevMessages => [...prevMessages, {
+          id: Date.now().toString(),
+          role: 'assistant',
+          content: `Image generation failed: ${data.error}`,
+          timestamp: new Date()
+        }]);
+      } else if (data.type === 'make_result') {
+        setMessages(prevMessages => [...prevMessages, {
+          id: Date.now().toString(),
+          role: 'assistant',
+          content: data.content,
+          timestamp: new Date()
+        }]);
       }
     };
 
@@ -98,7 +145,7 @@ export const useWebSocket = (url: string): WebSocketHookReturn => {
     setIsLoading(true);
 
     // Get the last 4 interactions (8 messages, as each interaction has a user and assistant message)
-    const lastMessages = messages.slice(-8).concat(userMessage);
+    const lastMessages = messages.filter(message => !message.tool).slice(-8).concat(userMessage);
 
     // Send the last 4 interactions along with the new message
     ws.send(JSON.stringify({